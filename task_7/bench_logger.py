@@ -0,0 +1,89 @@
+"""
+Накладные расходы декоратора logger на один вызов (микросекунды).
+Запуск из каталога task_7:
+
+    python bench_logger.py
+"""
+import io
+import re
+import json
+import logging
+import timeit
+
+from logger_decorator import logger
+from log_records import iter_binary
+
+# аргумент размером с полный ответ ЦБ: ~40 валют
+RATES = {f"C{i:02d}": {"Value": 50.0 + i, "Previous": 49.5 + i, "Name": f"Currency {i}"} for i in range(43)}
+
+
+def target(rates):
+    return len(rates)
+
+
+def null_logger(level):
+    log = logging.getLogger(f"bench.{level}")
+    log.propagate = False
+    log.setLevel(level)
+    log.handlers[:] = [logging.StreamHandler(io.StringIO())]
+    return log
+
+
+def per_call_us(fn, number: int = 20000) -> float:
+    return min(timeit.repeat(lambda: fn(RATES), number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    cases = [
+        ("undecorated", target),
+        ("stream, full repr", logger(handle=io.StringIO())(target)),
+        ("stream, max_repr=80", logger(handle=io.StringIO(), max_repr=80)(target)),
+        ("stream, sample_rate=0.01", logger(handle=io.StringIO(), sample_rate=0.01)(target)),
+        ("Logger INFO, full repr", logger(handle=null_logger(logging.INFO))(target)),
+        ("Logger INFO, max_repr=80", logger(handle=null_logger(logging.INFO), max_repr=80)(target)),
+        ("Logger WARNING (INFO off)", logger(handle=null_logger(logging.WARNING))(target)),
+        ("stream, queued=True", logger(handle=io.StringIO(), queued=True, max_repr=80)(target)),
+        ("timing=True", logger(handle=io.StringIO(), timing=True)(target)),
+    ]
+    base = per_call_us(target)
+    print(f"{'case':<28} {'us/call':>9} {'overhead':>9}")
+    for name, fn in cases:
+        us = per_call_us(fn, number=2000 if "full" in name else 20000)
+        print(f"{name:<28} {us:>9.2f} {us - base:>9.2f}")
+
+    ingest()
+
+
+TEXT_LINE = re.compile(r"^(\S+) (\w+) (CALL|OK  |FAIL) (\w+) (.*)$")
+
+
+def ingest(calls: int = 20000):
+    """Сколько стоит разобрать на стороне сбора логи одного и того же объёма."""
+    text, js, binary = io.StringIO(), io.StringIO(), io.BytesIO()
+    for handle, output in ((text, "text"), (js, "json"), (binary, "binary")):
+        fn = logger(handle=handle, output=output, max_repr=80)(target)
+        for _ in range(calls):
+            fn(RATES)
+    text, js, binary = text.getvalue(), js.getvalue(), binary.getvalue()
+
+    def parse_text():
+        return [TEXT_LINE.match(line).groups() for line in text.splitlines()]
+
+    def parse_json():
+        return [json.loads(line) for line in js.splitlines()]
+
+    def parse_binary():
+        return list(iter_binary(binary))
+
+    print(f"\ningest of {2 * calls} events")
+    # text — только 5 групп регулярки (args и kwargs одной строкой, ts не разобран),
+    # json и binary — словари со всеми полями
+    print(f"{'format':<8} {'bytes':>10} {'parse, ms':>10} {'result':>9}")
+    for name, data, parse, fields in (("text", text, parse_text, "5 groups"), ("json", js, parse_json, "dict"),
+                                      ("binary", binary, parse_binary, "dict")):
+        ms = min(timeit.repeat(parse, number=1, repeat=3)) * 1e3
+        print(f"{name:<8} {len(data):>10} {ms:>10.1f} {fields:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Скалярный solve_quadratic против solve_quadratic_batch на одной пачке
+коэффициентов. Запуск из каталога task_7:
+
+    python bench_quadratic.py [--n 1000000]
+"""
+import io
+import argparse
+import random
+import time
+from array import array
+
+from quadratic_batch import np, solve_quadratic_batch
+from quadratic_demo import solve_quadratic
+from logger_decorator import logger
+
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=1_000_000)
+    parser.add_argument("--scalar-n", type=int, default=100_000,
+                        help="скалярный путь медленный: меряем на части и пересчитываем")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    a = array("d", (rng.uniform(-10, 10) for _ in range(args.n)))
+    b = array("d", (rng.uniform(-10, 10) for _ in range(args.n)))
+    c = array("d", (rng.uniform(-10, 10) for _ in range(args.n)))
+    k = min(args.scalar_n, args.n)
+
+    def scalar(fn):
+        for i in range(k):
+            fn(a[i], b[i], c[i])
+
+    # тот же скалярный путь, что в quadratic_demo, но лог пишется в память, а не в stdout
+    plain = solve_quadratic.__wrapped__
+    logged = logger(handle=io.StringIO())(plain)
+    results = [
+        ("scalar + logger", timed(lambda: scalar(logged)) * args.n / k),
+        ("scalar, no logger", timed(lambda: scalar(plain)) * args.n / k),
+    ]
+    results.append(("batch, array('d')", timed(lambda: solve_quadratic_batch(a, b, c))))
+    if np is not None:
+        na, nb, nc = np.frombuffer(a), np.frombuffer(b), np.frombuffer(c)
+        results.append(("batch, numpy", timed(lambda: solve_quadratic_batch(na, nb, nc))))
+
+    base = results[0][1]
+    print(f"{args.n} equations")
+    print(f"{'path':<20} {'seconds':>9} {'ns/eq':>8} {'speedup':>8}")
+    for name, sec in results:
+        print(f"{name:<20} {sec:>9.3f} {sec / args.n * 1e9:>8.0f} {base / sec:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
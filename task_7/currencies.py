@@ -1,17 +1,15 @@
 import json
-import urllib.request
-import urllib.error
+
+from fetcher import DEFAULT_FETCHER
 
 
 def get_currencies(currency_codes: list, url="https://www.cbr-xml-daily.ru/daily_json.js", timeout=10) -> dict:
     if not isinstance(currency_codes, list):
         raise TypeError("currency_codes must be a list")
 
-    try:
-        with urllib.request.urlopen(url, timeout=timeout) as resp:
-            raw = resp.read()
-    except (urllib.error.URLError, urllib.error.HTTPError, TimeoutError, OSError) as e:
-        raise ConnectionError(f"API unavailable: {e}") from e
+    status, _, raw = DEFAULT_FETCHER.fetch(url, timeout=timeout)
+    if status >= 400:
+        raise ConnectionError(f"API unavailable: HTTP {status}")
 
     try:
         data = json.loads(raw.decode("utf-8"))
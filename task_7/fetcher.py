@@ -0,0 +1,171 @@
+# Копия task_8/myapp/utils/fetcher.py: task_7 запускается отдельно от task_8
+# и не может импортировать его пакет. Правки вносятся в task_8 и переносятся
+# сюда без изменений — task_8/tests/test_fetcher.py проверяет, что копии совпадают.
+import gzip
+import http.client
+import os
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import zlib
+
+REDIRECTS = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+
+
+class RatesFetcher:
+    """
+    HTTP-клиент для фидов курсов с пулом keep-alive соединений.
+
+    - соединения http.client переиспользуются между вызовами (без нового
+      TCP/TLS рукопожатия на каждый запрос);
+    - на один хост открывается не больше max_per_host соединений одновременно;
+    - ответы gzip/deflate распаковываются;
+    - схемы, отличные от http/https (data:, file:), уходят в urllib.
+
+    fetch() возвращает (status, headers, body) и не бросает исключений на
+    HTTP-статусы; сетевые ошибки превращаются в ConnectionError.
+    """
+
+    def __init__(self, max_per_host: int = 4, timeout: float = 10):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._slots = {}
+        self.connections_opened = 0
+
+    def fetch(self, url: str, timeout: float | None = None, headers: dict | None = None):
+        timeout = self.timeout if timeout is None else timeout
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urllib.parse.urlsplit(url)
+            if parts.scheme not in ("http", "https"):
+                return self._fetch_urllib(url, timeout, headers)
+            status, resp_headers, body = self._fetch_http(parts, timeout, headers)
+            location = resp_headers.get("Location")
+            if status not in REDIRECTS or not location:
+                return status, resp_headers, body
+            url = urllib.parse.urljoin(url, location)
+        raise ConnectionError(f"API unavailable: too many redirects ({url})")
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def _after_fork(self) -> None:
+        # сокеты родителя в ребёнке не используем: пусть каждый процесс держит свой пул
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._slots = {}
+
+    def _fetch_urllib(self, url, timeout, headers):
+        req = urllib.request.Request(url, headers=headers or {})
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                return getattr(resp, "status", 200) or 200, resp.headers, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+        except (urllib.error.URLError, TimeoutError, OSError) as e:
+            raise ConnectionError(f"API unavailable: {e}") from e
+
+    def _fetch_http(self, parts, timeout, headers):
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        req_headers = {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+        req_headers.update(headers or {})
+
+        slots = self._slots_for(key)
+        if not slots.acquire(timeout=timeout):
+            raise ConnectionError(f"API unavailable: no free connection to {parts.hostname}")
+        try:
+            conn, reused = self._checkout(key, timeout)
+            try:
+                resp = self._roundtrip(conn, path, req_headers, timeout)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                conn.close()
+                if not reused:
+                    raise ConnectionError(f"API unavailable: {e}") from e
+                # сервер успел закрыть простаивающее соединение — повторяем на новом
+                conn = self._connect(key, timeout)
+                resp = self._roundtrip_or_raise(conn, path, req_headers, timeout)
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                raise ConnectionError(f"API unavailable: {e}") from e
+
+            try:
+                body = _decode(resp.read(), resp.getheader("Content-Encoding"))
+            except (OSError, http.client.HTTPException, zlib.error) as e:
+                conn.close()
+                raise ConnectionError(f"API unavailable: {e}") from e
+
+            if resp.will_close:
+                conn.close()
+            else:
+                self._checkin(key, conn)
+            return resp.status, resp.msg, body
+        finally:
+            slots.release()
+
+    def _roundtrip(self, conn, path, headers, timeout):
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        conn.request("GET", path, headers=headers)
+        return conn.getresponse()
+
+    def _roundtrip_or_raise(self, conn, path, headers, timeout):
+        try:
+            return self._roundtrip(conn, path, headers, timeout)
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise ConnectionError(f"API unavailable: {e}") from e
+
+    def _slots_for(self, key):
+        with self._lock:
+            slots = self._slots.get(key)
+            if slots is None:
+                slots = self._slots[key] = threading.BoundedSemaphore(self.max_per_host)
+            return slots
+
+    def _checkout(self, key, timeout):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        return self._connect(key, timeout), False
+
+    def _checkin(self, key, conn):
+        with self._lock:
+            self._idle.setdefault(key, []).append(conn)
+
+    def _connect(self, key, timeout):
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        with self._lock:
+            self.connections_opened += 1
+        return cls(host, port, timeout=timeout)
+
+
+def _decode(body: bytes, encoding: str | None) -> bytes:
+    encoding = (encoding or "").strip().lower()
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            # часть серверов шлёт «сырой» deflate без zlib-заголовка
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+
+DEFAULT_FETCHER = RatesFetcher()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=DEFAULT_FETCHER._after_fork)
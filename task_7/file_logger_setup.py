@@ -11,7 +11,8 @@ if not any(isinstance(h, logging.FileHandler) for h in file_logger.handlers):
     fh.setFormatter(fmt)
     file_logger.addHandler(fh)
 
-get_currencies_file_logged = logger(handle=file_logger)(get_currencies)
+# запись в файл идёт в фоновом потоке, а не на потоке вызывающего
+get_currencies_file_logged = logger(handle=file_logger, queued=True)(get_currencies)
 
 if __name__ == "__main__":
     print(get_currencies_file_logged(["USD", "EUR"]))
@@ -0,0 +1,178 @@
+"""
+Структурированные записи декоратора logger (output="json" / output="binary")
+и утилита для их чтения:
+
+    python log_records.py calls.bin                 # JSON-строки в stdout
+    python log_records.py calls.jsonl --phase fail --function get_currencies
+"""
+import sys
+import json
+import struct
+import argparse
+from typing import Iterator
+
+LEVELS = ("INFO", "WARNING", "ERROR", "CRITICAL")
+PHASES = ("call", "ok", "fail", "result", "stats")
+
+# строковые поля записи в порядке хранения в бинарном виде
+TEXT_FIELDS = ("function", "args", "kwargs", "result", "exc_type", "exc", "message")
+STATS_FIELDS = ("count", "errors", "p50", "p95", "p99", "max")
+
+# каждая бинарная запись начинается с этого байта (ASCII US): по нему формат
+# отличается от JSON-строк, которые начинаются с "{", а смена версии формата —
+# это новый байт (0x1E был у версии с заголовком фиксированного размера)
+RECORD_MARK = 0x1F
+
+# Запись: метка, байт kind (уровень, фаза, есть ли duration_ms/items, ширина
+# длины), байт mask (какие из TEXT_FIELDS есть), затем заголовок, состав
+# которого задают kind и mask: ts (секунды и миллисекунды), duration_ms, items,
+# длина тела; тело — присутствующие строки в UTF-8 через NUL.
+_PREFIX = 3
+_HAS_DURATION = 0x20
+_HAS_ITEMS = 0x40
+_WIDE = 0x80
+_MAX_BODY = 0xFFFFFFFF
+_LAYOUTS = {}
+
+
+def _layout(kind: int, mask: int) -> tuple:
+    """Struct заголовка и имена полей для пары kind/mask (кешируется)."""
+    key = (kind, mask)
+    layout = _LAYOUTS.get(key)
+    if layout is None:
+        level, phase = kind & 0x03, (kind >> 2) & 0x07
+        if level >= len(LEVELS) or phase >= len(PHASES) or mask >> len(TEXT_FIELDS):
+            raise ValueError(f"bad binary log record header 0x{kind:02x} 0x{mask:02x}")
+        fmt, numbers = "<BBBIH", []
+        if kind & _HAS_DURATION:
+            fmt += "d"
+            numbers.append("duration_ms")
+        if kind & _HAS_ITEMS:
+            fmt += "I"
+            numbers.append("items")
+        fmt += "I" if kind & _WIDE else "H"
+        texts = tuple(key for i, key in enumerate(TEXT_FIELDS) if mask & (1 << i))
+        layout = (struct.Struct(fmt), LEVELS[level], PHASES[phase], tuple(numbers), texts,
+                  PHASES[phase] == "stats" and "message" in texts)
+        _LAYOUTS[key] = layout
+    return layout
+
+
+def encode_json(event: dict) -> str:
+    """Одна запись — одна строка JSON (значения, не являющиеся JSON, через str)."""
+    return json.dumps(event, ensure_ascii=False, default=str, separators=(",", ":"))
+
+
+def encode_binary(event: dict) -> bytes:
+    """
+    Запись с меткой RECORD_MARK: заголовок только из присутствующих полей и
+    строки TEXT_FIELDS в UTF-8 через NUL (NUL внутри строк заменяется на U+FFFD;
+    repr его и так экранирует). ts хранится с точностью до миллисекунды.
+    Числа сводки stats уходят в message как JSON.
+    """
+    texts, mask = [], 0
+    for i, key in enumerate(TEXT_FIELDS):
+        value = event.get(key)
+        if key == "message" and event["phase"] == "stats":
+            value = json.dumps({k: event.get(k) for k in STATS_FIELDS}, separators=(",", ":"))
+        if value is not None:
+            texts.append(str(value).replace("\0", "\ufffd"))
+            mask |= 1 << i
+    body = "\0".join(texts).encode("utf-8")
+    if len(body) > _MAX_BODY:
+        raise ValueError("binary log record is larger than 4 GiB")
+    kind = LEVELS.index(event["level"]) | PHASES.index(event["phase"]) << 2
+    ms = round(event["ts"] * 1000)
+    numbers = [ms // 1000, ms % 1000]
+    if event.get("duration_ms") is not None:
+        kind |= _HAS_DURATION
+        numbers.append(event["duration_ms"])
+    if event.get("items") is not None:
+        kind |= _HAS_ITEMS
+        numbers.append(event["items"])
+    if len(body) > 0xFFFF:
+        kind |= _WIDE
+    header = _layout(kind, mask)[0]
+    return header.pack(RECORD_MARK, kind, mask, *numbers, len(body)) + body
+
+
+def iter_binary(data) -> Iterator[dict]:
+    """
+    Разбирает подряд идущие бинарные записи из bytes/mmap: на запись один
+    unpack_from и один decode. Обрезанный хвост пропускается, а запись без
+    RECORD_MARK — ValueError.
+    """
+    data = bytes(data)
+    layouts = _LAYOUTS
+    pos, end = 0, len(data)
+    while pos + _PREFIX <= end:
+        if data[pos] != RECORD_MARK:
+            raise ValueError(f"not a binary log record at offset {pos}")
+        kind, mask = data[pos + 1], data[pos + 2]
+        header, level, phase, numbers, texts, stats = layouts.get((kind, mask)) or _layout(kind, mask)
+        p = pos + header.size
+        if p > end:
+            break
+        values = header.unpack_from(data, pos)
+        stop = p + values[-1]
+        if stop > end:
+            break
+        event = {"ts": values[3] + values[4] / 1000, "level": level, "phase": phase}
+        for key, value in zip(numbers, values[5:-1]):
+            event[key] = value
+        if mask:
+            for key, value in zip(texts, data[p:stop].decode("utf-8", errors="replace").split("\0")):
+                event[key] = value
+        if stats:
+            event.update(json.loads(event.pop("message")))
+        yield event
+        pos = stop
+
+
+FORMATS = ("json", "binary")
+
+
+def read_records(path: str, fmt: str | None = None) -> list:
+    """
+    Все записи файла. fmt — "json" или "binary"; без него формат определяется
+    по первому байту: RECORD_MARK — бинарный, "{" — JSON-строки.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if fmt is None:
+        if not data:
+            return []
+        if data[0] == RECORD_MARK:
+            fmt = "binary"
+        elif data[:1] == b"{":
+            fmt = "json"
+        else:
+            raise ValueError(f"{path}: unknown log format")
+    elif fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {FORMATS}")
+    if fmt == "json":
+        return [json.loads(line) for line in data.splitlines() if line.strip()]
+    return list(iter_binary(data))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Чтение структурированных логов декоратора logger")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="по умолчанию — по первому байту файла")
+    parser.add_argument("--phase", choices=PHASES)
+    parser.add_argument("--function")
+    parser.add_argument("--level", choices=LEVELS)
+    args = parser.parse_args(argv)
+
+    for event in read_records(args.path, args.format):
+        if args.phase and event["phase"] != args.phase:
+            continue
+        if args.function and event.get("function") != args.function:
+            continue
+        if args.level and event["level"] != args.level:
+            continue
+        sys.stdout.write(encode_json(event) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,29 @@
 import sys
+import time
+import queue
+import atexit
+import random
+import inspect
+import reprlib
+import itertools
 import logging
+import logging.handlers
+import threading
 import functools
+from collections import OrderedDict
 from datetime import datetime
 from dataclasses import dataclass
 from typing import Any, Optional
 
+from log_records import encode_binary, encode_json
+
+LEVELS = {
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL,
+}
+
 
 @dataclass(frozen=True)
 class LogResult:
@@ -13,7 +32,322 @@ class LogResult:
     message: Optional[str] = None
 
 
-def logger(func=None, *, handle=sys.stdout):
+class _Repr:
+    """
+    Отложенный repr/str: считается только когда строку действительно форматируют
+    (logging делает это уже после фильтрации по уровню). Длинный текст
+    обрезается до limit символов.
+    """
+    __slots__ = ("obj", "limit", "conv")
+
+    def __init__(self, obj, limit: Optional[int] = None, conv=repr):
+        self.obj = obj
+        self.limit = limit
+        self.conv = conv
+
+    def __str__(self):
+        text = self.conv(self.obj)
+        if self.limit is not None and len(text) > self.limit:
+            return f"{text[:self.limit]}..."
+        return text
+
+    __repr__ = __str__
+
+
+class _BoundedRepr(reprlib.Repr):
+    """
+    repr, который не заглядывает дальше limit символов: списки, кортежи и
+    словари обходятся, пока набранный текст не перевалит за limit, у строк и
+    чисел берётся срез. Первые limit символов совпадают с обычным repr (кроме
+    вложенности глубже maxlevel — там "[...]"), дальше их обрежет _Repr.
+    """
+
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+        # элемент контейнера занимает минимум 3 символа ("1, ")
+        items = limit // 3 + 1
+        self.maxlevel = min(limit + 1, 6)
+        self.maxdict = self.maxlist = self.maxtuple = self.maxset = items
+        self.maxfrozenset = self.maxdeque = self.maxarray = items
+        # срез посередине reprlib ставит после limit символов
+        self.maxstring = self.maxlong = self.maxother = 2 * limit + 3
+
+    def repr1(self, x, level):
+        # числа и короткие строки — сразу, без диспетчеризации по имени типа
+        t = type(x)
+        if t is float or t is int or t is bool or x is None or (t is str and len(x) <= self.limit):
+            return repr(x)
+        return super().repr1(x, level)
+
+    def _join(self, x, level, left, right, piece, maxiter):
+        if not x:
+            return left + right
+        if level <= 0:
+            return f"{left}{self.fillvalue}{right}"
+        pieces, size = [], len(left)
+        for item in itertools.islice(x, maxiter):
+            if size > self.limit:
+                break
+            pieces.append(piece(item, level - 1))
+            size += len(pieces[-1]) + 2
+        if len(pieces) < len(x):
+            pieces.append(self.fillvalue)
+        return left + ", ".join(pieces) + right
+
+    def repr_list(self, x, level):
+        return self._join(x, level, "[", "]", self.repr1, self.maxlist)
+
+    def repr_tuple(self, x, level):
+        return self._join(x, level, "(", ",)" if len(x) == 1 else ")", self.repr1, self.maxtuple)
+
+    def repr_dict(self, x, level):
+        # reprlib сортирует все ключи, а repr идёт в порядке вставки
+        return self._join(x.items(), level, "{", "}",
+                          lambda kv, lvl: f"{self.repr1(kv[0], lvl)}: {self.repr1(kv[1], lvl)}", self.maxdict)
+
+
+class LatencyHistogram:
+    """
+    Гистограмма длительностей в наносекундах с логарифмическими корзинами:
+    каждая степень двойки делится на SUB частей, поэтому перцентили
+    получаются с относительной ошибкой не больше 1/SUB при фиксированной памяти.
+    """
+    SUB_BITS = 4
+    SUB = 1 << SUB_BITS
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {}
+        self.count = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    @classmethod
+    def _bucket(cls, ns: int) -> int:
+        if ns < cls.SUB:
+            return ns
+        shift = ns.bit_length() - cls.SUB_BITS - 1
+        return (shift + 1) * cls.SUB + (ns >> shift) - cls.SUB
+
+    @classmethod
+    def _upper(cls, bucket: int) -> int:
+        if bucket < cls.SUB:
+            return bucket
+        shift = bucket // cls.SUB - 1
+        return ((bucket % cls.SUB + cls.SUB + 1) << shift) - 1
+
+    def record(self, ns: int, error: bool = False) -> None:
+        b = self._bucket(ns)
+        with self._lock:
+            self.counts[b] = self.counts.get(b, 0) + 1
+            self.count += 1
+            self.total_ns += ns
+            if ns > self.max_ns:
+                self.max_ns = ns
+            if error:
+                self.errors += 1
+
+    def percentile(self, p: float) -> int:
+        """Верхняя граница корзины, в которую попал p-й перцентиль (нс)."""
+        with self._lock:
+            if not self.count:
+                return 0
+            rank = max(1, -(-self.count * p // 100))
+            seen = 0
+            for b in sorted(self.counts):
+                seen += self.counts[b]
+                if seen >= rank:
+                    return min(self._upper(b), self.max_ns)
+        return self.max_ns
+
+    def snapshot(self) -> dict:
+        """count/errors и p50/p95/p99/max/mean в миллисекундах."""
+        with self._lock:
+            count, errors, total, mx = self.count, self.errors, self.total_ns, self.max_ns
+        return {
+            "count": count,
+            "errors": errors,
+            "p50": self.percentile(50) / 1e6,
+            "p95": self.percentile(95) / 1e6,
+            "p99": self.percentile(99) / 1e6,
+            "max": mx / 1e6,
+            "mean": total / count / 1e6 if count else 0.0,
+        }
+
+
+_HISTOGRAMS = {}
+_HISTOGRAMS_LOCK = threading.Lock()
+
+
+def _histogram(name: str) -> LatencyHistogram:
+    with _HISTOGRAMS_LOCK:
+        hist = _HISTOGRAMS.get(name)
+        if hist is None:
+            hist = _HISTOGRAMS[name] = LatencyHistogram()
+        return hist
+
+
+def latency_stats(name: Optional[str] = None) -> dict:
+    """
+    Накопленные в режиме timing задержки: {"module.func": {"count", "p50", ...}}
+    или статистика одной функции, если передано name.
+    """
+    with _HISTOGRAMS_LOCK:
+        items = dict(_HISTOGRAMS)
+    if name is not None:
+        return items[name].snapshot()
+    return {key: hist.snapshot() for key, hist in items.items()}
+
+
+def reset_latency_stats() -> None:
+    with _HISTOGRAMS_LOCK:
+        _HISTOGRAMS.clear()
+
+
+_last_ts = (None, "")
+
+
+def _timestamp() -> str:
+    # isoformat с точностью до секунды: пересчитываем раз в секунду, а не на каждый вызов
+    global _last_ts
+    now = int(time.time())
+    sec, text = _last_ts
+    if sec != now:
+        text = datetime.fromtimestamp(now).isoformat(timespec="seconds")
+        _last_ts = (now, text)
+    return text
+
+
+_STOP = object()
+
+
+class QueuedWriter:
+    """
+    Обёртка над потоком с .write(): вызывающий поток только кладёт строку (или bytes)
+    в очередь, а фоновый поток пишет накопившиеся строки одним write()
+    (пачками до batch_size) и делает flush. Порядок строк сохраняется.
+    """
+
+    def __init__(self, stream, batch_size: int = 512):
+        self.stream = stream
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, text: str) -> int:
+        if self._closed:
+            return self.stream.write(text)
+        self._queue.put(text)
+        return len(text)
+
+    def flush(self) -> None:
+        """Ждёт, пока всё, что уже в очереди, будет записано."""
+        if not self._closed:
+            self._queue.join()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        q = self._queue
+        while True:
+            batch = [q.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is _STOP
+            lines = [item for item in batch if item is not _STOP]
+            try:
+                if lines:
+                    self.stream.write(lines[0][:0].join(lines))
+                    if hasattr(self.stream, "flush"):
+                        self.stream.flush()
+            except Exception as e:
+                sys.__stderr__.write(f"QueuedWriter: {type(e).__name__}: {e}\n")
+            for _ in batch:
+                q.task_done()
+            if stop:
+                return
+
+
+_WRITERS = {}
+_LISTENERS = {}
+_QUEUED_LOCK = threading.Lock()
+
+
+def queued_stream(stream) -> QueuedWriter:
+    """Один QueuedWriter на поток, сколько бы декораторов в него ни писало."""
+    with _QUEUED_LOCK:
+        writer = _WRITERS.get(id(stream))
+        if writer is None:
+            writer = _WRITERS[id(stream)] = QueuedWriter(stream)
+        return writer
+
+
+def queued_logger(log: logging.Logger) -> logging.Logger:
+    """
+    Переводит обработчики логгера за QueueHandler: вызывающий поток только
+    ставит запись в очередь, а FileHandler/StreamHandler работают в потоке
+    QueueListener. Повторный вызов для того же логгера ничего не меняет.
+    """
+    with _QUEUED_LOCK:
+        if log.name in _LISTENERS:
+            return log
+        handlers = list(log.handlers)
+        q = queue.Queue()
+        for h in handlers:
+            log.removeHandler(h)
+        log.addHandler(logging.handlers.QueueHandler(q))
+        listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+        listener.start()
+        _LISTENERS[log.name] = listener
+        return log
+
+
+def flush_queued() -> None:
+    """Дожидается записи всего, что уже поставлено в очереди логов."""
+    with _QUEUED_LOCK:
+        writers = list(_WRITERS.values())
+        listeners = list(_LISTENERS.values())
+    for writer in writers:
+        writer.flush()
+    for listener in listeners:
+        listener.queue.join()
+
+
+@atexit.register
+def shutdown_queued() -> None:
+    """Дописывает очереди и останавливает фоновые потоки (вызывается и при выходе)."""
+    with _QUEUED_LOCK:
+        writers = list(_WRITERS.values())
+        listeners = list(_LISTENERS.items())
+        _WRITERS.clear()
+        _LISTENERS.clear()
+    for writer in writers:
+        writer.close()
+    for name, listener in listeners:
+        listener.stop()
+        log = logging.getLogger(name)
+        for h in list(log.handlers):
+            if isinstance(h, logging.handlers.QueueHandler) and h.queue is listener.queue:
+                log.removeHandler(h)
+        for h in listener.handlers:
+            log.addHandler(h)
+
+
+def logger(func=None, *, handle=sys.stdout, max_repr: Optional[int] = None, sample_rate: float = 1.0,
+           timing: bool = False, summary_every: Optional[float] = 60.0, queued: bool = False,
+           output: str = "text"):
     """
     Параметризуемый декоратор.
 
@@ -29,45 +363,392 @@ def logger(func=None, *, handle=sys.stdout):
       если функция вернула LogResult(level=..., value=..., message=...),
       то уровень берём из LogResult.level (например WARNING/CRITICAL),
       а наружу возвращаем LogResult.value.
+
+    Корутины (async def) логируются по завершении await, генераторы и
+    async-генераторы — с первого запрошенного элемента до исчерпания
+    (OK ... items=N); send/throw/close пробрасываются внутрь.
+
+    Накладные расходы:
+      max_repr    — обрезать repr аргументов/результата до стольких символов;
+                    большие списки и словари при этом не обходятся целиком;
+      sample_rate — доля вызовов (0..1), для которых пишутся CALL/OK;
+                    ошибки и LogResult пишутся всегда;
+      для logging.Logger строки собираются лениво (%-аргументы), а если
+      уровень INFO отключён, вызов идёт вообще без форматирования.
+
+    timing=True — вместо CALL/OK на каждый вызов длительность (perf_counter_ns)
+      складывается в гистограмму функции (см. latency_stats), а не чаще раза
+      в summary_every секунд пишется строка
+      "STATS func count=... p50=...ms p95=...ms p99=...ms max=...ms".
+      Ошибки по-прежнему логируются сразу.
+
+    queued=True — запись уходит в фоновый поток: для logging.Logger через
+      QueueHandler/QueueListener (queued_logger), для потока через
+      QueuedWriter (queued_stream). Остаток очереди дописывается при выходе
+      из процесса; flush_queued() позволяет дождаться записи явно.
+
+    output:
+      "text"   — строки как раньше;
+      "json"   — одна JSON-запись на событие: ts, level, phase (call/ok/fail/
+                 result/stats), function, duration_ms, args/kwargs/result
+                 (обрезанные repr), exc_type/exc;
+      "binary" — те же записи в компактном виде: короткий заголовок с длиной
+                 тела (log_records.encode_binary), только для бинарного потока.
+      Прочитать json/binary можно через log_records.read_records.
     """
-    def is_logging_logger(obj) -> bool:
-        return isinstance(obj, logging.Logger)
-
-    def emit(level: str, msg: str):
-        ts = datetime.now().isoformat(timespec="seconds")
-        line = f"{ts} {level} {msg}\n"
-
-        if is_logging_logger(handle):
-            if level == "INFO":
-                handle.info(msg)
-            elif level == "WARNING":
-                handle.warning(msg)
-            elif level == "ERROR":
-                handle.error(msg)
-            elif level == "CRITICAL":
-                handle.critical(msg)
+    if not 0.0 <= sample_rate <= 1.0:
+        raise ValueError("sample_rate must be in [0, 1]")
+    if output not in ("text", "json", "binary"):
+        raise ValueError("output must be 'text', 'json' or 'binary'")
+    is_logger = isinstance(handle, logging.Logger)
+    if output == "binary" and is_logger:
+        raise ValueError("binary output needs a binary stream, not a logging.Logger")
+    if queued:
+        handle = queued_logger(handle) if is_logger else queued_stream(handle)
+    short = repr if max_repr is None else _BoundedRepr(max_repr).repr
+
+    def enabled(level: str) -> bool:
+        if is_logger:
+            return handle.isEnabledFor(LEVELS.get(level, logging.INFO))
+        return True
+
+    def emit(level: str, fmt: str, *args, **event):
+        """Текстом — fmt % args, в структурированном виде — поля event."""
+        if output != "text":
+            level = level if level in LEVELS else "INFO"
+            event = {"ts": time.time(), "level": level, **event}
+            if output == "binary":
+                handle.write(encode_binary(event))
+            elif is_logger:
+                handle.log(LEVELS[level], "%s", _Repr(event, None, encode_json))
             else:
-                handle.info(msg)
+                handle.write(encode_json(event) + "\n")
+        elif is_logger:
+            handle.log(LEVELS.get(level, logging.INFO), fmt, *args)
         else:
-            handle.write(line)
+            handle.write(f"{_timestamp()} {level} {fmt % args}\n")
+
+    def elapsed_ms(t0) -> float:
+        return (time.perf_counter_ns() - t0) / 1e6
+
+    def start(name, args, kwargs) -> bool:
+        if timing:
+            return False
+        trace = enabled("INFO") and (sample_rate >= 1.0 or random.random() < sample_rate)
+        if trace:
+            a, kw = _Repr(args, max_repr, short), _Repr(kwargs, max_repr, short)
+            emit("INFO", "CALL %s args=%s kwargs=%s", name, a, kw,
+                 phase="call", function=name, args=a, kwargs=kw)
+        return trace
+
+    def fail(name, e, t0):
+        if enabled("ERROR"):
+            text = _Repr(e, max_repr, str)
+            emit("ERROR", "FAIL %s %s: %s", name, type(e).__name__, text,
+                 phase="fail", function=name, duration_ms=elapsed_ms(t0), exc_type=type(e).__name__, exc=text)
+
+    def finish(name, result, trace, t0):
+        if isinstance(result, LogResult):
+            lvl = result.level.upper()
+            if enabled(lvl):
+                msg = result.message or f"{name} returned LogResult"
+                value = _Repr(result.value, max_repr, short)
+                emit(lvl, "%s: %s value=%s", name, msg, value,
+                     phase="result", function=name, duration_ms=elapsed_ms(t0), message=msg, result=value)
+            return result.value
+
+        if trace:
+            value = _Repr(result, max_repr, short)
+            emit("INFO", "OK   %s result=%s", name, value,
+                 phase="ok", function=name, duration_ms=elapsed_ms(t0), result=value)
+        return result
+
+    def finish_iter(name, items, trace, t0):
+        if trace:
+            emit("INFO", "OK   %s items=%d", name, items,
+                 phase="ok", function=name, duration_ms=elapsed_ms(t0), items=items)
+
+    def summarize(key, hist, state):
+        # строка-сводка не чаще раза в summary_every секунд, без отдельного потока
+        now = time.monotonic()
+        if summary_every is None or now - state[0] < summary_every:
+            return
+        state[0] = now
+        if enabled("INFO"):
+            st = hist.snapshot()
+            emit("INFO", "STATS %s count=%d errors=%d p50=%.3fms p95=%.3fms p99=%.3fms max=%.3fms",
+                 key, st["count"], st["errors"], st["p50"], st["p95"], st["p99"], st["max"],
+                 phase="stats", function=key, **{k: st[k] for k in ("count", "errors", "p50", "p95", "p99", "max")})
 
     def decorator(target_func):
+        name = target_func.__name__
+        if timing:
+            key = f"{target_func.__module__}.{target_func.__qualname__}"
+            hist = _histogram(key)
+            state = [time.monotonic()]
+
+            def timed(t0, error=False):
+                hist.record(time.perf_counter_ns() - t0, error)
+                summarize(key, hist, state)
+        else:
+            timed = None
+
+        if inspect.iscoroutinefunction(target_func):
+            @functools.wraps(target_func)
+            async def async_wrapper(*args, **kwargs):
+                trace = start(name, args, kwargs)
+                t0 = time.perf_counter_ns()
+                try:
+                    result = await target_func(*args, **kwargs)
+                except Exception as e:
+                    if timed:
+                        timed(t0, error=True)
+                    fail(name, e, t0)
+                    raise
+                if timed:
+                    timed(t0)
+                return finish(name, result, trace, t0)
+            return async_wrapper
+
+        if inspect.isasyncgenfunction(target_func):
+            @functools.wraps(target_func)
+            async def async_gen_wrapper(*args, **kwargs):
+                # тело начинает работать на первом __anext__, как и у обёрнутой функции
+                trace = start(name, args, kwargs)
+                t0 = time.perf_counter_ns()
+                agen = target_func(*args, **kwargs)
+                items, sent, thrown = 0, None, None
+                try:
+                    while True:
+                        try:
+                            if thrown is not None:
+                                exc, thrown = thrown, None
+                                item = await agen.athrow(exc)
+                            else:
+                                item = await agen.asend(sent)
+                        except StopAsyncIteration:
+                            break
+                        items += 1
+                        try:
+                            sent = yield item
+                        except GeneratorExit:
+                            await agen.aclose()
+                            raise
+                        except BaseException as exc:
+                            thrown, sent = exc, None
+                except Exception as e:
+                    if timed:
+                        timed(t0, error=True)
+                    fail(name, e, t0)
+                    raise
+                if timed:
+                    timed(t0)
+                finish_iter(name, items, trace, t0)
+            return async_gen_wrapper
+
+        if inspect.isgeneratorfunction(target_func):
+            @functools.wraps(target_func)
+            def gen_wrapper(*args, **kwargs):
+                trace = start(name, args, kwargs)
+                t0 = time.perf_counter_ns()
+                gen = target_func(*args, **kwargs)
+                items, sent, thrown = 0, None, None
+                try:
+                    while True:
+                        try:
+                            if thrown is not None:
+                                exc, thrown = thrown, None
+                                item = gen.throw(exc)
+                            else:
+                                item = gen.send(sent)
+                        except StopIteration as stop:
+                            result = stop.value
+                            break
+                        items += 1
+                        try:
+                            sent = yield item
+                        except GeneratorExit:
+                            gen.close()
+                            raise
+                        except BaseException as exc:
+                            thrown, sent = exc, None
+                except Exception as e:
+                    if timed:
+                        timed(t0, error=True)
+                    fail(name, e, t0)
+                    raise
+                if timed:
+                    timed(t0)
+                finish_iter(name, items, trace, t0)
+                return result
+            return gen_wrapper
+
         @functools.wraps(target_func)
         def wrapper(*args, **kwargs):
-            emit("INFO", f"CALL {target_func.__name__} args={args} kwargs={kwargs}")
+            trace = start(name, args, kwargs)
+            t0 = time.perf_counter_ns()
             try:
                 result = target_func(*args, **kwargs)
-                if isinstance(result, LogResult):
-                    lvl = result.level.upper()
-                    msg = result.message or f"{target_func.__name__} returned LogResult"
-                    emit(lvl, f"{target_func.__name__}: {msg} value={result.value!r}")
-                    return result.value
-
-                emit("INFO", f"OK   {target_func.__name__} result={result!r}")
-                return result
             except Exception as e:
-                emit("ERROR", f"FAIL {target_func.__name__} {type(e).__name__}: {e}")
+                if timed:
+                    timed(t0, error=True)
+                fail(name, e, t0)
                 raise
+            if timed:
+                timed(t0)
+            return finish(name, result, trace, t0)
+        return wrapper
+
+    if func is None:
+        return decorator
+    return decorator(func)
+
+
+@dataclass(frozen=True)
+class CacheInfo:
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: Optional[int]
+
+
+def _freeze(value):
+    # list/dict/set в аргументах делаем хешируемыми: ["USD", "EUR"] -> ("USD", "EUR")
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(v) for v in value)
+    return value
+
+
+_KWD_MARK = object()
+
+
+def make_key(*args, **kwargs):
+    """Ключ по умолчанию: аргументы, в которых изменяемые контейнеры заменены неизменяемыми."""
+    key = _freeze(args)
+    if kwargs:
+        key += (_KWD_MARK,) + _freeze(kwargs)
+    return key
+
+
+class _Pending:
+    """Вычисление значения, которого ждут все одновременные промахи по ключу."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+def cache(func=None, *, maxsize: Optional[int] = 128, ttl: Optional[float] = None, key=None,
+          handle=None, report_every: int = 1000, clock=time.monotonic):
+    """
+    Параметризуемый кэширующий декоратор, сочетается с logger:
+
+        @logger(handle=log)
+        @cache(maxsize=32, ttl=300, handle=log)
+        def get_currencies(currency_codes, ...): ...
+
+    - maxsize — LRU-ограничение числа значений (None — без ограничения);
+    - ttl     — сколько секунд значение считается свежим (None — бессрочно);
+    - key     — функция (*args, **kwargs) -> ключ; по умолчанию make_key,
+                который превращает списки/словари в кортежи;
+    - одновременные промахи по одному ключу ждут одно вычисление
+      (single-flight), исключения не кэшируются;
+    - handle  — тот же, что у logger (поток или logging.Logger): раз в
+      report_every обращений туда пишется строка
+      "CACHE func hits=... misses=... evictions=... size=...".
+
+    У обёртки есть cache_info() и cache_clear().
+    """
+    make = key or make_key
+    is_logger = isinstance(handle, logging.Logger)
+
+    def report(name, info: CacheInfo):
+        fmt = "CACHE %s hits=%d misses=%d evictions=%d size=%d"
+        args = (name, info.hits, info.misses, info.evictions, info.size)
+        if is_logger:
+            handle.log(logging.INFO, fmt, *args)
+        else:
+            handle.write(f"{_timestamp()} INFO {fmt % args}\n")
+
+    def decorator(target_func):
+        name = target_func.__name__
+        lock = threading.Lock()
+        values = OrderedDict()      # ключ -> (значение, момент истечения)
+        pending = {}
+        counters = {"hits": 0, "misses": 0, "evictions": 0, "calls": 0}
+
+        def info() -> CacheInfo:
+            with lock:
+                return CacheInfo(counters["hits"], counters["misses"], counters["evictions"],
+                                 len(values), maxsize)
+
+        def clear() -> None:
+            with lock:
+                values.clear()
+
+        def lookup(k):
+            # под lock: (True, значение) при попадании, иначе (False, _Pending, лидер ли)
+            counters["calls"] += 1
+            entry = values.get(k)
+            if entry is not None:
+                if entry[1] is None or clock() < entry[1]:
+                    values.move_to_end(k)
+                    counters["hits"] += 1
+                    return True, entry[0], False
+                del values[k]
+                counters["evictions"] += 1
+            counters["misses"] += 1
+            flight = pending.get(k)
+            if flight is not None:
+                return False, flight, False
+            flight = pending[k] = _Pending()
+            return False, flight, True
+
+        def store(k, value):
+            values[k] = (value, None if ttl is None else clock() + ttl)
+            values.move_to_end(k)
+            while maxsize is not None and len(values) > maxsize:
+                values.popitem(last=False)
+                counters["evictions"] += 1
+
+        @functools.wraps(target_func)
+        def wrapper(*args, **kwargs):
+            k = make(*args, **kwargs)
+            with lock:
+                hit, found, leader = lookup(k)
+                due = handle is not None and counters["calls"] % report_every == 0
+            if due:
+                report(name, info())
+            if hit:
+                return found
+            if not leader:
+                found.done.wait()
+                if found.error is not None:
+                    raise found.error
+                return found.value
+
+            try:
+                found.value = target_func(*args, **kwargs)
+            except BaseException as e:
+                found.error = e
+                raise
+            else:
+                with lock:
+                    store(k, found.value)
+                return found.value
+            finally:
+                with lock:
+                    pending.pop(k, None)
+                found.done.set()
+
+        wrapper.cache_info = info
+        wrapper.cache_clear = clear
         return wrapper
 
     if func is None:
@@ -2,7 +2,7 @@ import sys
 import io
 import logging
 
-from logger_decorator import logger
+from logger_decorator import cache, logger
 from currencies import get_currencies
 
 get_currencies_stdout = logger(handle=sys.stdout)(get_currencies)
@@ -12,6 +12,8 @@ log = logging.getLogger("L1")
 log.setLevel(logging.INFO)
 log.addHandler(logging.StreamHandler(sys.stdout))
 get_currencies_logging = logger(handle=log)(get_currencies)
+# повторный запрос тех же кодов в течение 5 минут не ходит в сеть
+get_currencies_cached = logger(handle=log)(cache(ttl=300, handle=log, report_every=2)(get_currencies))
 
 
 if __name__ == "__main__":
@@ -21,3 +23,6 @@ if __name__ == "__main__":
     print(stream.getvalue())
     print("---- logging.Logger ----")
     print(get_currencies_logging(["USD"]))
+    print("---- cache ----")
+    for _ in range(2):
+        print(get_currencies_cached(["USD", "EUR"]))
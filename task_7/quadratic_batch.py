@@ -0,0 +1,122 @@
+import math
+from array import array
+from dataclasses import dataclass
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: без него работает путь на array('d')
+    np = None
+
+
+@dataclass(frozen=True)
+class QuadraticRoots:
+    """
+    Корни пачки уравнений a*x^2 + b*x + c = 0.
+
+    x1, x2     — корни как у solve_quadratic: x1 = (-b + sqrt(d)) / 2a,
+                 x2 = (-b - sqrt(d)) / 2a; где корня нет — NaN;
+    linear     — a == 0, b != 0: единственный корень в x1;
+    is_complex — d < 0, вещественных корней нет;
+    degenerate — a == 0 и b == 0.
+
+    Для входа NumPy поля — ndarray (маски dtype=bool), иначе array('d') и array('b').
+    """
+    x1: Any
+    x2: Any
+    linear: Any
+    is_complex: Any
+    degenerate: Any
+
+
+def solve_quadratic_batch(a, b, c, use_numpy: bool | None = None) -> QuadraticRoots:
+    """
+    Решает много уравнений за один вызов. Корни считаются устойчиво к потере
+    точности: q = -0.5 * (b + sign(b) * sqrt(d)), корни q / a и c / q,
+    поэтому при b*b >> 4ac меньший по модулю корень не вычитает близкие числа.
+
+    use_numpy=None — NumPy, если он установлен и хотя бы один вход — ndarray.
+    """
+    if use_numpy is None:
+        use_numpy = np is not None and any(isinstance(v, np.ndarray) for v in (a, b, c))
+    elif use_numpy and np is None:
+        raise ImportError("numpy is not installed")
+
+    if use_numpy:
+        return _solve_numpy(a, b, c)
+    return _solve_array(a, b, c)
+
+
+def _solve_array(a, b, c) -> QuadraticRoots:
+    a = a if isinstance(a, array) and a.typecode == "d" else array("d", a)
+    b = b if isinstance(b, array) and b.typecode == "d" else array("d", b)
+    c = c if isinstance(c, array) and c.typecode == "d" else array("d", c)
+    n = len(a)
+    if len(b) != n or len(c) != n:
+        raise ValueError("a, b and c must have the same length")
+
+    nan = math.nan
+    sqrt = math.sqrt
+    x1 = array("d", bytes(8 * n))
+    x2 = array("d", bytes(8 * n))
+    linear = array("b", bytes(n))
+    negative = array("b", bytes(n))
+    degenerate = array("b", bytes(n))
+
+    for i in range(n):
+        ai, bi, ci = a[i], b[i], c[i]
+        if ai == 0.0:
+            if bi == 0.0:
+                degenerate[i] = 1
+                x1[i] = x2[i] = nan
+            else:
+                linear[i] = 1
+                x1[i] = -ci / bi
+                x2[i] = nan
+            continue
+        d = bi * bi - 4.0 * ai * ci
+        if d < 0.0:
+            negative[i] = 1
+            x1[i] = x2[i] = nan
+            continue
+        if bi < 0.0:
+            q = -0.5 * (bi - sqrt(d))
+            x1[i] = q / ai
+            x2[i] = ci / q
+        else:
+            q = -0.5 * (bi + sqrt(d))
+            if q == 0.0:
+                # b == 0 и d == 0, значит c == 0: двойной корень 0
+                x1[i] = x2[i] = 0.0
+                continue
+            x1[i] = ci / q
+            x2[i] = q / ai
+
+    return QuadraticRoots(x1, x2, linear, negative, degenerate)
+
+
+def _solve_numpy(a, b, c) -> QuadraticRoots:
+    a, b, c = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float),
+                                  np.asarray(c, dtype=float))
+    if a.ndim != 1:
+        raise ValueError("a, b and c must be one-dimensional")
+
+    quad = a != 0
+    degenerate = ~quad & (b == 0)
+    linear = ~quad & ~degenerate
+    d = b * b - 4.0 * a * c
+    negative = quad & (d < 0)
+    real = quad & ~negative
+
+    x1 = np.full(a.shape, np.nan)
+    x2 = np.full(a.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        root = np.sqrt(np.where(real, d, 0.0))
+        q = -0.5 * np.where(b < 0, b - root, b + root)
+        big = q / a            # корень с большим модулем
+        small = np.where(q != 0, c / q, 0.0)
+        x1 = np.where(real, np.where(b < 0, big, small), x1)
+        x2 = np.where(real, np.where(b < 0, small, big), x2)
+        x1 = np.where(linear, -c / np.where(linear, b, 1.0), x1)
+
+    return QuadraticRoots(x1, x2, linear, negative, degenerate)
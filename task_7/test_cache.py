@@ -0,0 +1,98 @@
+import unittest
+import io
+import threading
+import time
+
+from logger_decorator import cache, logger, make_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCache(unittest.TestCase):
+    def test_unhashable_args_and_hits(self):
+        calls = []
+
+        @cache
+        def rates(currency_codes, url="u"):
+            calls.append(list(currency_codes))
+            return {code: 1.0 for code in currency_codes}
+
+        self.assertEqual(rates(["USD", "EUR"]), {"USD": 1.0, "EUR": 1.0})
+        self.assertEqual(rates(["USD", "EUR"]), {"USD": 1.0, "EUR": 1.0})
+        rates(["USD"], url="other")
+        self.assertEqual(len(calls), 2)
+        info = rates.cache_info()
+        self.assertEqual((info.hits, info.misses, info.size), (1, 2, 2))
+        self.assertNotEqual(make_key(["USD"]), make_key(("USD",), url="u"))
+
+    def test_lru_and_ttl_eviction(self):
+        clock = FakeClock()
+
+        @cache(maxsize=2, ttl=10, clock=clock)
+        def square(x):
+            return x * x
+
+        square(1)
+        square(2)
+        square(1)
+        square(3)  # вытесняет 2 как самый давно использованный
+        self.assertEqual(square.cache_info().evictions, 1)
+        square(1)
+        self.assertEqual(square.cache_info().hits, 2)
+
+        clock.now = 11
+        square(1)
+        info = square.cache_info()
+        self.assertEqual((info.misses, info.evictions), (4, 2))
+
+        square.cache_clear()
+        self.assertEqual(square.cache_info().size, 0)
+
+    def test_single_flight_and_errors(self):
+        calls = []
+
+        @cache
+        def slow(x):
+            calls.append(x)
+            time.sleep(0.1)
+            if x < 0:
+                raise ValueError("negative")
+            return x
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(slow(5))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [5] * 8)
+        self.assertEqual(calls, [5])
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                slow(-1)
+        self.assertEqual(calls, [5, -1, -1])
+
+    def test_reports_through_handle_and_composes_with_logger(self):
+        stream = io.StringIO()
+
+        @logger(handle=stream)
+        @cache(handle=stream, report_every=2)
+        def double(x):
+            return x * 2
+
+        self.assertEqual(double(2), 4)
+        self.assertEqual(double(2), 4)
+        logs = stream.getvalue()
+        self.assertIn("CACHE double hits=1 misses=1 evictions=0 size=1", logs)
+        self.assertEqual(logs.count("OK   double result=4"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import io
+import contextlib
+import os
+import json
+import tempfile
+
+from log_records import encode_binary, encode_json, iter_binary, main, read_records
+from logger_decorator import logger
+
+
+class TestLogRecords(unittest.TestCase):
+    def test_binary_roundtrip(self):
+        event = {"ts": 1700000000.25, "level": "ERROR", "phase": "fail", "function": "get_currencies",
+                 "duration_ms": 1.5, "exc_type": "KeyError", "exc": "'USD' — нет", "items": 3}
+        data = encode_binary(event) * 2
+        self.assertEqual(list(iter_binary(data)), [event, event])
+        # обрезанная последняя запись не ломает чтение
+        self.assertEqual(list(iter_binary(data[:-1])), [event])
+
+    def test_long_strings_and_absent_fields(self):
+        short = {"ts": 1700000000.125, "level": "INFO", "phase": "call", "function": "f", "args": "()"}
+        wide = {"ts": 1700000000.5, "level": "WARNING", "phase": "result", "function": "f",
+                "result": "y" * 300, "message": "м" * 200, "duration_ms": 0.0}
+        data = encode_binary(short) + encode_binary(wide)
+        self.assertEqual(list(iter_binary(data)), [short, wide])
+        # без duration_ms и items заголовок короче
+        self.assertLess(len(encode_binary(short)), 16)
+
+    def test_nul_in_text_is_replaced(self):
+        event = {"ts": 1.0, "level": "ERROR", "phase": "fail", "function": "f", "exc_type": "E", "exc": "a\0b"}
+        self.assertEqual(next(iter_binary(encode_binary(event)))["exc"], "a\ufffdb")
+
+    def test_stats_roundtrip(self):
+        event = {"ts": 1.0, "level": "INFO", "phase": "stats", "function": "m.f",
+                 "count": 10, "errors": 1, "p50": 0.5, "p95": 0.9, "p99": 1.0, "max": 1.2}
+        self.assertEqual(next(iter_binary(encode_binary(event))), event)
+
+    def test_structured_output_from_decorator(self):
+        stream = io.StringIO()
+
+        @logger(handle=stream, output="json", max_repr=20)
+        def double(x):
+            return x * 2
+
+        double("ab" * 50)
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([e["phase"] for e in events], ["call", "ok"])
+        self.assertEqual(events[1]["function"], "double")
+        self.assertEqual(events[1]["result"], repr("ab" * 100)[:20] + "...")
+        self.assertGreaterEqual(events[1]["duration_ms"], 0)
+
+    def test_binary_file_and_reader(self):
+        fd, path = tempfile.mkstemp(suffix=".bin")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        with open(path, "wb") as f:
+            @logger(handle=f, output="binary")
+            def boom():
+                raise ValueError("bad")
+
+            with self.assertRaises(ValueError):
+                boom()
+
+        events = read_records(path)
+        self.assertEqual([e["phase"] for e in events], ["call", "fail"])
+        self.assertEqual(events[1]["exc_type"], "ValueError")
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            main([path, "--phase", "fail"])
+        self.assertEqual(json.loads(out.getvalue())["exc"], "bad")
+
+    def test_length_byte_is_not_taken_for_json(self):
+        # длина тела "f\0xxx..." равна 0x7B ("{"), формат всё равно по метке
+        event = {"ts": 1.0, "level": "INFO", "phase": "ok", "function": "f", "result": "x" * (ord("{") - 2)}
+        data = encode_binary(event)
+        self.assertIn(b"{", data[:12])
+        fd, path = tempfile.mkstemp(suffix=".bin")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        with open(path, "wb") as f:
+            f.write(data)
+        self.assertEqual(read_records(path), [event])
+        self.assertEqual(read_records(path, "binary"), [event])
+        with self.assertRaises(ValueError):
+            read_records(path, "xml")
+
+    def test_unknown_format_rejected(self):
+        fd, path = tempfile.mkstemp(suffix=".bin")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        with open(path, "wb") as f:
+            f.write(b"garbage" * 20)
+        with self.assertRaises(ValueError):
+            read_records(path)
+        with self.assertRaises(ValueError):
+            read_records(path, "binary")
+
+    def test_encode_json_is_one_line(self):
+        line = encode_json({"ts": 1.0, "level": "INFO", "phase": "ok", "result": "a\nb"})
+        self.assertNotIn("\n", line)
+
+
+if __name__ == "__main__":
+    unittest.main()
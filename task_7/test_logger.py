@@ -1,7 +1,12 @@
 import unittest
+import asyncio
 import io
+import logging
+import logging.handlers
 
-from logger_decorator import logger
+from logger_decorator import (
+    LatencyHistogram, QueuedWriter, flush_queued, latency_stats, logger, queued_logger, reset_latency_stats,
+)
 
 
 class TestLoggerWithStringIO(unittest.TestCase):
@@ -35,6 +40,252 @@ class TestLoggerWithStringIO(unittest.TestCase):
         self.assertIn("RuntimeError", logs)
 
 
+class CountingRepr:
+    calls = 0
+
+    def __repr__(self):
+        CountingRepr.calls += 1
+        return "X" * 1000
+
+
+class TestLowOverhead(unittest.TestCase):
+    def setUp(self):
+        CountingRepr.calls = 0
+        self.stream = io.StringIO()
+
+    def make_logger(self, level):
+        log = logging.getLogger(f"test_low_overhead_{id(self)}")
+        log.propagate = False
+        log.setLevel(level)
+        log.addHandler(logging.StreamHandler(self.stream))
+        return log
+
+    def test_max_repr_truncates(self):
+        @logger(handle=self.stream, max_repr=10)
+        def echo(x):
+            return x
+
+        echo(CountingRepr())
+        logs = self.stream.getvalue()
+        self.assertIn("XXXXXXXXXX...", logs)
+        self.assertNotIn("X" * 11, logs)
+
+    def test_max_repr_bounds_work_not_only_output(self):
+        @logger(handle=self.stream, max_repr=10)
+        def echo(x):
+            return None
+
+        echo([CountingRepr() for _ in range(1000)])
+        # CALL: первый элемент уже длиннее 10 символов, остальные не трогаем
+        self.assertEqual(CountingRepr.calls, 1)
+        self.assertIn("args=([XXXXXXXX...", self.stream.getvalue())
+
+    def test_max_repr_keeps_dict_order(self):
+        @logger(handle=self.stream, max_repr=30)
+        def echo(x):
+            return x
+
+        echo({"b": 1, "a": 2})
+        self.assertIn("result={'b': 1, 'a': 2}", self.stream.getvalue())
+
+    def test_disabled_logger_skips_formatting(self):
+        @logger(handle=self.make_logger(logging.WARNING))
+        def echo(x):
+            return x
+
+        echo(CountingRepr())
+        self.assertEqual(CountingRepr.calls, 0)
+        self.assertEqual(self.stream.getvalue(), "")
+
+    def test_disabled_logger_still_reports_errors(self):
+        @logger(handle=self.make_logger(logging.WARNING))
+        def boom(x):
+            raise ValueError("bad")
+
+        with self.assertRaises(ValueError):
+            boom(CountingRepr())
+        self.assertIn("FAIL boom ValueError: bad", self.stream.getvalue())
+        self.assertEqual(CountingRepr.calls, 0)
+
+    def test_sampling(self):
+        @logger(handle=self.stream, sample_rate=0.0)
+        def double(x):
+            return x * 2
+
+        self.assertEqual(double(2), 4)
+        self.assertEqual(self.stream.getvalue(), "")
+        with self.assertRaises(ValueError):
+            logger(handle=self.stream, sample_rate=1.5)
+
+
+class TestAsyncAndGenerators(unittest.TestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+
+    def test_coroutine_result_and_error(self):
+        @logger(handle=self.stream)
+        async def fetch(x):
+            await asyncio.sleep(0)
+            return x + 1
+
+        @logger(handle=self.stream)
+        async def broken():
+            await asyncio.sleep(0)
+            raise KeyError("USD")
+
+        self.assertEqual(asyncio.run(fetch(1)), 2)
+        with self.assertRaises(KeyError):
+            asyncio.run(broken())
+        logs = self.stream.getvalue()
+        self.assertIn("OK   fetch result=2", logs)
+        self.assertNotIn("coroutine", logs)
+        self.assertIn("FAIL broken KeyError", logs)
+
+    def test_generator_logs_on_exhaustion(self):
+        @logger(handle=self.stream)
+        def numbers(n):
+            yield from range(n)
+            return "done"
+
+        gen = numbers(3)
+        self.assertEqual(self.stream.getvalue(), "")
+        self.assertEqual(next(gen), 0)
+        self.assertIn("CALL numbers", self.stream.getvalue())
+        self.assertNotIn("OK", self.stream.getvalue())
+        self.assertEqual(list(gen), [1, 2])
+        self.assertIn("OK   numbers items=3", self.stream.getvalue())
+
+    def test_generator_send_and_error(self):
+        @logger(handle=self.stream)
+        def echo():
+            got = yield "ready"
+            while True:
+                if got == "stop":
+                    raise RuntimeError("stopped")
+                got = yield got
+
+        gen = echo()
+        self.assertEqual(next(gen), "ready")
+        self.assertEqual(gen.send("x"), "x")
+        with self.assertRaises(RuntimeError):
+            gen.send("stop")
+        self.assertIn("FAIL echo RuntimeError: stopped", self.stream.getvalue())
+
+    def test_async_generator(self):
+        @logger(handle=self.stream)
+        async def ticks(n):
+            for i in range(n):
+                await asyncio.sleep(0)
+                yield i
+
+        async def consume():
+            return [i async for i in ticks(2)]
+
+        self.assertEqual(asyncio.run(consume()), [0, 1])
+        self.assertIn("OK   ticks items=2", self.stream.getvalue())
+
+
+class TestTiming(unittest.TestCase):
+    def setUp(self):
+        reset_latency_stats()
+        self.stream = io.StringIO()
+
+    def test_histogram_percentiles(self):
+        hist = LatencyHistogram()
+        for us in range(1, 1001):
+            hist.record(us * 1000)
+        st = hist.snapshot()
+        self.assertEqual(st["count"], 1000)
+        self.assertAlmostEqual(st["p50"], 0.5, delta=0.5 / LatencyHistogram.SUB)
+        self.assertAlmostEqual(st["p99"], 0.99, delta=0.99 / LatencyHistogram.SUB)
+        self.assertEqual(st["max"], 1.0)
+
+    def test_timing_replaces_per_call_lines(self):
+        @logger(handle=self.stream, timing=True, summary_every=None)
+        def work(x):
+            return x
+
+        @logger(handle=self.stream, timing=True, summary_every=None)
+        def broken():
+            raise ValueError("nope")
+
+        for i in range(5):
+            work(i)
+        with self.assertRaises(ValueError):
+            broken()
+
+        logs = self.stream.getvalue()
+        self.assertNotIn("CALL", logs)
+        self.assertIn("FAIL broken ValueError", logs)
+        prefix = f"{__name__}.{type(self).__name__}.test_timing_replaces_per_call_lines.<locals>."
+        self.assertEqual(latency_stats(prefix + "work")["count"], 5)
+        self.assertEqual(latency_stats(prefix + "broken")["errors"], 1)
+
+    def test_periodic_summary(self):
+        @logger(handle=self.stream, timing=True, summary_every=0)
+        def work():
+            return None
+
+        work()
+        self.assertRegex(self.stream.getvalue(), r"STATS \S+work count=1 errors=0 p50=[0-9.]+ms")
+
+
+class SlowStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+class TestQueued(unittest.TestCase):
+    def test_queued_writer_batches_in_order(self):
+        stream = SlowStream()
+        writer = QueuedWriter(stream)
+        for i in range(1000):
+            writer.write(f"{i}\n")
+        writer.flush()
+        self.assertEqual(stream.getvalue().split(), [str(i) for i in range(1000)])
+        self.assertLess(stream.writes, 1000)
+        writer.close()
+        writer.write("after close\n")
+        self.assertTrue(stream.getvalue().endswith("after close\n"))
+
+    def test_queued_stream_decorator(self):
+        stream = io.StringIO()
+
+        @logger(handle=stream, queued=True)
+        def double(x):
+            return x * 2
+
+        self.assertEqual(double(21), 42)
+        flush_queued()
+        self.assertIn("OK   double result=42", stream.getvalue())
+
+    def test_queued_logger_moves_handlers_behind_queue(self):
+        stream = io.StringIO()
+        log = logging.getLogger("test_queued_logger")
+        log.propagate = False
+        log.setLevel(logging.INFO)
+        handler = logging.StreamHandler(stream)
+        log.addHandler(handler)
+
+        queued_logger(log)
+        queued_logger(log)
+        self.assertEqual(len(log.handlers), 1)
+        self.assertIsInstance(log.handlers[0], logging.handlers.QueueHandler)
+
+        @logger(handle=log, queued=True)
+        def double(x):
+            return x * 2
+
+        double(2)
+        flush_queued()
+        self.assertIn("OK   double result=4", stream.getvalue())
+
+
 class TestStreamWriteExample(unittest.TestCase):
     def setUp(self):
         self.stream = io.StringIO()
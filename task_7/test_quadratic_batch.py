@@ -0,0 +1,87 @@
+import unittest
+import math
+import random
+from array import array
+
+from quadratic_batch import np, solve_quadratic_batch
+from quadratic_demo import solve_quadratic, CriticalError
+from logger_decorator import LogResult
+
+scalar = solve_quadratic.__wrapped__
+
+
+def scalar_roots(a, b, c):
+    try:
+        res = scalar(a, b, c)
+    except CriticalError:
+        return None
+    if isinstance(res, LogResult):
+        return ()
+    return res
+
+
+class TestQuadraticBatch(unittest.TestCase):
+    def test_matches_scalar_path(self):
+        rng = random.Random(7)
+        cases = [(1, -3, 2), (1, 0, 1), (0, 2, 4), (0, 0, 1), (1, 0, 0), (2, -0.0, -8), (-1, 4, 5)]
+        cases += [(rng.uniform(-5, 5), rng.uniform(-5, 5), rng.uniform(-5, 5)) for _ in range(200)]
+        a, b, c = (array("d", col) for col in zip(*cases))
+        res = solve_quadratic_batch(a, b, c)
+
+        for i, (ai, bi, ci) in enumerate(cases):
+            expected = scalar_roots(ai, bi, ci)
+            if expected is None:
+                self.assertTrue(res.degenerate[i])
+            elif expected == ():
+                self.assertTrue(res.is_complex[i])
+                self.assertTrue(math.isnan(res.x1[i]) and math.isnan(res.x2[i]))
+            elif len(expected) == 1:
+                self.assertTrue(res.linear[i])
+                self.assertAlmostEqual(res.x1[i], expected[0])
+                self.assertTrue(math.isnan(res.x2[i]))
+            else:
+                self.assertAlmostEqual(res.x1[i], expected[0], places=9)
+                self.assertAlmostEqual(res.x2[i], expected[1], places=9)
+
+    def test_stable_small_root(self):
+        # наивная формула даёт здесь 0 или мусор вместо -1e-8
+        res = solve_quadratic_batch([1.0], [1e8], [1.0])
+        self.assertAlmostEqual(res.x1[0], -1e-8, delta=1e-20)
+        self.assertAlmostEqual(res.x2[0], -1e8)
+
+    def test_length_mismatch(self):
+        with self.assertRaises(ValueError):
+            solve_quadratic_batch([1, 2], [1], [1, 2])
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_numpy_matches_array_path(self):
+        rng = np.random.default_rng(3)
+        a, b, c = rng.uniform(-5, 5, (3, 1000))
+        a[:10] = 0
+        b[:5] = 0
+        expected = solve_quadratic_batch(array("d", a), array("d", b), array("d", c))
+        res = solve_quadratic_batch(a, b, c)
+        np.testing.assert_allclose(res.x1, np.array(expected.x1), equal_nan=True)
+        np.testing.assert_allclose(res.x2, np.array(expected.x2), equal_nan=True)
+        self.assertEqual(res.is_complex.tolist(), [bool(v) for v in expected.is_complex])
+        self.assertEqual(res.degenerate.tolist(), [bool(v) for v in expected.degenerate])
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_numpy_edge_cases_match_array_path(self):
+        cases = [(1, -3, 2), (1, 0, 1), (0, 2, 4), (0, 0, 1), (0, -0.0, 0), (1, 0, 0), (1, -0.0, 0),
+                 (2, -0.0, -8), (-1, 4, 5), (1, 1e8, 1), (1e-300, 1, 1), (1, 2, 1), (0, -0.0, 3)]
+        a, b, c = (array("d", col) for col in zip(*cases))
+        expected = solve_quadratic_batch(a, b, c, use_numpy=False)
+        res = solve_quadratic_batch(a, b, c, use_numpy=True)
+        for name in ("x1", "x2"):
+            for i, (got, want) in enumerate(zip(getattr(res, name).tolist(), getattr(expected, name))):
+                if math.isnan(want):
+                    self.assertTrue(math.isnan(got), cases[i])
+                else:
+                    self.assertEqual(got, want, cases[i])
+        for name in ("linear", "is_complex", "degenerate"):
+            self.assertEqual(getattr(res, name).tolist(), [bool(v) for v in getattr(expected, name)], name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Время старта RateHistory из журнала: 120 дней почасовых курсов по всем
+валютам ЦБ (43 кода). Запуск из каталога task_8:
+
+    python bench_history.py [--per-day 24] [--target 1.0]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from myapp.utils.history import RateHistory
+from myapp.utils.history_store import HistoryLog
+
+CBR_CODES = [
+    "AUD", "AZN", "GBP", "AMD", "BYN", "BGN", "BRL", "HUF", "VND", "HKD", "GEL",
+    "DKK", "AED", "USD", "EUR", "EGP", "INR", "IDR", "KZT", "CAD", "QAR", "KGS",
+    "CNY", "MDL", "NZD", "NOK", "PLN", "RON", "XDR", "SGD", "TJS", "THB", "TRY",
+    "TMT", "UZS", "UAH", "CZK", "SEK", "CHF", "RSD", "ZAR", "KRW", "JPY",
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--per-day", type=int, default=24)
+    parser.add_argument("--target", type=float, default=1.0, help="допустимое время старта, с")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.bin")
+        log = HistoryLog(path, batch_size=4096)
+        start = datetime.now() - timedelta(days=args.days) + timedelta(hours=1)
+        step = 86400 / args.per_day
+        t0 = start.timestamp()
+        n = args.days * args.per_day
+        for i in range(n):
+            t = t0 + i * step
+            for k, code in enumerate(CBR_CODES):
+                log.append(code, t, 50.0 + k + (i % 100) / 100)
+        log.close()
+        records = n * len(CBR_CODES)
+        size_mb = os.path.getsize(path) / 2 ** 20
+
+        started = time.perf_counter()
+        history = RateHistory(store=HistoryLog(path))
+        elapsed = time.perf_counter() - started
+
+    print(f"records: {records}  file: {size_mb:.1f} MiB")
+    print(f"startup replay: {elapsed:.3f} s ({records / elapsed / 1e6:.2f} M records/s)")
+    print(f"loaded points: {len(history)}")
+    status = "OK" if elapsed <= args.target else "SLOW"
+    print(f"target {args.target:.2f} s: {status}")
+    return 0 if status == "OK" else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
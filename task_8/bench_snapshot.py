@@ -0,0 +1,55 @@
+"""
+Стоимость одного запроса курсов: полный разбор фида на каждый вызов
+(как get_currencies раньше) против запроса к уже разобранному RatesSnapshot.
+Сеть не участвует. Запуск из каталога task_8:
+
+    python bench_snapshot.py
+"""
+import json
+import timeit
+
+from myapp.utils.currencies_api import RatesSnapshot, parse_feed
+from bench_history import CBR_CODES
+
+
+def make_feed() -> bytes:
+    valute = {
+        code: {"ID": f"R0{i:04d}", "NumCode": f"{i:03d}", "CharCode": code, "Nominal": 1,
+               "Name": f"Currency {code}", "Value": 50.0 + i, "Previous": 49.5 + i}
+        for i, code in enumerate(CBR_CODES)
+    }
+    return json.dumps({"Date": "2024-01-10T11:30:00+03:00", "Valute": valute}).encode("utf-8")
+
+
+def reparse_each_call(raw: bytes, codes: list) -> dict:
+    valute = parse_feed(raw)["Valute"]
+    out = {}
+    for code in codes:
+        value = valute[code]["Value"]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise TypeError(code)
+        out[code] = float(value)
+    return out
+
+
+def per_call_us(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    raw = make_feed()
+    snapshot = RatesSnapshot.from_raw(raw)
+    build = per_call_us(lambda: RatesSnapshot.from_raw(raw), 2000)
+    print(f"feed: {len(CBR_CODES)} codes, {len(raw)} bytes; snapshot build: {build:.1f} us (once per fetch)")
+    print(f"{'codes':>6} {'reparse, us':>12} {'snapshot, us':>13} {'speedup':>8}")
+    for n in (1, 5, len(CBR_CODES)):
+        codes = CBR_CODES[:n]
+        old = per_call_us(lambda: reparse_each_call(raw, codes), 2000)
+        new = per_call_us(lambda: snapshot.get(codes), 20000)
+        print(f"{n:>6} {old:>12.2f} {new:>13.2f} {old / new:>7.0f}x")
+    allc = per_call_us(snapshot.all, 20000)
+    print(f"{'all()':>6} {'':>12} {allc:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,5 +3,6 @@ from .app import App
 from .user import User
 from .currency import Currency
 from .user_currency import UserCurrency
+from .repository import Repository
 
-__all__ = ["Author", "App", "User", "Currency", "UserCurrency"]
+__all__ = ["Author", "App", "User", "Currency", "UserCurrency", "Repository"]
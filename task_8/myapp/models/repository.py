@@ -0,0 +1,111 @@
+import threading
+
+from .user import User
+from .currency import Currency
+from .user_currency import UserCurrency
+
+
+class Repository:
+    """
+    Хранилище моделей в памяти с индексами:
+      - пользователи и валюты по id;
+      - валюты по char_code;
+      - подписки user_id -> {currency_id: UserCurrency}.
+
+    Все поиски, подписка и отписка — O(1); id подписок выдаёт
+    монотонный счётчик, а не max() по всему списку.
+    """
+
+    def __init__(self, users=(), currencies=(), user_currencies=()):
+        self._lock = threading.RLock()
+        self._users = {}
+        self._currencies = {}
+        self._currency_by_code = {}
+        self._currency_pos = {}
+        self._subscriptions = {}
+        self._next_subscription_id = 1
+
+        for u in users:
+            self.add_user(u)
+        for c in currencies:
+            self.add_currency(c)
+        for uc in user_currencies:
+            self._add_subscription(uc)
+
+    def add_user(self, user: User) -> User:
+        if not isinstance(user, User):
+            raise TypeError("user must be a User")
+        with self._lock:
+            if user.id in self._users:
+                raise ValueError(f"User id={user.id} already exists")
+            self._users[user.id] = user
+        return user
+
+    def add_currency(self, currency: Currency) -> Currency:
+        if not isinstance(currency, Currency):
+            raise TypeError("currency must be a Currency")
+        with self._lock:
+            if currency.id in self._currencies:
+                raise ValueError(f"Currency id={currency.id} already exists")
+            if currency.char_code in self._currency_by_code:
+                raise ValueError(f"Currency {currency.char_code} already exists")
+            self._currency_pos[currency.id] = len(self._currencies)
+            self._currencies[currency.id] = currency
+            self._currency_by_code[currency.char_code] = currency
+        return currency
+
+    def users(self) -> list[User]:
+        with self._lock:
+            return list(self._users.values())
+
+    def currencies(self) -> list[Currency]:
+        with self._lock:
+            return list(self._currencies.values())
+
+    def user_currencies(self) -> list[UserCurrency]:
+        with self._lock:
+            return [uc for subs in self._subscriptions.values() for uc in subs.values()]
+
+    def find_user(self, user_id: int) -> User | None:
+        return self._users.get(user_id)
+
+    def find_currency_by_id(self, currency_id: int) -> Currency | None:
+        return self._currencies.get(currency_id)
+
+    def find_currency_by_code(self, code: str) -> Currency | None:
+        return self._currency_by_code.get(code)
+
+    def user_subscriptions(self, user_id: int) -> list[Currency]:
+        with self._lock:
+            ids = list(self._subscriptions.get(user_id, ()))
+        # порядок как в списке валют, а не как подписывались
+        ids.sort(key=lambda cid: self._currency_pos.get(cid, 0))
+        return [self._currencies[cid] for cid in ids if cid in self._currencies]
+
+    def subscribe(self, user_id: int, currency_id: int) -> UserCurrency:
+        with self._lock:
+            subs = self._subscriptions.setdefault(user_id, {})
+            existing = subs.get(currency_id)
+            if existing is not None:
+                return existing
+            uc = UserCurrency(self._next_subscription_id, user_id=user_id, currency_id=currency_id)
+            subs[currency_id] = uc
+            self._next_subscription_id += 1
+            return uc
+
+    def unsubscribe(self, user_id: int, currency_id: int) -> bool:
+        with self._lock:
+            subs = self._subscriptions.get(user_id)
+            if not subs or currency_id not in subs:
+                return False
+            del subs[currency_id]
+            if not subs:
+                del self._subscriptions[user_id]
+            return True
+
+    def _add_subscription(self, uc: UserCurrency) -> None:
+        if not isinstance(uc, UserCurrency):
+            raise TypeError("user_currency must be a UserCurrency")
+        with self._lock:
+            self._subscriptions.setdefault(uc.user_id, {})[uc.currency_id] = uc
+            self._next_subscription_id = max(self._next_subscription_id, uc.id + 1)
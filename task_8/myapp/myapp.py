@@ -1,13 +1,23 @@
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
+import argparse
+import atexit
+import functools
 import json
 import os
+from datetime import date, timedelta
 
 from jinja2 import Environment, PackageLoader, select_autoescape
 
-from myapp.models import Author, App, User, Currency, UserCurrency
-from myapp.utils.currencies_api import get_currencies
+from myapp.models import Author, App, User, Currency, UserCurrency, Repository
+from myapp.utils.rates_cache import RatesCache
+from myapp.utils.providers import MultiSourceProvider
+from myapp.utils.breaker import CircuitBreaker
 from myapp.utils.history import RateHistory
+from myapp.utils.history_store import HistoryLog
+from myapp.utils.backfill import backfill
+from myapp.utils.scheduler import RefreshScheduler
+from myapp.utils.server import MODES, make_server, serve
 
 
 env = Environment(
@@ -24,73 +34,100 @@ template_author = env.get_template("author.html")
 main_author = Author(name="Кирилл Коряушкин", group="P4150")
 app_info = App(name="CurrenciesListApp", version="1.0.0", author=main_author)
 
-USERS = [
-    User(1, "Андрей"),
-    User(2, "Акакий"),
-]
+REPO = Repository(
+    users=[
+        User(1, "Андрей"),
+        User(2, "Акакий"),
+    ],
+    currencies=[
+        Currency(id=1, num_code="840", char_code="USD", name="US Dollar", value=1.0, nominal=1),
+        Currency(id=2, num_code="978", char_code="EUR", name="Euro", value=1.0, nominal=1),
+        Currency(id=3, num_code="826", char_code="GBP", name="British Pound", value=1.0, nominal=1),
+    ],
+    user_currencies=[
+        UserCurrency(1, user_id=1, currency_id=1),
+        UserCurrency(2, user_id=1, currency_id=2),
+        UserCurrency(3, user_id=2, currency_id=1),
+    ],
+)
+
+HISTORY = RateHistory()
 
-CURRENCIES = [
-    Currency(id=1, num_code="840", char_code="USD", name="US Dollar", value=1.0, nominal=1),
-    Currency(id=2, num_code="978", char_code="EUR", name="Euro", value=1.0, nominal=1),
-    Currency(id=3, num_code="826", char_code="GBP", name="British Pound", value=1.0, nominal=1),
-]
+# фид ЦБ обновляется раз в сутки, поэтому в сеть ходим не чаще раза в ttl секунд
+# после трёх ошибок подряд апстрим минуту не трогаем, а в течение суток
+# после истечения ttl отдаём последний удачный снимок с пометкой «устарело»
+BREAKER = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+RATES = RatesCache(ttl=300, breaker=BREAKER, max_stale=24 * 3600)
 
-USER_CURRENCIES = [
-    UserCurrency(1, user_id=1, currency_id=1),  
-    UserCurrency(2, user_id=1, currency_id=2),  
-    UserCurrency(3, user_id=2, currency_id=1),  
-]
 
-HISTORY = RateHistory()
+def use_sources(urls: list):
+    """Один источник — обычный запрос к нему; несколько — хеджированный опрос всех."""
+    if len(urls) == 1:
+        RATES.url, RATES.provider = urls[0], None
+    else:
+        RATES.provider = MultiSourceProvider(urls)
+    RATES.invalidate()
 
 
 def find_user(user_id: int) -> User | None:
-    for u in USERS:
-        if u.id == user_id:
-            return u
-    return None
+    return REPO.find_user(user_id)
 
 
 def find_currency_by_id(currency_id: int) -> Currency | None:
-    for c in CURRENCIES:
-        if c.id == currency_id:
-            return c
-    return None
+    return REPO.find_currency_by_id(currency_id)
 
 
 def find_currency_by_code(code: str) -> Currency | None:
-    for c in CURRENCIES:
-        if c.char_code == code:
-            return c
-    return None
+    return REPO.find_currency_by_code(code)
 
 
 def user_subscriptions(user_id: int) -> list[Currency]:
-    currency_ids = [uc.currency_id for uc in USER_CURRENCIES if uc.user_id == user_id]
-    return [c for c in CURRENCIES if c.id in currency_ids]
+    return REPO.user_subscriptions(user_id)
 
 
 def subscribe(user_id: int, currency_id: int):
-    next_id = (max([uc.id for uc in USER_CURRENCIES]) + 1) if USER_CURRENCIES else 1
-    for uc in USER_CURRENCIES:
-        if uc.user_id == user_id and uc.currency_id == currency_id:
-            return
-    USER_CURRENCIES.append(UserCurrency(next_id, user_id=user_id, currency_id=currency_id))
+    REPO.subscribe(user_id, currency_id)
 
 
 def unsubscribe(user_id: int, currency_id: int):
-    global USER_CURRENCIES
-    USER_CURRENCIES = [uc for uc in USER_CURRENCIES if not (uc.user_id == user_id and uc.currency_id == currency_id)]
+    REPO.unsubscribe(user_id, currency_id)
+
+
+# снимок, точки которого уже записаны в HISTORY: из кэша и на 304 приходит
+# тот же объект, и повторять те же точки в истории незачем
+_RECORDED_SNAPSHOT = None
+
 
+def _snapshot_changed(snapshot) -> bool:
+    global _RECORDED_SNAPSHOT
+    prev = _RECORDED_SNAPSHOT
+    if snapshot is prev:
+        return False
+    _RECORDED_SNAPSHOT = snapshot
+    # новый ответ 200 с той же датой фида — те же курсы
+    return prev is None or snapshot.date is None or snapshot.date != prev.date
 
-def update_rates():
-    codes = [c.char_code for c in CURRENCIES]
-    rates = get_currencies(codes)
+
+def update_rates(force: bool = False):
+    codes = [c.char_code for c in REPO.currencies()]
+    snapshot = RATES.get_snapshot(force=force)
+    rates = snapshot.get(codes)
+    error = RATES.last_error
+    if error is not None and (force or RATES.stale):
+        # апстрим недоступен: в REPO уже лежат значения из этого же снимка
+        raise error
+    changed = _snapshot_changed(snapshot)
     for code, value in rates.items():
         cur = find_currency_by_code(code)
         if cur:
             cur.value = value
-            HISTORY.add(code, value)
+            if changed:
+                HISTORY.add(code, value)
+
+
+# тики планировщика идут раз в ttl с разбросом ±20%, и без force половина из них
+# попадала бы внутрь ttl и не ходила в сеть; с force каждый тик — условный запрос
+REFRESHER = RefreshScheduler(functools.partial(update_rates, force=True), interval=RATES.ttl)
 
 
 class MyHandler(BaseHTTPRequestHandler):
@@ -141,7 +178,7 @@ class MyHandler(BaseHTTPRequestHandler):
 
         if path == "/users":
             html = template_users.render(
-                users=USERS,
+                users=REPO.users(),
                 navigation=self._nav()
             )
             return self._send_html(html)
@@ -161,41 +198,43 @@ class MyHandler(BaseHTTPRequestHandler):
             subs = user_subscriptions(user_id)
             chart = {}
             for cur in subs:
-                points = HISTORY.last_n_days(cur.char_code, days=90)
-                chart[cur.char_code] = [{"t": t.strftime("%Y-%m-%d"), "v": v} for (t, v) in points]
+                # одна точка на день (курс закрытия), сколько бы раз ни обновлялись
+                buckets = HISTORY.rollup(cur.char_code, days=90, bucket="day")
+                chart[cur.char_code] = [{"t": b.start.strftime("%Y-%m-%d"), "v": b.close} for b in buckets]
 
             html = template_user.render(
                 user=user,
                 subscriptions=subs,
-                all_currencies=CURRENCIES,
+                all_currencies=REPO.currencies(),
                 chart_data_json=json.dumps(chart, ensure_ascii=False),
                 navigation=self._nav()
             )
             return self._send_html(html)
 
         if path == "/currencies":
-            try:
-                update_rates()
-            except Exception as e:
-                html = template_currencies.render(
-                    currencies=CURRENCIES,
-                    error=f"{type(e).__name__}: {e}",
-                    navigation=self._nav()
-                )
-                return self._send_html(html, status=502)
-
+            # отдаём последний удачный снимок из памяти, сеть дергает только REFRESHER;
+            # возраст — самих данных (последний ответ апстрима), а не последнего тика
+            age = RATES.age()
+            error = REFRESHER.last_error
             html = template_currencies.render(
-                currencies=CURRENCIES,
-                error=None,
+                currencies=REPO.currencies(),
+                error=f"{type(error).__name__}: {error}" if error else None,
+                age=None if age is None else int(age),
+                stale=RATES.stale,
+                retry_after=int(BREAKER.retry_after()),
                 navigation=self._nav()
             )
-            return self._send_html(html)
+            status = 502 if error and age is None else 200
+            return self._send_html(html, status=status)
 
         if path == "/api/currencies":
+            age = RATES.age()
             return self._send_json({
+                "age": None if age is None else int(age),
+                "stale": RATES.stale,
                 "currencies": [
                     {"id": c.id, "code": c.char_code, "name": c.name, "value": c.value, "nominal": c.nominal}
-                    for c in CURRENCIES
+                    for c in REPO.currencies()
                 ]
             })
 
@@ -231,7 +270,8 @@ class MyHandler(BaseHTTPRequestHandler):
 
         if path == "/update":
             try:
-                update_rates()
+                # кнопка «Обновить» идёт в апстрим, не дожидаясь конца ttl
+                REFRESHER.refresh_now(force=True)
             except Exception as e:
                 return self._send_html(f"Update failed: {type(e).__name__}: {e}", status=502)
             return self._redirect("/currencies")
@@ -270,11 +310,70 @@ class MyHandler(BaseHTTPRequestHandler):
         self.wfile.write(data)
 
 
-def run(host="127.0.0.1", port=8000):
-    httpd = HTTPServer((host, port), MyHandler)
-    print(f"Server started: http://{host}:{port}")
-    httpd.serve_forever()
+def open_history(path: str, compact_every: float | None = 24 * 3600) -> int:
+    """
+    Подключает HISTORY к журналу на диске: сначала выкидывает из файла точки
+    старше срока хранения, потом загружает остальные в память.
+    """
+    store = HistoryLog(path, compact_every=compact_every)
+    store.compact(HISTORY.retention_cutoff())
+    atexit.register(store.close)
+    return HISTORY.attach(store)
+
+
+def backfill_history(source: str, days: int = 90):
+    """Догружает архивные снимки за последние days дней, которых ещё нет в HISTORY."""
+    end = date.today()
+    res = backfill(HISTORY, source, end - timedelta(days=days - 1), end)
+    print(f"Backfill: {res.loaded} snapshots, {res.points} points, {res.skipped} days already present, "
+          f"{len(res.failed)} failed")
+    return res
+
+
+def run(host="127.0.0.1", port=8000, mode="single", workers=8, history_path=None, backfill_source=None,
+        sources=None):
+    """
+    mode:
+      single   — один поток, как HTTPServer;
+      threaded — пул из workers потоков.
+    prefork не поддерживается: пользователи и подписки живут в памяти процесса,
+    и у каждого воркера была бы своя копия — /subscribe в одном воркере и
+    /user в другом разошлись бы.
+
+    history_path — файл журнала RateHistory; без него история живёт только в памяти.
+    backfill_source — каталог или шаблон URL архивных снимков для графиков за 90 дней.
+    sources — URL фидов со схемой Valute (ЦБ и зеркала); по умолчанию только ЦБ.
+    """
+    if mode == "prefork":
+        raise ValueError("prefork mode is not supported: users and subscriptions live in process memory")
+    if sources:
+        use_sources(sources)
+    httpd = make_server(MyHandler, host, port, mode=mode, workers=workers)
+    print(f"Server started: http://{host}:{port} ({mode}, workers={workers})")
+    if history_path:
+        open_history(history_path)
+    if backfill_source:
+        backfill_history(backfill_source)
+    REFRESHER.start()
+    serve(httpd, mode, workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CurrenciesListApp")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    # prefork здесь нет: состояние в памяти процесса (см. run)
+    parser.add_argument("--mode", choices=[m for m in MODES if m != "prefork"], default="single")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--history", default=None, help="файл для хранения истории курсов")
+    parser.add_argument("--backfill", default=None, metavar="SOURCE",
+                        help="каталог со снимками YYYY-MM-DD.json или шаблон URL архива ЦБ")
+    parser.add_argument("--source", action="append", default=None, metavar="URL",
+                        help="источник курсов; можно указать несколько, побеждает самый быстрый")
+    args = parser.parse_args(argv)
+    run(args.host, args.port, mode=args.mode, workers=args.workers,
+        history_path=args.history, backfill_source=args.backfill, sources=args.source)
 
 
 if __name__ == "__main__":
-    run()
+    main()
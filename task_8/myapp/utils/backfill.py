@@ -0,0 +1,145 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from myapp.utils.currencies_api import HTTPStatusError, RatesSnapshot, fetch_raw, parse_feed
+
+# архив ЦБ: один снимок daily_json.js на каждый рабочий день
+ARCHIVE_URL = "https://www.cbr-xml-daily.ru/archive/%Y/%m/%d/daily_json.js"
+# локальный каталог: один файл на дату
+DIR_PATTERN = "%Y-%m-%d.json"
+
+
+@dataclass
+class BackfillResult:
+    loaded: int = 0
+    points: int = 0
+    skipped: int = 0
+    missing: int = 0
+    failed: dict = field(default_factory=dict)
+
+
+def resolve_source(source: str) -> str:
+    """Каталог превращается в шаблон файлов, URL/путь с %Y%m%d остаются как есть."""
+    if "://" not in source and os.path.isdir(source):
+        return os.path.join(source, DIR_PATTERN)
+    return source
+
+
+def load_snapshot(template: str, day: date, timeout: int = 10):
+    """
+    Снимок за день: (момент публикации, RatesSnapshot) или None, если за эту дату
+    снимка нет (выходные, праздники, нет файла).
+    """
+    location = day.strftime(template)
+    if "://" in location:
+        try:
+            _, _, raw = fetch_raw(location, timeout=timeout)
+        except HTTPStatusError as e:
+            if e.status == 404:
+                return None
+            raise
+    else:
+        try:
+            with open(location, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None
+
+    data = parse_feed(raw)
+    return _snapshot_time(data.get("Date"), day), RatesSnapshot(data["Valute"], data.get("Date"))
+
+
+def _snapshot_time(value, day: date) -> datetime:
+    # в фиде "2024-01-10T11:30:00+03:00", а история хранит местное время
+    if isinstance(value, str):
+        try:
+            ts = datetime.fromisoformat(value)
+        except ValueError:
+            ts = None
+        if ts is not None:
+            return ts.astimezone().replace(tzinfo=None) if ts.tzinfo else ts
+    return datetime(day.year, day.month, day.day)
+
+
+def backfill(history, source: str, start: date, end: date, codes=None,
+             workers: int = 8, chunk_days: int = 64, timeout: int = 10) -> BackfillResult:
+    """
+    Загружает исторические снимки за [start, end] в history.
+
+    - даты, за которые в истории уже есть точки, пропускаются;
+    - снимки качаются/читаются параллельно не более чем в workers потоков;
+    - точки складываются в history.extend пачками по chunk_days дней.
+    """
+    template = resolve_source(source)
+    present = history.days()
+    result = BackfillResult()
+
+    days = []
+    d = start
+    while d <= end:
+        if d in present:
+            result.skipped += 1
+        else:
+            days.append(d)
+        d += timedelta(days=1)
+
+    wanted = set(codes) if codes is not None else None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for offset in range(0, len(days), chunk_days):
+            chunk = days[offset:offset + chunk_days]
+            futures = {pool.submit(load_snapshot, template, d, timeout): d for d in chunk}
+            columns = {}
+            for fut in as_completed(futures):
+                day = futures[fut]
+                try:
+                    snapshot = fut.result()
+                except Exception as e:
+                    result.failed[day] = e
+                    continue
+                if snapshot is None:
+                    result.missing += 1
+                    continue
+                ts, rates = snapshot
+                result.loaded += 1
+                for code, value in rates.all().items():
+                    if wanted is not None and code not in wanted:
+                        continue
+                    columns.setdefault(code, []).append((ts, value))
+
+            for code, points in columns.items():
+                history.extend(code, points)
+                result.points += len(points)
+
+    return result
+
+
+def main(argv=None):
+    from myapp.utils.history import RateHistory
+    from myapp.utils.history_store import HistoryLog
+
+    parser = argparse.ArgumentParser(description="Загрузка архива курсов ЦБ в журнал истории")
+    parser.add_argument("history", help="файл журнала RateHistory")
+    parser.add_argument("--source", default=ARCHIVE_URL, help="каталог со снимками или шаблон URL/пути")
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    store = HistoryLog(args.history, batch_size=4096)
+    history = RateHistory(retention_days=max(args.days, 1), store=store)
+    end = date.today()
+    started = time.perf_counter()
+    res = backfill(history, args.source, end - timedelta(days=args.days - 1), end, workers=args.workers)
+    store.close()
+    elapsed = time.perf_counter() - started
+
+    print(f"snapshots: {res.loaded}, points: {res.points}, skipped: {res.skipped}, "
+          f"missing: {res.missing}, failed: {len(res.failed)} in {elapsed:.2f} s")
+    return 1 if res.failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,95 @@
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(ConnectionError):
+    """Вызов не выполнялся: апстрим считается недоступным."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"API unavailable: circuit open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Предохранитель перед апстримом.
+
+    - closed: вызовы идут как обычно, подряд идущие ошибки считаются;
+    - open: после failure_threshold ошибок подряд вызовы сразу получают
+      CircuitOpenError, не дожидаясь сетевого таймаута;
+    - half-open: через reset_timeout секунд пропускается один пробный вызов,
+      успех закрывает предохранитель, ошибка снова открывает его.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = float(reset_timeout)
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = None
+        self._probing = False
+
+        self.failures = 0
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+        return self._state
+
+    def retry_after(self) -> float:
+        """Сколько секунд осталось до пробного вызова (0, если предохранитель не открыт)."""
+        with self._lock:
+            if self._current_state() != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def call(self, fn, *args, **kwargs):
+        with self._lock:
+            state = self._current_state()
+            if state == OPEN or (state == HALF_OPEN and self._probing):
+                left = self.reset_timeout - (self._clock() - self._opened_at)
+                raise CircuitOpenError(max(0.0, left))
+            probe = state == HALF_OPEN
+            if probe:
+                self._probing = True
+
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self._record(ok=False, probe=probe)
+            raise
+        self._record(ok=True, probe=probe)
+        return result
+
+    def _record(self, ok: bool, probe: bool) -> None:
+        with self._lock:
+            if probe:
+                self._probing = False
+            if ok:
+                self.failures = 0
+                self._state = CLOSED
+                return
+            self.failures += 1
+            if probe or self.failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.trips += 1
+                self._state = OPEN
+                self._opened_at = self._clock()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self.failures = 0
+            self._probing = False
@@ -1,43 +1,127 @@
 import json
-import urllib.request
-import urllib.error
+
+from myapp.utils.fetcher import DEFAULT_FETCHER
 
 DEFAULT_URL = "https://www.cbr-xml-daily.ru/daily_json.js"
 
-def get_currencies(currency_codes: list, url: str = DEFAULT_URL, timeout: int = 10) -> dict:
-    if not isinstance(currency_codes, list):
-        raise TypeError("currency_codes must be a list")
 
-    try:
-        with urllib.request.urlopen(url, timeout=timeout) as resp:
-            raw = resp.read()
-    except (urllib.error.URLError, urllib.error.HTTPError, TimeoutError, OSError) as e:
-        raise ConnectionError(f"API unavailable: {e}") from e
+class HTTPStatusError(ConnectionError):
+    """Апстрим ответил, но кодом ошибки (4xx/5xx)."""
+
+    def __init__(self, status: int, url: str):
+        super().__init__(f"API unavailable: HTTP {status} for {url}")
+        self.status = status
+
 
+def fetch_raw(url: str = DEFAULT_URL, timeout: int = 10, headers: dict | None = None, fetcher=None):
+    """
+    Скачивает фид через пул соединений и возвращает (status, headers, raw).
+    Ответ 304 Not Modified не считается ошибкой: raw в этом случае пустой.
+    """
+    status, resp_headers, raw = (fetcher or DEFAULT_FETCHER).fetch(url, timeout=timeout, headers=headers)
+    if status == 304:
+        return 304, resp_headers, b""
+    if status >= 400:
+        raise HTTPStatusError(status, url)
+    return status, resp_headers, raw
+
+
+def parse_feed(raw: bytes) -> dict:
+    """Весь документ фида (Date, Valute, ...) с проверкой ключа Valute."""
     try:
         data = json.loads(raw.decode("utf-8"))
     except Exception as e:
         raise ValueError("Invalid JSON") from e
 
-    if "Valute" not in data:
+    if not isinstance(data, dict) or "Valute" not in data:
         raise KeyError("Valute")
 
-    valute = data["Valute"]
-    if not isinstance(valute, dict):
+    if not isinstance(data["Valute"], dict):
         raise TypeError("Valute must be a dict")
+    return data
+
+
+class RatesSnapshot:
+    """
+    Разобранный один раз фид: код -> (Value, Nominal, Previous) в компактном виде.
+    Запросы по любым кодам дальше идут без повторного json.loads и проверок;
+    ошибки отдельных записей запоминаются и выбрасываются только при обращении
+    к этому коду (KeyError / TypeError, как и раньше в get_currencies).
+    """
+    __slots__ = ("date", "_rates", "_errors")
+
+    def __init__(self, valute: dict, date: str | None = None):
+        self.date = date
+        self._rates = {}
+        self._errors = {}
+        for code, item in valute.items():
+            if not isinstance(item, dict) or "Value" not in item:
+                self._errors[code] = KeyError(f"{code}.Value")
+                continue
+            value = item["Value"]
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                self._errors[code] = TypeError(f"{code}.Value must be int/float")
+                continue
+            nominal = item.get("Nominal", 1)
+            previous = item.get("Previous")
+            self._rates[code] = (
+                float(value),
+                nominal if isinstance(nominal, int) and not isinstance(nominal, bool) else 1,
+                float(previous) if isinstance(previous, (int, float)) and not isinstance(previous, bool) else None,
+            )
+
+    @classmethod
+    def from_raw(cls, raw: bytes) -> "RatesSnapshot":
+        data = parse_feed(raw)
+        return cls(data["Valute"], data.get("Date"))
 
-    out = {}
-    for code in currency_codes:
-        if code not in valute:
+    def __contains__(self, code) -> bool:
+        return code in self._rates
+
+    def __len__(self) -> int:
+        return len(self._rates)
+
+    def codes(self) -> list:
+        return list(self._rates)
+
+    def _entry(self, code: str) -> tuple:
+        entry = self._rates.get(code)
+        if entry is None:
+            error = self._errors.get(code)
+            if error is not None:
+                raise type(error)(*error.args)
             raise KeyError(code)
-        item = valute[code]
-        if not isinstance(item, dict) or "Value" not in item:
-            raise KeyError(f"{code}.Value")
+        return entry
+
+    def value(self, code: str) -> float:
+        return self._entry(code)[0]
+
+    def nominal(self, code: str) -> int:
+        return self._entry(code)[1]
+
+    def previous(self, code: str) -> float | None:
+        return self._entry(code)[2]
+
+    def get(self, currency_codes: list) -> dict:
+        rates = self._rates
+        out = {}
+        for code in currency_codes:
+            entry = rates.get(code)
+            out[code] = entry[0] if entry is not None else self._entry(code)[0]
+        return out
 
-        value = item["Value"]
-        if isinstance(value, bool) or not isinstance(value, (int, float)):
-            raise TypeError(f"{code}.Value must be int/float")
+    def all(self) -> dict:
+        """Все корректные курсы за один проход."""
+        return {code: entry[0] for code, entry in self._rates.items()}
 
-        out[code] = float(value)
 
-    return out
+def get_snapshot(url: str = DEFAULT_URL, timeout: int = 10) -> RatesSnapshot:
+    _, _, raw = fetch_raw(url, timeout=timeout)
+    return RatesSnapshot.from_raw(raw)
+
+
+def get_currencies(currency_codes: list, url: str = DEFAULT_URL, timeout: int = 10) -> dict:
+    if not isinstance(currency_codes, list):
+        raise TypeError("currency_codes must be a list")
+
+    return get_snapshot(url, timeout=timeout).get(currency_codes)
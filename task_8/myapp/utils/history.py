@@ -1,19 +1,397 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 
-class RateHistory:
+# держим примерно 120 дней “на всякий”
+RETENTION_DAYS = 120
+
+# голову массива сдвигаем без копирования, а реально вырезаем старые точки,
+# только когда их накопилось больше половины (амортизированно O(1))
+_COMPACT_MIN = 1024
+
+BUCKETS = ("hour", "day")
+
+
+# последний посчитанный интервал каждого вида: точки обычно идут подряд,
+# и datetime.fromtimestamp не нужно звать на каждую
+_last_bucket = {}
+
+
+def _bucket_start(t: float, bucket: str) -> float:
+    last = _last_bucket.get(bucket)
+    if last is not None and last[0] <= t < last[1]:
+        return last[0]
+    # границы считаем по местному времени, как и подписи на графике
+    if bucket == "hour":
+        lt = time.localtime(t)
+        start = t - t % 1 - lt.tm_min * 60 - lt.tm_sec
+        end = start + 3600
+    else:
+        day = datetime.fromtimestamp(t).replace(hour=0, minute=0, second=0, microsecond=0)
+        start = day.timestamp()
+        end = (day + timedelta(days=1)).timestamp()
+    _last_bucket[bucket] = (start, end)
+    return start
+
+
+@dataclass(frozen=True)
+class Bucket:
+    start: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    mean: float
+    count: int
+
+
+class _Series:
+    """
+    Временной ряд одной валюты: два array('d') — epoch-секунды и значения,
+    отсортированные по времени. Точки до head считаются удалёнными.
+    """
+    __slots__ = ("ts", "values", "head")
+
     def __init__(self):
-        self._data = {}
+        self.ts = array("d")
+        self.values = array("d")
+        self.head = 0
+
+    def __len__(self):
+        return len(self.ts) - self.head
+
+    def append(self, t: float, value: float) -> None:
+        if not self.ts or t >= self.ts[-1]:
+            self.ts.append(t)
+            self.values.append(value)
+            return
+        # запоздавшая точка — вставляем на своё место
+        i = bisect_right(self.ts, t, self.head)
+        self.ts.insert(i, t)
+        self.values.insert(i, value)
+
+    def extend(self, ts: array, values: array) -> None:
+        """Пачка точек, уже отсортированных по времени."""
+        if not ts:
+            return
+        if not self.ts or ts[0] >= self.ts[-1]:
+            self.ts.extend(ts)
+            self.values.extend(values)
+            return
+        merged = sorted(zip(self.ts[self.head:] + ts, self.values[self.head:] + values), key=lambda p: p[0])
+        self.ts = array("d", (p[0] for p in merged))
+        self.values = array("d", (p[1] for p in merged))
+        self.head = 0
+
+    def prune(self, cutoff: float) -> None:
+        self.head = bisect_left(self.ts, cutoff, self.head)
+        if self.head >= _COMPACT_MIN and self.head * 2 >= len(self.ts):
+            del self.ts[:self.head]
+            del self.values[:self.head]
+            self.head = 0
+
+    def span(self, start: float, end: float | None = None) -> tuple[int, int]:
+        i = bisect_left(self.ts, start, self.head)
+        j = len(self.ts) if end is None else bisect_right(self.ts, end, i)
+        return i, j
+
+
+class _Rollup:
+    """
+    Агрегаты OHLC/mean по интервалам (час или день) для одной валюты,
+    обновляются на каждом add, а не пересчитываются при запросе.
+    """
+    __slots__ = ("starts", "first_ts", "last_ts", "open", "high", "low", "close", "total", "count", "head")
+
+    def __init__(self):
+        self.starts = array("d")
+        self.first_ts = array("d")
+        self.last_ts = array("d")
+        self.open = array("d")
+        self.high = array("d")
+        self.low = array("d")
+        self.close = array("d")
+        self.total = array("d")
+        self.count = array("q")
+        self.head = 0
+
+    def add(self, start: float, t: float, value: float) -> None:
+        if not self.starts or start > self.starts[-1]:
+            self._insert(len(self.starts), start, t, value)
+            return
+        i = bisect_left(self.starts, start, self.head)
+        if i == len(self.starts) or self.starts[i] != start:
+            self._insert(i, start, t, value)
+            return
+        if t < self.first_ts[i]:
+            self.first_ts[i] = t
+            self.open[i] = value
+        if t >= self.last_ts[i]:
+            self.last_ts[i] = t
+            self.close[i] = value
+        if value > self.high[i]:
+            self.high[i] = value
+        if value < self.low[i]:
+            self.low[i] = value
+        self.total[i] += value
+        self.count[i] += 1
+
+    def extend(self, ts, values, bucket: str) -> None:
+        """Пачка отсортированных точек: новые интервалы собираем в списки и добавляем разом."""
+        if not ts:
+            return
+        if self.starts and _bucket_start(ts[0], bucket) <= self.starts[-1]:
+            for t, v in zip(ts, values):
+                self.add(_bucket_start(t, bucket), t, v)
+            return
+
+        starts, first, last, op, hi, lo, cl, total, count = [], [], [], [], [], [], [], [], []
+        current = None
+        for t, v in zip(ts, values):
+            start = _bucket_start(t, bucket)
+            if start != current:
+                current = start
+                starts.append(start)
+                first.append(t)
+                last.append(t)
+                op.append(v)
+                hi.append(v)
+                lo.append(v)
+                cl.append(v)
+                total.append(v)
+                count.append(1)
+                continue
+            last[-1] = t
+            cl[-1] = v
+            if v > hi[-1]:
+                hi[-1] = v
+            if v < lo[-1]:
+                lo[-1] = v
+            total[-1] += v
+            count[-1] += 1
+
+        for col, items in ((self.starts, starts), (self.first_ts, first), (self.last_ts, last),
+                           (self.open, op), (self.high, hi), (self.low, lo), (self.close, cl),
+                           (self.total, total), (self.count, count)):
+            col.extend(items)
+
+    def _insert(self, i: int, start: float, t: float, value: float) -> None:
+        for col, v in ((self.starts, start), (self.first_ts, t), (self.last_ts, t), (self.open, value),
+                       (self.high, value), (self.low, value), (self.close, value), (self.total, value)):
+            col.insert(i, v)
+        self.count.insert(i, 1)
+
+    def prune(self, cutoff_start: float) -> None:
+        self.head = bisect_left(self.starts, cutoff_start, self.head)
+        if self.head >= _COMPACT_MIN and self.head * 2 >= len(self.starts):
+            for col in (self.starts, self.first_ts, self.last_ts, self.open, self.high,
+                        self.low, self.close, self.total, self.count):
+                del col[:self.head]
+            self.head = 0
+
+    def buckets(self, from_start: float) -> list[Bucket]:
+        i = bisect_left(self.starts, from_start, self.head)
+        return [
+            Bucket(datetime.fromtimestamp(self.starts[k]), self.open[k], self.high[k], self.low[k],
+                   self.close[k], self.total[k] / self.count[k], self.count[k])
+            for k in range(i, len(self.starts))
+        ]
+
+
+def lttb(xs, ys, threshold: int) -> list[int]:
+    """
+    Largest-Triangle-Three-Buckets: выбирает threshold индексов точек так,
+    чтобы форма линии сохранилась. Возвращает индексы в исходных массивах.
+    """
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        raise ValueError("threshold must be >= 3")
+
+    picked = [0]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # среднее следующего ведра — третья вершина треугольника
+        nxt_lo = int((i + 1) * every) + 1
+        nxt_hi = min(int((i + 2) * every) + 1, n)
+        span = nxt_hi - nxt_lo
+        avg_x = sum(xs[nxt_lo:nxt_hi]) / span
+        avg_y = sum(ys[nxt_lo:nxt_hi]) / span
+
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        best, best_area = lo, -1.0
+        for k in range(lo, hi):
+            area = abs((ax - avg_x) * (ys[k] - ay) - (ax - xs[k]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = k, area
+        picked.append(best)
+        a = best
+    picked.append(n - 1)
+    return picked
+
+
+class RateHistory:
+    """
+    История курсов в памяти. Если задан store (HistoryLog), каждая точка
+    дописывается и в журнал на диске, а attach() восстанавливает историю из него.
+    """
+
+    def __init__(self, retention_days: int = RETENTION_DAYS, store=None):
+        self.retention_days = retention_days
+        self._series = {}
+        self._rollups = {}
+        self._lock = threading.Lock()
+        self.store = None
+        if store is not None:
+            self.attach(store)
+
+    def attach(self, store) -> int:
+        """Загружает точки из журнала и дальше пишет новые в него. Возвращает число точек."""
+        by_code = {}
+        for code, t, value in store.replay():
+            columns = by_code.get(code)
+            if columns is None:
+                columns = by_code[code] = (array("d"), array("d"))
+            columns[0].append(t)
+            columns[1].append(value)
+
+        total = 0
+        with self._lock:
+            for code, (ts, values) in by_code.items():
+                self._extend_locked(code, ts, values)
+                total += len(ts)
+            self.store = store
+            store.retention_cutoff = self.retention_cutoff
+        return total
+
+    def detach(self):
+        """Перестаёт дописывать точки в журнал (история остаётся в памяти). Возвращает журнал."""
+        with self._lock:
+            store, self.store = self.store, None
+        return store
 
     def add(self, code: str, value: float, ts: datetime | None = None):
         ts = ts or datetime.now()
-        self._data.setdefault(code, []).append((ts, float(value)))
-        self._prune(code)
+        t = ts.timestamp()
+        value = float(value)
+        with self._lock:
+            series = self._series.get(code)
+            if series is None:
+                series = self._series[code] = _Series()
+            series.append(t, value)
+            rollups = self._rollups_for(code)
+            for bucket, rollup in rollups.items():
+                rollup.add(_bucket_start(t, bucket), t, value)
+            self._prune(series, rollups)
+            if self.store is not None:
+                self.store.append(code, t, value)
+
+    def extend(self, code: str, points) -> None:
+        """Добавляет сразу много точек (datetime, value) одной валюты."""
+        pairs = sorted((ts.timestamp(), float(v)) for ts, v in points)
+        ts = array("d", (p[0] for p in pairs))
+        values = array("d", (p[1] for p in pairs))
+        with self._lock:
+            self._extend_locked(code, ts, values)
+            if self.store is not None:
+                for t, v in pairs:
+                    self.store.append(code, t, v)
+
+    def _extend_locked(self, code: str, ts: array, values: array) -> None:
+        if any(ts[k] > ts[k + 1] for k in range(len(ts) - 1)):
+            order = sorted(range(len(ts)), key=ts.__getitem__)
+            ts = array("d", (ts[k] for k in order))
+            values = array("d", (values[k] for k in order))
+        # старое, чем срок хранения, даже не кладём
+        start = bisect_left(ts, self.retention_cutoff())
+        ts, values = ts[start:], values[start:]
+        if not ts:
+            return
+
+        series = self._series.get(code)
+        if series is None:
+            series = self._series[code] = _Series()
+        series.extend(ts, values)
+        rollups = self._rollups_for(code)
+        for bucket, rollup in rollups.items():
+            rollup.extend(ts, values, bucket)
+        self._prune(series, rollups)
+
+    def _rollups_for(self, code: str) -> dict:
+        rollups = self._rollups.get(code)
+        if rollups is None:
+            rollups = self._rollups[code] = {b: _Rollup() for b in BUCKETS}
+        return rollups
 
     def last_n_days(self, code: str, days: int = 90):
-        cutoff = datetime.now() - timedelta(days=days)
-        return [(t, v) for (t, v) in self._data.get(code, []) if t >= cutoff]
+        cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+        with self._lock:
+            series = self._series.get(code)
+            if series is None:
+                return []
+            i, j = series.span(cutoff)
+            ts = series.ts[i:j]
+            values = series.values[i:j]
+        return [(datetime.fromtimestamp(t), v) for t, v in zip(ts, values)]
+
+    def rollup(self, code: str, days: int = 90, bucket: str = "day") -> list[Bucket]:
+        """OHLC и среднее по часам или дням за последние days дней."""
+        if bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of {BUCKETS}")
+        cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+        with self._lock:
+            rollups = self._rollups.get(code)
+            if rollups is None:
+                return []
+            return rollups[bucket].buckets(_bucket_start(cutoff, bucket))
+
+    def downsample(self, code: str, days: int = 90, max_points: int = 200):
+        """Не больше max_points точек за days дней, отобранных LTTB."""
+        cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+        with self._lock:
+            series = self._series.get(code)
+            if series is None:
+                return []
+            i, j = series.span(cutoff)
+            ts = series.ts[i:j]
+            values = series.values[i:j]
+        return [(datetime.fromtimestamp(ts[k]), values[k]) for k in lttb(ts, values, max_points)]
+
+    def days(self, code: str | None = None) -> set:
+        """Даты (date), за которые есть хотя бы одна точка — по валюте или по всем."""
+        with self._lock:
+            if code is None:
+                rollups = list(self._rollups.values())
+            else:
+                rollups = [self._rollups[code]] if code in self._rollups else []
+            out = set()
+            for r in rollups:
+                day = r["day"]
+                out.update(datetime.fromtimestamp(day.starts[k]).date()
+                           for k in range(day.head, len(day.starts)))
+        return out
+
+    def codes(self) -> list[str]:
+        with self._lock:
+            return [code for code, series in self._series.items() if len(series)]
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(s) for s in self._series.values())
+
+    def retention_cutoff(self) -> float:
+        """Epoch-секунды, старше которых точки не хранятся."""
+        return (datetime.now() - timedelta(days=self.retention_days)).timestamp()
 
-    def _prune(self, code: str):
-        # держим примерно 120 дней “на всякий”
-        cutoff = datetime.now() - timedelta(days=120)
-        self._data[code] = [(t, v) for (t, v) in self._data.get(code, []) if t >= cutoff]
+    def _prune(self, series: _Series, rollups: dict):
+        cutoff = self.retention_cutoff()
+        series.prune(cutoff)
+        for bucket, rollup in rollups.items():
+            rollup.prune(_bucket_start(cutoff, bucket))
@@ -0,0 +1,130 @@
+import mmap
+import os
+import struct
+import threading
+import time
+
+MAGIC = b"RHLOG01\n"
+# код валюты (3 байта ASCII), epoch-секунды, значение
+RECORD = struct.Struct("<3sdd")
+
+
+class HistoryLog:
+    """
+    Журнал точек RateHistory на диске: заголовок MAGIC и дальше записи
+    фиксированной длины RECORD, только дописываются в конец.
+
+    - append() копит записи в памяти и сбрасывает их одним write() каждые
+      batch_size точек или flush_interval секунд;
+    - replay() читает файл через mmap и struct.iter_unpack без построчного
+      разбора; недописанный хвост после сбоя игнорируется;
+    - compact(cutoff) переписывает файл без точек старше cutoff.
+    """
+
+    def __init__(self, path: str, batch_size: int = 256, flush_interval: float = 1.0,
+                 compact_every: float | None = None, clock=time.monotonic):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_every = compact_every
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._fh = None
+        self._last_flush = clock()
+        self._last_compact = clock()
+        self.retention_cutoff = None
+
+    def append(self, code: str, t: float, value: float) -> None:
+        raw = code.encode("ascii")
+        if len(raw) != 3:
+            raise ValueError(f"currency code must be 3 ASCII letters: {code!r}")
+        with self._lock:
+            self._buffer.append(RECORD.pack(raw, t, value))
+            if len(self._buffer) >= self.batch_size or self._clock() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        self._last_flush = self._clock()
+        if self._buffer:
+            fh = self._open_locked()
+            fh.write(b"".join(self._buffer))
+            fh.flush()
+            self._buffer.clear()
+        if (self.compact_every is not None and self.retention_cutoff is not None
+                and self._clock() - self._last_compact >= self.compact_every):
+            self._compact_locked(self.retention_cutoff())
+
+    def _open_locked(self):
+        if self._fh is None:
+            # O_APPEND: несколько процессов могут дописывать в один файл,
+            # каждая пачка уходит одним write() целыми записями
+            self._fh = open(self.path, "ab")
+            if self._fh.tell() == 0:
+                self._fh.write(MAGIC)
+        return self._fh
+
+    def replay(self):
+        """Итератор (code, t, value) по всем записям файла."""
+        self.flush()
+        yield from self._read_records()
+
+    def _read_records(self):
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= len(MAGIC):
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm[:len(MAGIC)] != MAGIC:
+                    raise ValueError(f"{self.path}: not a history log")
+                end = len(MAGIC) + (size - len(MAGIC)) // RECORD.size * RECORD.size
+                view = memoryview(mm)
+                records = RECORD.iter_unpack(view[len(MAGIC):end])
+                try:
+                    for raw, t, value in records:
+                        yield raw.decode("ascii"), t, value
+                finally:
+                    # mmap нельзя закрыть, пока на него есть ссылки из буферов
+                    del records
+                    view.release()
+
+    def compact(self, cutoff: float) -> int:
+        """Оставляет только точки не старше cutoff. Возвращает число оставшихся."""
+        with self._lock:
+            return self._compact_locked(cutoff)
+
+    def _compact_locked(self, cutoff: float) -> int:
+        if self._buffer:
+            self._open_locked().write(b"".join(self._buffer))
+            self._buffer.clear()
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        self._last_compact = self._clock()
+
+        kept = [RECORD.pack(code.encode("ascii"), t, v)
+                for code, t, v in self._read_records() if t >= cutoff]
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as out:
+            out.write(MAGIC)
+            out.write(b"".join(kept))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, self.path)
+        return len(kept)
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from myapp.utils.currencies_api import RatesSnapshot, fetch_raw
+
+# вес нового замера в скользящей средней задержки источника
+EWMA_ALPHA = 0.3
+
+
+class MultiSourceProvider:
+    """
+    Несколько источников фида с одинаковой схемой Valute (основной URL ЦБ и зеркала).
+
+    Запросы «хеджируются»: сначала опрашивается самый быстрый по истории источник,
+    если за hedge_after секунд ответа нет (или он упал) — параллельно запускается
+    следующий, и так далее. Побеждает первый корректный ответ; опоздавшие
+    дорабатывают в фоне и только обновляют статистику. Если за budget секунд
+    ни один источник не ответил, бросается ConnectionError.
+
+    fetch() возвращает (status, headers, RatesSnapshot), на 304 snapshot = None.
+    """
+
+    def __init__(self, urls: list, hedge_after: float = 0.5, budget: float = 5.0,
+                 fetch=fetch_raw, clock=time.monotonic):
+        if not urls:
+            raise ValueError("at least one source url is required")
+        self.urls = list(dict.fromkeys(urls))
+        self.hedge_after = hedge_after
+        self.budget = budget
+        self._fetch = fetch
+        self._clock = clock
+        self._pool = None
+        self._pool_pid = None
+
+        self._lock = threading.Lock()
+        self.latency = {}
+        self.failures = {url: 0 for url in self.urls}
+        self.last_source = None
+
+    def ranked(self) -> list:
+        """Источники от быстрого к медленному; ещё не опрошенные — в исходном порядке после основного."""
+        with self._lock:
+            order = {url: i for i, url in enumerate(self.urls)}
+            latency = dict(self.latency)
+            failures = dict(self.failures)
+        return sorted(self.urls, key=lambda u: (failures[u] > 0, latency.get(u, float("inf")), order[u]))
+
+    def fetch(self, timeout: float = 10, headers: dict | None = None):
+        started = self._clock()
+        deadline = started + self.budget
+        pending = {}
+        queue = self.ranked()
+        errors = []
+        pool = self._executor()
+
+        def launch():
+            url = queue.pop(0)
+            pending[pool.submit(self._attempt, url, timeout, headers)] = url
+
+        launch()
+        while pending:
+            # пока есть кого подключать, ждём не дольше hedge_after
+            left = deadline - self._clock()
+            if left <= 0:
+                break
+            wait_for = min(left, self.hedge_after) if queue else left
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            if not done:
+                if queue:
+                    launch()
+                continue
+            for fut in done:
+                url = pending.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    errors.append(f"{url}: {type(e).__name__}: {e}")
+                    # упавший источник сразу заменяем следующим, не дожидаясь hedge_after
+                    if queue:
+                        launch()
+                    continue
+                with self._lock:
+                    self.last_source = url
+                return result
+
+        detail = "; ".join(errors) if errors else f"no response within {self.budget:g}s"
+        raise ConnectionError(f"API unavailable: all sources failed ({detail})")
+
+    def _attempt(self, url, timeout, headers):
+        t0 = self._clock()
+        try:
+            status, resp_headers, raw = self._fetch(url, timeout=timeout, headers=headers)
+            snapshot = None if status == 304 else RatesSnapshot.from_raw(raw)
+        except Exception:
+            with self._lock:
+                self.failures[url] += 1
+            raise
+        elapsed = self._clock() - t0
+        with self._lock:
+            prev = self.latency.get(url)
+            self.latency[url] = elapsed if prev is None else prev + EWMA_ALPHA * (elapsed - prev)
+            self.failures[url] = 0
+        return status, resp_headers, snapshot
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # потоки пула не переживают fork: в воркере prefork заводим свой пул
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=len(self.urls), thread_name_prefix="rates-source")
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
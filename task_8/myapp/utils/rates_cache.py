@@ -0,0 +1,156 @@
+import threading
+import time
+
+from myapp.utils.currencies_api import DEFAULT_URL, RatesSnapshot, fetch_raw
+
+
+class _Flight:
+    """Один загрузочный запрос, результат которого ждут все конкурентные вызовы."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RatesCache:
+    """
+    Кэш разобранного фида курсов ЦБ (RatesSnapshot) перед get_currencies.
+
+    - пока не истёк ttl, данные отдаются из памяти без сети;
+    - после ttl делается условный запрос (If-None-Match / If-Modified-Since),
+      ответ 304 лишь продлевает срок жизни уже разобранных данных;
+    - одновременные промахи ждут один общий запрос (single-flight);
+    - если задан provider (MultiSourceProvider), фид берётся у самого быстрого
+      из нескольких источников вместо одного url;
+    - запросы идут через breaker (CircuitBreaker), если он задан;
+    - пока снимок просрочен не больше чем на max_stale секунд, при ошибке
+      апстрима (или открытом breaker) отдаётся старый снимок, а stale = True.
+      Во время уже идущего обновления такой снимок отдаётся сразу, без ожидания.
+
+    force=True в get_snapshot/get_currencies идёт в сеть, даже если ttl не
+    истёк (кнопка «Обновить»): запрос остаётся условным, а при ошибке так же
+    отдаётся старый снимок.
+    """
+
+    def __init__(self, url: str = DEFAULT_URL, ttl: float = 300.0, timeout: int = 10, clock=time.monotonic,
+                 provider=None, breaker=None, max_stale: float = 0.0):
+        self.url = url
+        self.provider = provider
+        self.breaker = breaker
+        self.max_stale = float(max_stale)
+        self.ttl = float(ttl)
+        self.timeout = timeout
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._flight = None
+        self._snapshot = None
+        self._etag = None
+        self._last_modified = None
+        self._fetched_at = None
+
+        self.fetches = 0
+        self.not_modified = 0
+        self.last_error = None
+
+    def _is_fresh(self) -> bool:
+        return self._snapshot is not None and self._clock() - self._fetched_at < self.ttl
+
+    def _can_serve_stale(self) -> bool:
+        return self._snapshot is not None and self._clock() - self._fetched_at < self.ttl + self.max_stale
+
+    def age(self) -> float | None:
+        """Возраст снимка в секундах (None, если данных ещё нет)."""
+        with self._lock:
+            if self._snapshot is None:
+                return None
+            return self._clock() - self._fetched_at
+
+    @property
+    def stale(self) -> bool:
+        """Отдаётся просроченный снимок, потому что последнее обновление не удалось."""
+        with self._lock:
+            return self.last_error is not None and self._snapshot is not None and not self._is_fresh()
+
+    def get_snapshot(self, force: bool = False) -> RatesSnapshot:
+        with self._lock:
+            if not force and self._is_fresh():
+                return self._snapshot
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = _Flight()
+            elif not force and self._can_serve_stale():
+                return self._snapshot
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._revalidate()
+            self.last_error = None
+            return flight.result
+        except Exception as e:
+            self.last_error = e
+            with self._lock:
+                stale = self._snapshot if self._can_serve_stale() else None
+            if stale is None:
+                flight.error = e
+                raise
+            flight.result = stale
+            return stale
+        finally:
+            with self._lock:
+                self._flight = None
+            flight.done.set()
+
+    def get_currencies(self, currency_codes: list, force: bool = False) -> dict:
+        if not isinstance(currency_codes, list):
+            raise TypeError("currency_codes must be a list")
+        return self.get_snapshot(force=force).get(currency_codes)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._fetched_at = None
+            self._snapshot = None
+            self._etag = None
+            self._last_modified = None
+
+    def _revalidate(self) -> RatesSnapshot:
+        if self.breaker is not None:
+            return self.breaker.call(self._load)
+        return self._load()
+
+    def _load(self) -> RatesSnapshot:
+        headers = {}
+        if self._snapshot is not None:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+
+        if self.provider is not None:
+            status, resp_headers, snapshot = self.provider.fetch(timeout=self.timeout, headers=headers)
+        else:
+            status, resp_headers, raw = fetch_raw(self.url, timeout=self.timeout, headers=headers)
+            snapshot = None if status == 304 else RatesSnapshot.from_raw(raw)
+        self.fetches += 1
+
+        if status == 304 and self._snapshot is not None:
+            self.not_modified += 1
+            with self._lock:
+                self._fetched_at = self._clock()
+            return self._snapshot
+        if snapshot is None:
+            raise ValueError("Invalid JSON")
+
+        with self._lock:
+            self._snapshot = snapshot
+            self._etag = resp_headers.get("ETag") if resp_headers else None
+            self._last_modified = resp_headers.get("Last-Modified") if resp_headers else None
+            self._fetched_at = self._clock()
+        return snapshot
@@ -0,0 +1,78 @@
+import random
+import threading
+import time
+
+
+class RefreshScheduler:
+    """
+    Фоновый поток, который периодически вызывает job().
+
+    При успехе следующий запуск через interval секунд, при ошибке — через
+    экспоненциально растущую паузу (retry_delay * 2**n, не больше max_backoff)
+    со случайным разбросом ±jitter, чтобы несколько процессов не били в апстрим
+    одновременно.
+    """
+
+    def __init__(self, job, interval: float = 300.0, retry_delay: float = 5.0,
+                 max_backoff: float = 600.0, jitter: float = 0.2, rng=random.random):
+        self.job = job
+        self.interval = float(interval)
+        self.retry_delay = float(retry_delay)
+        self.max_backoff = float(max_backoff)
+        self.jitter = float(jitter)
+        self._rng = rng
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.failures = 0
+        self.last_success = None
+        self.last_error = None
+
+    def next_delay(self) -> float:
+        if self.failures == 0:
+            base = self.interval
+        else:
+            base = min(self.max_backoff, self.retry_delay * 2 ** (self.failures - 1))
+        return base * (1 + self.jitter * (2 * self._rng() - 1))
+
+    def refresh_now(self, **kwargs) -> None:
+        """Синхронный запуск job(**kwargs); исключение пробрасывается вызывающему."""
+        with self._lock:
+            try:
+                self.job(**kwargs)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = e
+                raise
+            self.failures = 0
+            self.last_error = None
+            self.last_success = time.time()
+
+    def age(self) -> float | None:
+        """Сколько секунд прошло с последнего успешного обновления."""
+        if self.last_success is None:
+            return None
+        return time.time() - self.last_success
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh_now()
+            except Exception:
+                pass
+            self._stop.wait(self.next_delay())
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="rates-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,69 @@
+import unittest
+import json
+import os
+import tempfile
+from datetime import date, time, timedelta
+
+from myapp.utils.backfill import backfill
+from myapp.utils.history import RateHistory
+
+
+def write_snapshot(dirname, day, valute):
+    doc = {"Date": f"{day.isoformat()}T11:30:00", "Valute": valute}
+    with open(os.path.join(dirname, f"{day.isoformat()}.json"), "w", encoding="utf-8") as f:
+        json.dump(doc, f)
+
+
+class TestBackfill(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.end = date.today() - timedelta(days=1)
+        self.start = self.end - timedelta(days=29)
+        day = self.start
+        i = 0
+        while day <= self.end:
+            # выходных в архиве нет
+            if day.weekday() < 5:
+                write_snapshot(self.dir.name, day, {
+                    "USD": {"Value": 90.0 + i, "Nominal": 1},
+                    "EUR": {"Value": 100.0 + i, "Nominal": 1},
+                    "BAD": {"Value": "x"},
+                })
+            day += timedelta(days=1)
+            i += 1
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_loads_snapshots_into_history(self):
+        h = RateHistory()
+        res = backfill(h, self.dir.name, self.start, self.end, workers=4, chunk_days=7)
+        weekdays = sum(1 for k in range(30) if (self.start + timedelta(days=k)).weekday() < 5)
+
+        self.assertEqual(res.loaded, weekdays)
+        self.assertEqual(res.missing, 30 - weekdays)
+        self.assertEqual(res.failed, {})
+        self.assertEqual(res.points, 2 * weekdays)
+
+        points = h.last_n_days("USD", days=90)
+        self.assertEqual(len(points), weekdays)
+        self.assertEqual(points[0][0].time(), time(11, 30))
+        self.assertEqual([t for t, _ in points], sorted(t for t, _ in points))
+        self.assertEqual(sorted(h.codes()), ["EUR", "USD"])
+
+    def test_skips_dates_already_present(self):
+        h = RateHistory()
+        backfill(h, self.dir.name, self.start, self.end)
+        again = backfill(h, self.dir.name, self.start, self.end)
+        self.assertEqual(again.loaded, 0)
+        self.assertEqual(again.skipped + again.missing, 30)
+
+    def test_codes_filter_and_broken_file(self):
+        broken = self.start + timedelta(days=3)
+        with open(os.path.join(self.dir.name, f"{broken.isoformat()}.json"), "w") as f:
+            f.write("{not json")
+        h = RateHistory()
+        res = backfill(h, self.dir.name, self.start, self.end, codes=["EUR"])
+        self.assertEqual(h.codes(), ["EUR"])
+        self.assertEqual(list(res.failed), [broken])
+        self.assertIsInstance(res.failed[broken], ValueError)
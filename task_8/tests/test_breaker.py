@@ -0,0 +1,118 @@
+import unittest
+import json
+import urllib.parse
+
+from myapp.utils.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from myapp.utils.rates_cache import RatesCache
+
+
+def make_data_url(obj) -> str:
+    payload = json.dumps(obj).encode("utf-8")
+    return "data:application/json," + urllib.parse.quote(payload.decode("utf-8"))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def boom():
+    raise ConnectionError("down")
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=self.clock)
+
+    def test_opens_after_threshold(self):
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                self.breaker.call(boom)
+        self.assertEqual(self.breaker.state, OPEN)
+
+        calls = []
+        with self.assertRaises(CircuitOpenError) as cm:
+            self.breaker.call(calls.append, 1)
+        self.assertEqual(calls, [])
+        self.assertEqual(cm.exception.retry_after, 30)
+        self.assertEqual(self.breaker.trips, 1)
+
+    def test_success_resets_failures(self):
+        with self.assertRaises(ConnectionError):
+            self.breaker.call(boom)
+        self.assertEqual(self.breaker.call(lambda: 42), 42)
+        with self.assertRaises(ConnectionError):
+            self.breaker.call(boom)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_probe(self):
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                self.breaker.call(boom)
+        self.clock.now = 30
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+        # неудачная проба снова открывает предохранитель на reset_timeout
+        with self.assertRaises(ConnectionError):
+            self.breaker.call(boom)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.retry_after(), 30)
+
+        self.clock.now = 60
+        self.assertEqual(self.breaker.call(lambda: "ok"), "ok")
+        self.assertEqual(self.breaker.state, CLOSED)
+
+
+class TestStaleRates(unittest.TestCase):
+    def test_serves_stale_while_upstream_is_down(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+        cache = RatesCache(make_data_url({"Valute": {"USD": {"Value": 1.5}}}), ttl=60, clock=clock,
+                           breaker=breaker, max_stale=3600)
+        self.assertEqual(cache.get_currencies(["USD"]), {"USD": 1.5})
+        self.assertFalse(cache.stale)
+
+        cache.url = "data:application/json,%7Bbroken"
+        clock.now = 61
+        self.assertEqual(cache.get_currencies(["USD"]), {"USD": 1.5})
+        self.assertTrue(cache.stale)
+        self.assertEqual(breaker.state, OPEN)
+
+        # пока предохранитель открыт, апстрим не трогаем вовсе
+        fetches = cache.fetches
+        cache.get_currencies(["USD"])
+        self.assertEqual(cache.fetches, fetches)
+        self.assertIsInstance(cache.last_error, CircuitOpenError)
+
+        cache.url = make_data_url({"Valute": {"USD": {"Value": 2.5}}})
+        clock.now = 100
+        self.assertEqual(cache.get_currencies(["USD"]), {"USD": 2.5})
+        self.assertFalse(cache.stale)
+
+    def test_forced_refresh_falls_back_to_snapshot(self):
+        clock = FakeClock()
+        cache = RatesCache(make_data_url({"Valute": {"USD": {"Value": 1.5}}}), ttl=60, clock=clock, max_stale=10)
+        cache.get_currencies(["USD"])
+        cache.url = "data:application/json,%7Bbroken"
+        clock.now = 5
+        self.assertEqual(cache.get_currencies(["USD"], force=True), {"USD": 1.5})
+        self.assertIsInstance(cache.last_error, ValueError)
+
+    def test_too_old_snapshot_is_not_served(self):
+        clock = FakeClock()
+        cache = RatesCache(make_data_url({"Valute": {"USD": {"Value": 1.5}}}), ttl=60, clock=clock, max_stale=10)
+        cache.get_currencies(["USD"])
+        cache.url = "data:application/json,%7Bbroken"
+        clock.now = 65
+        self.assertEqual(cache.get_currencies(["USD"]), {"USD": 1.5})
+        clock.now = 71
+        with self.assertRaises(ValueError):
+            cache.get_currencies(["USD"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,9 +3,15 @@ import threading
 import http.client
 import socket
 import time
+import json
+import urllib.parse
+from unittest.mock import patch
 
 from http.server import HTTPServer
+from myapp import myapp
 from myapp.myapp import MyHandler
+from myapp.utils.history import RateHistory
+from myapp.utils.rates_cache import RatesCache
 
 
 def get_free_port():
@@ -68,3 +74,74 @@ class TestController(unittest.TestCase):
         status, body = self.fetch("/currencies")
         # может быть 200 или 502 если нет сети — тест не должен падать
         self.assertIn(status, (200, 502))
+
+
+def data_url(obj) -> str:
+    return "data:application/json," + urllib.parse.quote(json.dumps(obj))
+
+
+class TestUpdateRates(unittest.TestCase):
+    def setUp(self):
+        feed = {"Date": "2025-01-10", "Valute": {"USD": {"Value": 90.0}, "EUR": {"Value": 95.0},
+                                                  "GBP": {"Value": 110.0}}}
+        self.now = 0.0
+        self.rates = RatesCache(data_url(feed), ttl=300, clock=lambda: self.now)
+        self.history = RateHistory()
+        patches = [
+            patch.object(myapp, "RATES", self.rates),
+            patch.object(myapp, "HISTORY", self.history),
+            patch.object(myapp, "_RECORDED_SNAPSHOT", None),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_cached_snapshot_is_recorded_once(self):
+        myapp.update_rates()
+        myapp.update_rates()
+        self.assertEqual(len(self.history), 3)
+
+    def test_same_feed_date_is_not_recorded_again(self):
+        myapp.update_rates()
+        myapp.update_rates(force=True)
+        self.assertEqual(self.rates.fetches, 2)
+        self.assertEqual(len(self.history), 3)
+
+    def test_scheduled_tick_revalidates_inside_ttl(self):
+        myapp.update_rates()
+        self.now = 290
+        myapp.REFRESHER.job()
+        self.assertEqual(self.rates.fetches, 2)
+        self.assertEqual(self.rates.age(), 0)
+
+    def test_api_reports_data_age(self):
+        myapp.update_rates()
+        self.now = 290
+        server = ServerThread(get_free_port())
+        server.start()
+        self.addCleanup(server.stop)
+        conn = http.client.HTTPConnection("127.0.0.1", server.httpd.server_address[1], timeout=3)
+        conn.request("GET", "/api/currencies")
+        data = json.loads(conn.getresponse().read())
+        conn.close()
+        self.assertEqual(data["age"], 290)
+
+    def test_forced_refresh_reports_upstream_error(self):
+        myapp.update_rates()
+        self.rates.url = "data:application/json,%7Bbroken"
+        with self.assertRaises(ValueError):
+            myapp.update_rates(force=True)
+        self.assertEqual(len(self.history), 3)
+
+
+class TestPreforkRejected(unittest.TestCase):
+    def test_run_refuses_prefork(self):
+        with patch.object(myapp, "make_server") as make_server:
+            with self.assertRaises(ValueError):
+                myapp.run(port=get_free_port(), mode="prefork")
+        make_server.assert_not_called()
+
+    def test_cli_has_no_prefork(self):
+        with patch("sys.stderr"):
+            with self.assertRaises(SystemExit):
+                myapp.main(["--mode", "prefork"])
@@ -0,0 +1,86 @@
+import unittest
+from datetime import datetime, timedelta
+
+from myapp.utils.history import RateHistory
+
+
+class TestRateHistory(unittest.TestCase):
+    def test_last_n_days_filters_and_keeps_order(self):
+        h = RateHistory()
+        now = datetime.now()
+        h.add("USD", 3.0, now - timedelta(days=1))
+        h.add("USD", 1.0, now - timedelta(days=100))
+        h.add("USD", 2.0, now - timedelta(days=10))
+
+        points = h.last_n_days("USD", days=90)
+        self.assertEqual([v for _, v in points], [2.0, 3.0])
+        self.assertIsInstance(points[0][0], datetime)
+        self.assertEqual(len(h.last_n_days("USD", days=120)), 3)
+        self.assertEqual(h.last_n_days("EUR"), [])
+
+    def test_prune_drops_points_past_retention(self):
+        h = RateHistory(retention_days=30)
+        now = datetime.now()
+        h.add("USD", 1.0, now - timedelta(days=40))
+        h.add("USD", 2.0, now - timedelta(days=1))
+        self.assertEqual([v for _, v in h.last_n_days("USD", days=365)], [2.0])
+        self.assertEqual(len(h), 1)
+
+    def test_compaction_keeps_recent_points(self):
+        h = RateHistory(retention_days=1)
+        start = datetime.now() - timedelta(days=3)
+        for i in range(5000):
+            h.add("EUR", float(i), start + timedelta(minutes=i))
+        points = h.last_n_days("EUR", days=1)
+        # все точки моложе суток сохранились и идут подряд
+        self.assertEqual(len(points), len(h))
+        values = [v for _, v in points]
+        self.assertEqual(values, sorted(values))
+        self.assertEqual(values[-1], 4999.0)
+        self.assertLess(len(h._series["EUR"].ts), 5000)
+
+
+class TestRateHistoryAggregation(unittest.TestCase):
+    def test_daily_rollup_ohlc(self):
+        h = RateHistory()
+        day = (datetime.now() - timedelta(days=2)).replace(hour=10, minute=0, second=0, microsecond=0)
+        for minutes, v in ((0, 5.0), (30, 7.0), (60, 4.0), (90, 6.0)):
+            h.add("USD", v, day + timedelta(minutes=minutes))
+        # запоздавшая точка раньше остальных становится open
+        h.add("USD", 3.0, day - timedelta(minutes=5))
+        h.add("USD", 9.0, day + timedelta(days=1))
+
+        buckets = h.rollup("USD", days=90, bucket="day")
+        self.assertEqual(len(buckets), 2)
+        b = buckets[0]
+        self.assertEqual(b.start, day.replace(hour=0))
+        self.assertEqual((b.open, b.high, b.low, b.close, b.count), (3.0, 7.0, 3.0, 6.0, 5))
+        self.assertAlmostEqual(b.mean, 5.0)
+        self.assertEqual(buckets[1].close, 9.0)
+
+        hours = h.rollup("USD", days=90, bucket="hour")
+        self.assertEqual([x.count for x in hours], [1, 2, 2, 1])
+
+        with self.assertRaises(ValueError):
+            h.rollup("USD", bucket="week")
+
+    def test_rollup_size_independent_of_refresh_rate(self):
+        h = RateHistory()
+        start = datetime.now() - timedelta(days=10)
+        for i in range(10 * 24 * 6):
+            h.add("EUR", 100.0 + i % 7, start + timedelta(minutes=10 * i))
+        self.assertLessEqual(len(h.rollup("EUR", days=90)), 11)
+
+    def test_downsample_keeps_endpoints_and_peaks(self):
+        h = RateHistory()
+        start = datetime.now() - timedelta(days=5)
+        n = 1000
+        for i in range(n):
+            h.add("GBP", 500.0 if i == 400 else 1.0, start + timedelta(minutes=i))
+        points = h.downsample("GBP", days=90, max_points=50)
+        self.assertEqual(len(points), 50)
+        values = [v for _, v in points]
+        self.assertIn(500.0, values)
+        raw = h.last_n_days("GBP", days=90)
+        self.assertEqual(points[0], raw[0])
+        self.assertEqual(points[-1], raw[-1])
@@ -0,0 +1,73 @@
+import unittest
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from myapp.utils.history import RateHistory
+from myapp.utils.history_store import HistoryLog, MAGIC, RECORD
+
+
+class TestHistoryLog(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "history.bin")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_batched_append_and_replay(self):
+        log = HistoryLog(self.path, batch_size=3, flush_interval=3600)
+        log.append("USD", 1.0, 90.0)
+        log.append("EUR", 2.0, 100.0)
+        self.assertFalse(os.path.exists(self.path))
+        log.append("USD", 3.0, 91.0)
+        self.assertEqual(os.path.getsize(self.path), len(MAGIC) + 3 * RECORD.size)
+        log.append("GBP", 4.0, 110.0)
+        self.assertEqual(list(log.replay())[-1], ("GBP", 4.0, 110.0))
+        log.close()
+
+    def test_torn_tail_is_ignored(self):
+        log = HistoryLog(self.path, batch_size=1)
+        log.append("USD", 1.0, 90.0)
+        log.close()
+        with open(self.path, "ab") as f:
+            f.write(b"\x01\x02\x03")
+        self.assertEqual(list(HistoryLog(self.path).replay()), [("USD", 1.0, 90.0)])
+
+    def test_compact_drops_old_points(self):
+        log = HistoryLog(self.path, batch_size=1)
+        for t in range(10):
+            log.append("USD", float(t), float(t))
+        self.assertEqual(log.compact(5.0), 5)
+        log.append("USD", 10.0, 10.0)
+        self.assertEqual([t for _, t, _ in log.replay()], [5.0, 6.0, 7.0, 8.0, 9.0, 10.0])
+        log.close()
+
+    def test_history_survives_restart(self):
+        now = datetime.now()
+        h = RateHistory(store=HistoryLog(self.path))
+        h.add("USD", 90.0, now - timedelta(days=2))
+        h.add("USD", 91.0, now - timedelta(days=1))
+        h.add("EUR", 100.0, now - timedelta(days=1))
+        h.store.close()
+
+        restored = RateHistory()
+        self.assertEqual(restored.attach(HistoryLog(self.path)), 3)
+        self.assertEqual([v for _, v in restored.last_n_days("USD")], [90.0, 91.0])
+        self.assertEqual(len(restored.rollup("USD", bucket="day")), 2)
+        self.assertEqual(sorted(restored.codes()), ["EUR", "USD"])
+
+    def test_detached_history_stops_writing(self):
+        h = RateHistory(store=HistoryLog(self.path, batch_size=1))
+        h.add("USD", 90.0)
+        store = h.detach()
+        h.add("USD", 91.0)
+        self.assertEqual(len(h), 2)
+        self.assertEqual([v for _, _, v in store.replay()], [90.0])
+        store.close()
+
+    def test_bad_file_rejected(self):
+        with open(self.path, "wb") as f:
+            f.write(b"garbage-garbage-garbage-garbage")
+        with self.assertRaises(ValueError):
+            list(HistoryLog(self.path).replay())
@@ -0,0 +1,86 @@
+import unittest
+import json
+import time
+
+from myapp.utils.providers import MultiSourceProvider
+from myapp.utils.rates_cache import RatesCache
+
+FEED = json.dumps({"Valute": {"USD": {"Value": 93.25}}}).encode("utf-8")
+
+
+class FakeSources:
+    """url -> (задержка, ответ или исключение)."""
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.calls = []
+
+    def __call__(self, url, timeout=10, headers=None):
+        self.calls.append(url)
+        delay, outcome = self.plan[url]
+        time.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return 200, {}, outcome
+
+
+class TestMultiSourceProvider(unittest.TestCase):
+    def make(self, plan, **kw):
+        fetch = FakeSources(plan)
+        provider = MultiSourceProvider(list(plan), fetch=fetch, **kw)
+        self.addCleanup(provider.close)
+        return provider, fetch
+
+    def test_primary_answers_without_hedging(self):
+        provider, fetch = self.make({"a": (0.0, FEED), "b": (0.0, FEED)}, hedge_after=0.5)
+        _, _, snapshot = provider.fetch()
+        self.assertEqual(snapshot.get(["USD"]), {"USD": 93.25})
+        self.assertEqual(fetch.calls, ["a"])
+        self.assertEqual(provider.last_source, "a")
+
+    def test_slow_primary_is_hedged(self):
+        provider, fetch = self.make({"slow": (1.0, FEED), "fast": (0.0, FEED)}, hedge_after=0.05)
+        started = time.monotonic()
+        provider.fetch()
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(provider.last_source, "fast")
+        self.assertEqual(fetch.calls, ["slow", "fast"])
+
+    def test_failure_falls_back_immediately(self):
+        provider, fetch = self.make({"down": (0.0, ConnectionError("boom")), "ok": (0.0, FEED)}, hedge_after=5)
+        started = time.monotonic()
+        provider.fetch()
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(provider.last_source, "ok")
+        # упавший источник при следующем запросе уходит в конец очереди
+        self.assertEqual(provider.ranked(), ["ok", "down"])
+
+    def test_invalid_payload_counts_as_failure(self):
+        provider, _ = self.make({"bad": (0.0, b"not json"), "ok": (0.0, FEED)}, hedge_after=5)
+        provider.fetch()
+        self.assertEqual(provider.last_source, "ok")
+
+    def test_all_failed_and_budget(self):
+        provider, _ = self.make({"a": (0.0, ConnectionError("x")), "b": (0.0, ValueError("y"))})
+        with self.assertRaises(ConnectionError) as cm:
+            provider.fetch()
+        self.assertIn("a: ConnectionError", str(cm.exception))
+
+        provider, _ = self.make({"a": (1.0, FEED)}, budget=0.1)
+        with self.assertRaises(ConnectionError):
+            provider.fetch()
+
+    def test_ranked_by_observed_latency(self):
+        provider, _ = self.make({"a": (0.0, FEED), "b": (0.0, FEED)})
+        provider.latency.update({"a": 0.4, "b": 0.1})
+        self.assertEqual(provider.ranked(), ["b", "a"])
+
+    def test_rates_cache_uses_provider(self):
+        provider, fetch = self.make({"a": (0.0, FEED)})
+        cache = RatesCache(url="unused", provider=provider)
+        self.assertEqual(cache.get_currencies(["USD"]), {"USD": 93.25})
+        self.assertEqual(fetch.calls, ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import json
+import threading
+import time
+import urllib.parse
+
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from myapp.utils.rates_cache import RatesCache
+
+
+def make_data_url(obj) -> str:
+    payload = json.dumps(obj).encode("utf-8")
+    return "data:application/json," + urllib.parse.quote(payload.decode("utf-8"))
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    etag = '"v1"'
+    body = json.dumps({"Valute": {"USD": {"Value": 93.25}, "EUR": {"Value": 101.7}}}).encode("utf-8")
+    hits = []
+    delay = 0.0
+
+    def do_GET(self):
+        FeedHandler.hits.append(self.headers.get("If-None-Match"))
+        time.sleep(FeedHandler.delay)
+        if self.headers.get("If-None-Match") == FeedHandler.etag:
+            self.send_response(304)
+            self.send_header("ETag", FeedHandler.etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", FeedHandler.etag)
+        self.send_header("Content-Length", str(len(FeedHandler.body)))
+        self.end_headers()
+        self.wfile.write(FeedHandler.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRatesCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.httpd = HTTPServer(("127.0.0.1", 0), FeedHandler)
+        cls.url = f"http://127.0.0.1:{cls.httpd.server_address[1]}/daily_json.js"
+        threading.Thread(target=cls.httpd.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.httpd.shutdown()
+        cls.httpd.server_close()
+
+    def setUp(self):
+        FeedHandler.hits = []
+        FeedHandler.delay = 0.0
+
+    def test_ttl_serves_from_memory(self):
+        clock = FakeClock()
+        cache = RatesCache(self.url, ttl=60, clock=clock)
+        self.assertEqual(cache.get_currencies(["USD"]), {"USD": 93.25})
+        clock.now = 59
+        self.assertEqual(cache.get_currencies(["EUR"]), {"EUR": 101.7})
+        self.assertEqual(len(FeedHandler.hits), 1)
+
+    def test_revalidates_with_etag_after_ttl(self):
+        clock = FakeClock()
+        cache = RatesCache(self.url, ttl=60, clock=clock)
+        cache.get_currencies(["USD"])
+        clock.now = 61
+        self.assertEqual(cache.get_currencies(["USD"]), {"USD": 93.25})
+        self.assertEqual(FeedHandler.hits, [None, '"v1"'])
+        self.assertEqual(cache.not_modified, 1)
+
+    def test_force_revalidates_before_ttl(self):
+        clock = FakeClock()
+        cache = RatesCache(self.url, ttl=60, clock=clock)
+        first = cache.get_snapshot()
+        clock.now = 10
+        self.assertIs(cache.get_snapshot(force=True), first)
+        self.assertEqual(FeedHandler.hits, [None, '"v1"'])
+        self.assertEqual(cache.not_modified, 1)
+
+    def test_single_flight(self):
+        FeedHandler.delay = 0.2
+        cache = RatesCache(self.url, ttl=60)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_currencies(["USD"])))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(FeedHandler.hits), 1)
+        self.assertEqual(results, [{"USD": 93.25}] * 8)
+
+    def test_errors_are_not_cached(self):
+        cache = RatesCache("https://invalid.invalid", ttl=60, timeout=1)
+        with self.assertRaises(ConnectionError):
+            cache.get_currencies(["USD"])
+        cache.url = make_data_url({"Valute": {"USD": {"Value": 1.5}}})
+        self.assertEqual(cache.get_currencies(["USD"]), {"USD": 1.5})
+
+    def test_missing_currency(self):
+        cache = RatesCache(make_data_url({"Valute": {"USD": {"Value": 1.5}}}))
+        with self.assertRaises(KeyError):
+            cache.get_currencies(["EUR"])
@@ -0,0 +1,47 @@
+import unittest
+from myapp.models import User, Currency, UserCurrency, Repository
+
+
+def make_repo():
+    return Repository(
+        users=[User(1, "Alice"), User(2, "Bob")],
+        currencies=[
+            Currency(1, "840", "USD", "Dollar", 90.0, 1),
+            Currency(2, "978", "EUR", "Euro", 100.0, 1),
+            Currency(3, "826", "GBP", "Pound", 110.0, 1),
+        ],
+        user_currencies=[UserCurrency(5, 1, 3), UserCurrency(7, 1, 1)],
+    )
+
+
+class TestRepository(unittest.TestCase):
+    def test_lookups(self):
+        repo = make_repo()
+        self.assertEqual(repo.find_user(2).name, "Bob")
+        self.assertIsNone(repo.find_user(99))
+        self.assertEqual(repo.find_currency_by_id(2).char_code, "EUR")
+        self.assertEqual(repo.find_currency_by_code("GBP").id, 3)
+        self.assertIsNone(repo.find_currency_by_code("JPY"))
+
+    def test_subscriptions_keep_currency_order(self):
+        repo = make_repo()
+        self.assertEqual([c.char_code for c in repo.user_subscriptions(1)], ["USD", "GBP"])
+        self.assertEqual(repo.user_subscriptions(2), [])
+
+    def test_subscribe_is_idempotent_and_ids_are_monotonic(self):
+        repo = make_repo()
+        uc = repo.subscribe(2, 2)
+        self.assertEqual(uc.id, 8)
+        self.assertIs(repo.subscribe(2, 2), uc)
+        self.assertTrue(repo.unsubscribe(2, 2))
+        self.assertFalse(repo.unsubscribe(2, 2))
+        self.assertEqual(repo.subscribe(2, 2).id, 9)
+
+    def test_duplicates_rejected(self):
+        repo = make_repo()
+        with self.assertRaises(ValueError):
+            repo.add_user(User(1, "Again"))
+        with self.assertRaises(ValueError):
+            repo.add_currency(Currency(9, "840", "USD", "Dollar", 1.0, 1))
+        with self.assertRaises(TypeError):
+            repo.add_user("Alice")
@@ -0,0 +1,52 @@
+import unittest
+import threading
+
+from myapp.utils.scheduler import RefreshScheduler
+
+
+class TestRefreshScheduler(unittest.TestCase):
+    def test_refresh_now_tracks_success_and_error(self):
+        calls = []
+
+        def job():
+            calls.append(1)
+            if len(calls) == 2:
+                raise ConnectionError("down")
+
+        s = RefreshScheduler(job)
+        self.assertIsNone(s.age())
+        s.refresh_now()
+        self.assertIsNotNone(s.age())
+        with self.assertRaises(ConnectionError):
+            s.refresh_now()
+        self.assertEqual(s.failures, 1)
+        self.assertIsInstance(s.last_error, ConnectionError)
+        s.refresh_now()
+        self.assertEqual(s.failures, 0)
+        self.assertIsNone(s.last_error)
+
+    def test_backoff_grows_and_is_capped(self):
+        s = RefreshScheduler(lambda: None, interval=300, retry_delay=5, max_backoff=60,
+                             jitter=0.0)
+        self.assertEqual(s.next_delay(), 300)
+        delays = []
+        for n in range(1, 7):
+            s.failures = n
+            delays.append(s.next_delay())
+        self.assertEqual(delays, [5, 10, 20, 40, 60, 60])
+
+    def test_jitter_bounds(self):
+        s = RefreshScheduler(lambda: None, interval=100, jitter=0.2, rng=lambda: 0.0)
+        self.assertAlmostEqual(s.next_delay(), 80)
+        s = RefreshScheduler(lambda: None, interval=100, jitter=0.2, rng=lambda: 1.0)
+        self.assertAlmostEqual(s.next_delay(), 120)
+
+    def test_background_thread_runs_job(self):
+        done = threading.Event()
+        s = RefreshScheduler(done.set, interval=60)
+        s.start()
+        try:
+            self.assertTrue(done.wait(2))
+        finally:
+            s.stop(timeout=2)
+        self.assertIsNotNone(s.last_success)
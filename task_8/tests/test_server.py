@@ -0,0 +1,118 @@
+import unittest
+import threading
+import http.client
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+import time
+
+from http.server import BaseHTTPRequestHandler
+from myapp.utils import server
+from myapp.utils.server import PooledHTTPServer, make_server
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(0.3)
+        body = threading.current_thread().name.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestServerModes(unittest.TestCase):
+    def test_make_server_modes(self):
+        httpd = make_server(SlowHandler, "127.0.0.1", 0, mode="threaded", workers=3)
+        self.assertIsInstance(httpd, PooledHTTPServer)
+        self.assertEqual(httpd.max_workers, 3)
+        httpd.server_close()
+
+        with self.assertRaises(ValueError):
+            make_server(SlowHandler, "127.0.0.1", 0, mode="bogus")
+
+    def test_threaded_serves_concurrently(self):
+        httpd = make_server(SlowHandler, "127.0.0.1", 0, mode="threaded", workers=4)
+        port = httpd.server_address[1]
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+        names = []
+
+        def fetch():
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/")
+            names.append(conn.getresponse().read().decode("utf-8"))
+            conn.close()
+
+        try:
+            started = time.perf_counter()
+            clients = [threading.Thread(target=fetch) for _ in range(4)]
+            for t in clients:
+                t.start()
+            for t in clients:
+                t.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+        self.assertEqual(len(names), 4)
+        self.assertTrue(all(n.startswith("http-worker") for n in names))
+        # четыре запроса по 0.3с параллельно, а не 1.2с последовательно
+        self.assertLess(elapsed, 1.0)
+
+
+PREFORK_SCRIPT = textwrap.dedent("""
+    import signal, sys, time
+    from http.server import BaseHTTPRequestHandler
+    from myapp.utils.server import make_server, serve_prefork
+
+    def slow_exit(index):
+        # воркер завершается не сразу — родитель успевает получить второй SIGTERM
+        def handler(*_):
+            time.sleep(0.5)
+            sys.exit(0)
+        signal.signal(signal.SIGTERM, handler)
+
+    httpd = make_server(BaseHTTPRequestHandler, "127.0.0.1", 0, mode="prefork")
+    print("ready", flush=True)
+    serve_prefork(httpd, 2, on_fork=slow_exit)
+    print("closed", httpd.socket.fileno(), flush=True)
+""")
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "prefork needs os.fork")
+class TestPrefork(unittest.TestCase):
+    def test_second_sigterm_does_not_break_cleanup(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        proc = subprocess.Popen([sys.executable, "-c", PREFORK_SCRIPT], cwd=root,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        try:
+            self.assertEqual(proc.stdout.readline().strip(), "ready")
+            time.sleep(0.3)
+            proc.send_signal(signal.SIGTERM)
+            time.sleep(0.2)
+            proc.send_signal(signal.SIGTERM)
+            out, err = proc.communicate(timeout=10)
+        finally:
+            proc.kill()
+        self.assertEqual(proc.returncode, 0, err)
+        self.assertNotIn("Traceback", err)
+        # server_close() отработал: сокет закрыт
+        self.assertEqual(out.strip(), "closed -1")
+
+
+TASK_9_COPY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "task_9", "server.py")
+
+
+class TestTask9Copy(unittest.TestCase):
+    def test_copy_is_in_sync(self):
+        with open(server.__file__, encoding="utf-8") as f:
+            original = f.read()
+        with open(TASK_9_COPY, encoding="utf-8") as f:
+            self.assertEqual(f.read(), original, "task_9/server.py differs from myapp/utils/server.py")
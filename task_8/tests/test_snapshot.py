@@ -0,0 +1,46 @@
+import unittest
+import json
+
+from myapp.utils.currencies_api import RatesSnapshot
+
+FEED = {
+    "Date": "2024-01-10T11:30:00+03:00",
+    "Valute": {
+        "USD": {"Value": 89.6, "Nominal": 1, "Previous": 90.1},
+        "JPY": {"Value": 61.9, "Nominal": 100, "Previous": 62.0},
+        "XXX": {"Nominal": 1},
+        "BAD": {"Value": "1.0"},
+    },
+}
+
+
+class TestRatesSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.snap = RatesSnapshot.from_raw(json.dumps(FEED).encode("utf-8"))
+
+    def test_query_without_reparse(self):
+        self.assertEqual(self.snap.get(["USD"]), {"USD": 89.6})
+        self.assertEqual(self.snap.get(["JPY", "USD"]), {"JPY": 61.9, "USD": 89.6})
+        self.assertEqual(self.snap.nominal("JPY"), 100)
+        self.assertEqual(self.snap.previous("USD"), 90.1)
+        self.assertEqual(self.snap.date, FEED["Date"])
+
+    def test_all_returns_only_valid_codes(self):
+        self.assertEqual(self.snap.all(), {"USD": 89.6, "JPY": 61.9})
+        self.assertEqual(len(self.snap), 2)
+        self.assertIn("USD", self.snap)
+        self.assertNotIn("BAD", self.snap)
+
+    def test_errors_match_get_currencies(self):
+        with self.assertRaises(KeyError):
+            self.snap.get(["EUR"])
+        with self.assertRaises(KeyError):
+            self.snap.get(["XXX"])
+        with self.assertRaises(TypeError):
+            self.snap.get(["USD", "BAD"])
+
+    def test_invalid_payload(self):
+        with self.assertRaises(ValueError):
+            RatesSnapshot.from_raw(b"{not-json")
+        with self.assertRaises(KeyError):
+            RatesSnapshot.from_raw(b'{"X": 1}')
@@ -0,0 +1,227 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http import HTTPStatus
+from urllib.parse import urlparse, parse_qs
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class _BadBody(Exception):
+    """Тело запроса нельзя дочитать корректно: отвечаем status и закрываем соединение."""
+
+    def __init__(self, status: int):
+        super().__init__(status)
+        self.status = status
+
+
+class AsyncHTTPServer:
+    """
+    HTTP/1.1 сервер на asyncio streams поверх того же Router.dispatch,
+    что и AppHandler: dispatch(path, query) -> (status, headers, body).
+
+    - соединение держится открытым (keep-alive), пока клиент не попросит
+      Connection: close или не промолчит keepalive_timeout секунд;
+    - запросы, пришедшие пачкой (pipelining), обрабатываются по порядку;
+    - dispatch выполняется в пуле потоков, чтобы запросы к sqlite не
+      блокировали цикл событий.
+    """
+
+    def __init__(self, router, host: str = "127.0.0.1", port: int = 8000,
+                 workers: int = 4, keepalive_timeout: float = 15.0):
+        self.router = router
+        self.host = host
+        self.port = port
+        self.keepalive_timeout = keepalive_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dispatch")
+        self._server = None
+        self._connections = set()
+
+    async def start(self) -> asyncio.AbstractServer:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        self._executor.shutdown(wait=False)
+
+    async def aclose(self) -> None:
+        """Останавливает приём и закрывает уже открытые keep-alive соединения."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        self._executor.shutdown(wait=False)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keepalive_timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._write(writer, 431, [], b"", keep_alive=False)
+                    break
+
+                if len(head) > MAX_HEADER_BYTES:
+                    await self._write(writer, 431, [], b"", keep_alive=False)
+                    break
+
+                keep_alive = await self._handle_request(head, reader, writer)
+                if not keep_alive:
+                    break
+        finally:
+            self._connections.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+
+    async def _handle_request(self, head: bytes, reader, writer) -> bool:
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+            await self._write(writer, 400, [], b"", keep_alive=False)
+            return False
+        method, target, version = parts
+
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(":")
+            if not sep:
+                await self._write(writer, 400, [], b"", keep_alive=False)
+                return False
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.1":
+            keep_alive = connection != "close"
+        else:
+            keep_alive = connection == "keep-alive"
+
+        # тело запросов роутеру не нужно, но его надо вычитать из потока,
+        # иначе следующий запрос в том же соединении распарсится неверно
+        try:
+            await self._skip_body(headers, reader)
+        except _BadBody as e:
+            await self._write(writer, e.status, [], b"", keep_alive=False)
+            return False
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return False
+
+        if method not in ("GET", "HEAD"):
+            await self._write(writer, 501, [], b"", keep_alive=keep_alive)
+            return keep_alive
+
+        parsed = urlparse(target)
+        query = parse_qs(parsed.query)
+        loop = asyncio.get_running_loop()
+        try:
+            status, resp_headers, body = await loop.run_in_executor(
+                self._executor, self.router.dispatch, parsed.path, query
+            )
+        except Exception:
+            await self._write(writer, 500, [], b"", keep_alive=False)
+            return False
+
+        await self._write(writer, status, resp_headers, b"" if method == "HEAD" else body,
+                          keep_alive=keep_alive, content_length=len(body))
+        return keep_alive
+
+    async def _skip_body(self, headers: dict, reader) -> None:
+        encoding = headers.get("transfer-encoding")
+        if encoding is not None:
+            # и Transfer-Encoding, и Content-Length — неоднозначная граница запроса
+            if "content-length" in headers:
+                raise _BadBody(400)
+            if encoding.lower() != "chunked":
+                raise _BadBody(501)
+            await self._skip_chunked(reader)
+            return
+
+        length = headers.get("content-length", "0")
+        if not length.isdigit():
+            raise _BadBody(400)
+        if int(length) > MAX_BODY_BYTES:
+            raise _BadBody(413)
+        if int(length):
+            await reader.readexactly(int(length))
+
+    async def _skip_chunked(self, reader) -> None:
+        total = 0
+        while True:
+            line = await self._read_line(reader)
+            try:
+                size = int(line.split(b";", 1)[0].strip(), 16)
+            except ValueError:
+                raise _BadBody(400) from None
+            if size < 0:
+                raise _BadBody(400)
+            if size == 0:
+                break
+            total += size
+            if total > MAX_BODY_BYTES:
+                raise _BadBody(413)
+            chunk = await reader.readexactly(size + 2)
+            if chunk[-2:] != b"\r\n":
+                raise _BadBody(400)
+        # трейлеры до пустой строки
+        while await self._read_line(reader):
+            pass
+
+    async def _read_line(self, reader) -> bytes:
+        try:
+            line = await reader.readuntil(b"\r\n")
+        except asyncio.LimitOverrunError:
+            raise _BadBody(400) from None
+        return line[:-2]
+
+    async def _write(self, writer, status: int, headers, body: bytes,
+                     keep_alive: bool, content_length: int | None = None) -> None:
+        try:
+            reason = HTTPStatus(status).phrase
+        except ValueError:
+            reason = ""
+        out = [f"HTTP/1.1 {status} {reason}",
+               f"Date: {formatdate(usegmt=True)}",
+               f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        has_length = False
+        for k, v in headers:
+            if k.lower() == "connection":
+                continue
+            if k.lower() == "content-length":
+                if has_length:
+                    continue
+                has_length = True
+            out.append(f"{k}: {v}")
+        if not has_length:
+            out.append(f"Content-Length: {len(body) if content_length is None else content_length}")
+        writer.write(("\r\n".join(out) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+
+def serve(router, host: str = "127.0.0.1", port: int = 8000, workers: int = 4) -> None:
+    server = AsyncHTTPServer(router, host, port, workers=workers)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
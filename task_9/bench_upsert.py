@@ -0,0 +1,85 @@
+"""
+Обновление курсов: построчный UPDATE (как _update раньше) против
+executemany (_update) и INSERT ... ON CONFLICT (_upsert) на файловой базе.
+Запуск из каталога task_9:
+
+    python bench_upsert.py
+"""
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from controllers.databasecontroller import connect, init_db, CurrencyRatesCRUD
+
+
+def code(i: int) -> str:
+    # 3 буквы дают 17576 кодов, дальше добавляем номер
+    letters = "".join(chr(65 + (i // 26 ** k) % 26) for k in range(3))
+    return letters if i < 26 ** 3 else f"{letters}{i}"
+
+
+def loop_update(conn, mapping) -> int:
+    updated = 0
+    cur = conn.cursor()
+    for c, value in mapping.items():
+        cur.execute("UPDATE currency SET value = ? WHERE char_code = ?", (float(value), c))
+        updated += cur.rowcount
+    conn.commit()
+    return updated
+
+
+def fresh_db(directory: str, n: int):
+    path = os.path.join(directory, f"bench_{n}.db")
+    if os.path.exists(path):
+        os.remove(path)
+    conn = connect(path)
+    init_db(conn)
+    CurrencyRatesCRUD(conn)._create_many([
+        {"num_code": f"{i % 1000:03d}", "char_code": code(i), "name": f"Currency {i}", "value": 1.0, "nominal": 1}
+        for i in range(n)
+    ])
+    return conn
+
+
+def timed(fn, repeat: int = 1) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    rng = random.Random(1)
+    directory = tempfile.mkdtemp()
+    try:
+        print(f"{'rows':>7} {'loop, ms':>10} {'_update, ms':>12} {'_upsert, ms':>12} {'speedup':>16} "
+              f"{'+n/2 new, ms':>13}")
+        for n in (40, 1000, 100_000):
+            mapping = {code(i): rng.uniform(1, 100) for i in range(n)}
+            conn = fresh_db(directory, n)
+            db = CurrencyRatesCRUD(conn)
+            loop = timed(lambda: loop_update(conn, mapping), repeat=3)
+            many = timed(lambda: db._update(mapping), repeat=3)
+            ups = timed(lambda: db._upsert(mapping), repeat=3)
+            # полные строки, половина из них — новые валюты, которые вставляются тем же проходом
+            rows = [{"num_code": "000", "char_code": c, "name": c, "value": v, "nominal": 1}
+                    for c, v in mapping.items()]
+            rows += [{"num_code": "000", "char_code": f"N{c}", "name": c, "value": v, "nominal": 1}
+                     for c, v in list(mapping.items())[: n // 2]]
+            full = timed(lambda: db._upsert(rows))
+            conn.close()
+            speedup = f"{loop / many:.1f}x / {loop / ups:.1f}x"
+            print(f"{n:>7} {loop * 1e3:>10.2f} {many * 1e3:>12.2f} {ups * 1e3:>12.2f} {speedup:>16} "
+                  f"{full * 1e3:>13.2f}")
+        print("speedup: loop / _update и loop / _upsert на тех же n курсах")
+        print("+n/2 new: _upsert полных строк, из них n/2 новых валют")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
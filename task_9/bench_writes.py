@@ -0,0 +1,70 @@
+"""
+Подписки из многих потоков на файловой базе: commit на каждую операцию
+против группового commit через WriteQueue. Запуск из каталога task_9:
+
+    python bench_writes.py
+    DELAY=0.002 python bench_writes.py     # max_delay в секундах
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from controllers.databasecontroller import ConnectionPool, WriteQueue, init_db, CurrencyRatesCRUD, UsersCRUD, UserCurrencyCRUD
+
+OPS_PER_THREAD = 200
+DELAY = float(os.environ.get("DELAY", "0"))
+
+
+def run(path: str, threads: int, synchronous: str, grouped: bool) -> float:
+    if os.path.exists(path):
+        os.remove(path)
+    pool = ConnectionPool(path)
+    with pool.writer() as conn:
+        init_db(conn)
+        conn.execute(f"PRAGMA synchronous = {synchronous};")
+    writes = WriteQueue(pool, max_delay=DELAY) if grouped else None
+    currencies = CurrencyRatesCRUD(pool, writes)
+    users = UsersCRUD(pool, writes)
+    subs = UserCurrencyCRUD(pool, writes)
+    currencies._create_many([
+        {"num_code": f"{i:03d}", "char_code": f"C{i:02d}", "name": f"Currency {i}", "value": 1.0, "nominal": 1}
+        for i in range(OPS_PER_THREAD)
+    ])
+    uids = [users._create(f"user{n}") for n in range(threads)]
+
+    def work(uid):
+        for cid in range(1, OPS_PER_THREAD + 1):
+            subs._subscribe(uid, cid)
+
+    workers = [threading.Thread(target=work, args=(uid,)) for uid in uids]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+    if writes is not None:
+        writes.close()
+    pool.close()
+    return threads * OPS_PER_THREAD / elapsed
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "bench.db")
+    try:
+        print(f"{'sync':>7} {'threads':>8} {'commit, op/s':>14} {'grouped, op/s':>14} {'speedup':>8}")
+        for synchronous in ("NORMAL", "FULL"):
+            for threads in (1, 8, 32):
+                single = run(path, threads, synchronous, grouped=False)
+                grouped = run(path, threads, synchronous, grouped=True)
+                print(f"{synchronous:>7} {threads:>8} {single:>14.0f} {grouped:>14.0f} {grouped / single:>7.1f}x")
+        print(f"grouped: WriteQueue(max_batch=64, max_delay={DELAY * 1e3:g} мс)")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
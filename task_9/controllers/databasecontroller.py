@@ -1,11 +1,60 @@
+import functools
+import json
+import os
+import queue
 import sqlite3
+import threading
+import time
+import urllib.request
+from concurrent.futures import Future
+from contextlib import contextmanager
 from typing import Any, Dict, List, Optional
 
+# файловая база: WAL позволяет читать параллельно с записью, а synchronous=NORMAL
+# делает fsync только на checkpoint, а не на каждый commit
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("foreign_keys", "ON"),
+    ("busy_timeout", 5000),
+    ("cache_size", -16000),         # ~16 МБ страничного кэша
+    ("mmap_size", 256 * 1024 * 1024),
+    ("temp_store", "MEMORY"),
+)
 
-def init_db(conn: sqlite3.Connection) -> None:
 
-    conn.execute("PRAGMA foreign_keys = ON;")
+# journal_mode и synchronous задаёт писатель, читателю они не нужны
+_READER_SKIP = ("journal_mode", "synchronous")
+
+
+class _Connection(sqlite3.Connection):
+    """Соединение из connect(): помнит свой ConnectionPool.wrap, он один на соединение."""
+    _wrapper = None
+
 
+def connect(path: str = ":memory:", check_same_thread: bool = False, readonly: bool = False) -> sqlite3.Connection:
+    """
+    Открывает базу (файл или ":memory:") с настроенными PRAGMA и row_factory = Row.
+    Для ":memory:" journal_mode остаётся MEMORY — WAL там не нужен.
+    readonly=True открывает файл только на чтение (mode=ro, query_only).
+    """
+    if readonly:
+        uri = f"file:{urllib.request.pathname2url(path)}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=check_same_thread, factory=_Connection)
+    else:
+        conn = sqlite3.connect(path, check_same_thread=check_same_thread, factory=_Connection)
+    conn.row_factory = sqlite3.Row
+    for name, value in PRAGMAS:
+        if readonly and name in _READER_SKIP:
+            continue
+        conn.execute(f"PRAGMA {name} = {value};")
+    if readonly:
+        conn.execute("PRAGMA query_only = ON;")
+    return conn
+
+
+def _migration_1(conn: sqlite3.Connection) -> None:
+    # исходная схема; IF NOT EXISTS — для баз, созданных до появления версий
     conn.execute("""
     CREATE TABLE IF NOT EXISTS user (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -33,7 +82,361 @@ def init_db(conn: sqlite3.Connection) -> None:
         FOREIGN KEY(currency_id) REFERENCES currency(id) ON DELETE CASCADE
     );
     """)
-    conn.commit()
+
+
+def _migration_2(conn: sqlite3.Connection) -> None:
+    # индексы под WHERE char_code = ? и JOIN по подпискам; перед UNIQUE
+    # склеиваем дубли, которые старая схема допускала
+    conn.execute("""
+    UPDATE user_currency SET currency_id = (
+        SELECT MIN(c2.id) FROM currency c1 JOIN currency c2 ON c2.char_code = c1.char_code
+        WHERE c1.id = user_currency.currency_id
+    )
+    WHERE currency_id NOT IN (SELECT MIN(id) FROM currency GROUP BY char_code);
+    """)
+    conn.execute("""
+    DELETE FROM currency WHERE id NOT IN (SELECT MIN(id) FROM currency GROUP BY char_code);
+    """)
+    conn.execute("""
+    DELETE FROM user_currency WHERE id NOT IN (SELECT MIN(id) FROM user_currency GROUP BY user_id, currency_id);
+    """)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_currency_char_code ON currency(char_code);")
+    conn.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_user_currency_user_currency ON user_currency(user_id, currency_id);
+    """)
+    # для ON DELETE CASCADE при удалении валюты
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_user_currency_currency ON user_currency(currency_id);")
+
+
+# MIGRATIONS[i] переводит схему из версии i в i + 1 (PRAGMA user_version)
+MIGRATIONS = [
+    _migration_1,
+    _migration_2,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def init_db(conn: sqlite3.Connection) -> None:
+    """
+    Доводит схему до SCHEMA_VERSION. Каждая миграция идёт в своей транзакции
+    вместе с обновлением user_version, поэтому сбой посередине не оставляет
+    схему наполовину изменённой, а повторный запуск продолжает с того же места.
+    """
+    conn.execute("PRAGMA foreign_keys = ON;")
+
+    while True:
+        # BEGIN IMMEDIATE: если несколько процессов стартуют одновременно,
+        # мигрирует только один, остальные увидят уже новую версию
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            version = schema_version(conn)
+            if version > SCHEMA_VERSION:
+                raise RuntimeError(
+                    f"database schema version {version} is newer than supported {SCHEMA_VERSION}"
+                )
+            if version == SCHEMA_VERSION:
+                conn.commit()
+                return
+            MIGRATIONS[version](conn)
+            conn.execute(f"PRAGMA user_version = {version + 1};")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+def is_empty(conn: sqlite3.Connection) -> bool:
+    """Ни валют, ни пользователей — базу можно заполнять начальными данными."""
+    sql = "SELECT NOT EXISTS (SELECT 1 FROM currency) AND NOT EXISTS (SELECT 1 FROM user);"
+    return conn.execute(sql).fetchone()[0] == 1
+
+
+class ConnectionPool:
+    """
+    Соединения к одной базе для многопоточного сервера.
+
+    - writer: одно соединение для записи; transaction() держит его под
+      блокировкой и открывает BEGIN IMMEDIATE; если транзакция на соединении
+      уже открыта (вложенный transaction() или сам вызывающий), он входит в
+      неё, и commit делает только тот уровень, который её начал;
+    - readers: до readers соединений только для чтения (в WAL они читают
+      параллельно с писателем), reader() выдаёт одно из них на время запроса.
+
+    Для ":memory:" отдельных читателей нет (у каждого соединения была бы своя
+    пустая база), чтение идёт через writer. Соединения не переживают fork:
+    в воркере prefork нужен свой пул.
+    """
+
+    def __init__(self, path: str = ":memory:", readers: int = 4, timeout: float = 10.0):
+        self.path = path
+        self.timeout = timeout
+        self._writer = connect(path)
+        self._lock = threading.RLock()
+        self._owner = None
+        self._max_readers = 0 if path == ":memory:" else readers
+        self._idle = queue.LifoQueue()
+        self._opened = []
+        self._open_lock = threading.Lock()
+
+    @classmethod
+    def wrap(cls, conn: sqlite3.Connection) -> "ConnectionPool":
+        """
+        Пул поверх готового соединения: и чтение, и запись идут через него
+        под одной блокировкой. Для соединения из connect() пул всегда один и
+        тот же; «чужое» sqlite3.Connection каждый вызов оборачивается заново,
+        но transaction() разных обёрток всё равно вкладываются друг в друга —
+        вложенность определяется по in_transaction соединения.
+        """
+        wrapper = getattr(conn, "_wrapper", None)
+        if wrapper is not None:
+            return wrapper
+        pool = cls.__new__(cls)
+        pool.path = None
+        pool.timeout = None
+        pool._writer = conn
+        pool._lock = threading.RLock()
+        pool._owner = None
+        pool._max_readers = 0
+        pool._idle = queue.LifoQueue()
+        pool._opened = []
+        pool._open_lock = threading.Lock()
+        if isinstance(conn, _Connection):
+            conn._wrapper = pool
+        return pool
+
+    @contextmanager
+    def writer(self):
+        """Соединение писателя без транзакции (миграции, PRAGMA)."""
+        with self._lock:
+            yield self._writer
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            conn = self._writer
+            # вложенность — по самому соединению: транзакцию могла открыть и
+            # другая обёртка того же соединения, и вызывающий код
+            outer = not conn.in_transaction
+            if outer:
+                conn.execute("BEGIN IMMEDIATE;")
+                self._owner = threading.get_ident()
+            try:
+                yield conn
+            except BaseException:
+                if outer:
+                    conn.rollback()
+                raise
+            else:
+                if outer:
+                    conn.commit()
+            finally:
+                if outer:
+                    self._owner = None
+
+    def owns_transaction(self) -> bool:
+        return self._owner == threading.get_ident()
+
+    @contextmanager
+    def reader(self):
+        # внутри своей транзакции читаем через writer, чтобы видеть свои же изменения
+        if self._max_readers == 0 or self.owns_transaction():
+            with self._lock:
+                yield self._writer
+            return
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._open_lock:
+            if len(self._opened) < self._max_readers:
+                conn = connect(self.path, readonly=True)
+                self._opened.append(conn)
+                return conn
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"no free database connection in {self.timeout}s") from None
+
+    def close(self) -> None:
+        with self._open_lock:
+            readers, self._opened = self._opened, []
+        for conn in readers:
+            conn.close()
+        with self._lock:
+            self._writer.close()
+
+
+def as_pool(db) -> ConnectionPool:
+    if isinstance(db, ConnectionPool):
+        return db
+    if isinstance(db, sqlite3.Connection):
+        return ConnectionPool.wrap(db)
+    raise TypeError("expected a ConnectionPool or an sqlite3.Connection")
+
+
+class WriteQueue:
+    """
+    Групповой commit: записи из разных потоков складываются в очередь, и
+    фоновый поток выполняет их пачкой в одной транзакции пула — один commit
+    (и одна запись в WAL) на пачку вместо commit на каждую подписку.
+
+    В пачку попадает всё, что накопилось, пока шёл предыдущий commit, но не
+    больше max_batch операций. max_delay > 0 держит пачку открытой ещё
+    столько секунд — имеет смысл, если submit() вызывают не дожидаясь
+    результата; когда вызывающие ждут commit, ожидание только добавляет задержку.
+
+    submit() возвращает Future, который завершается после commit пачки.
+    Каждая операция идёт под своим SAVEPOINT: ошибка откатывает только её
+    и попадает в её Future, остальные операции пачки фиксируются.
+    """
+
+    def __init__(self, db, max_batch: int = 64, max_delay: float = 0.0):
+        self.db = as_pool(db)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+
+        self.batches = 0
+        self.operations = 0
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        fut = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("write queue is closed")
+            self._start()
+            self._queue.put((fut, fn, args, kwargs))
+        return fut
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Выполняет запись и ждёт её commit. Если очередь пуста и писатель
+        свободен, пишет сразу в вызывающем потоке: пачки нужны только при
+        конкуренции, а передача в фоновый поток стоит дороже одного commit.
+        """
+        if self._queue.empty() and self.db._lock.acquire(blocking=False):
+            try:
+                with self.db.transaction():
+                    return fn(*args, **kwargs)
+            finally:
+                self.db._lock.release()
+        return self.submit(fn, *args, **kwargs).result()
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Ждёт commit всего, что поставлено в очередь до вызова."""
+        self.submit(lambda: None).result(timeout)
+
+    def in_worker(self) -> bool:
+        return self._thread is threading.current_thread()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread if self._pid == os.getpid() else None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join()
+
+    def _start(self) -> None:
+        # поток писателя не переживает fork: в воркере prefork заводим свой
+        if self._thread is None or self._pid != os.getpid():
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                left = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=left) if left > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch) -> None:
+        done = []
+        try:
+            with self.db.transaction() as conn:
+                for fut, fn, args, kwargs in batch:
+                    if not fut.set_running_or_notify_cancel():
+                        continue
+                    conn.execute("SAVEPOINT write_op;")
+                    try:
+                        result = fn(*args, **kwargs)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO write_op;")
+                        conn.execute("RELEASE write_op;")
+                        fut.set_exception(e)
+                        continue
+                    conn.execute("RELEASE write_op;")
+                    done.append((fut, result))
+        except Exception as e:
+            # транзакция не началась, SAVEPOINT или commit не прошли: вся пачка
+            # откатилась, и ошибку получает каждый, кто ещё ждёт
+            for fut, *_ in batch:
+                if fut.done():
+                    continue
+                if fut.running() or fut.set_running_or_notify_cancel():
+                    fut.set_exception(e)
+            return
+        self.batches += 1
+        self.operations += len(done)
+        for fut, result in done:
+            fut.set_result(result)
+
+
+def _bind(db, writes: Optional["WriteQueue"]) -> ConnectionPool:
+    """Пул для CRUD; с очередью — её же, чтобы запросы шли под её блокировкой."""
+    pool = as_pool(db)
+    if writes is None:
+        return pool
+    if writes.db._writer is not pool._writer:
+        raise ValueError("write queue must use the same database")
+    return writes.db
+
+
+def _queued(method):
+    """Запись через WriteQueue объекта, если она задана; вызов ждёт commit."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        writes = self.writes
+        # внутри пачки или своей транзакции пишем сразу, иначе поток писателя
+        # ждал бы блокировку, которую держит вызывающий
+        if writes is None or writes.in_worker() or self.db.owns_transaction():
+            return method(self, *args, **kwargs)
+        return writes.run(method, self, *args, **kwargs)
+    return wrapper
 
 
 def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
@@ -41,112 +444,192 @@ def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
 
 
 class CurrencyRatesCRUD:
-    def __init__(self, conn: sqlite3.Connection):
-        self.conn = conn
+    def __init__(self, db, writes: Optional[WriteQueue] = None):
+        # ConnectionPool или sqlite3.Connection (тогда все запросы идут через него);
+        # writes — очередь группового commit для методов записи
+        self.db = _bind(db, writes)
+        self.writes = writes
 
+    @_queued
     def _create_many(self, data: List[Dict[str, Any]]) -> None:
-        sql = """
-        INSERT INTO currency(num_code, char_code, name, value, nominal)
-        VALUES(:num_code, :char_code, :name, :value, :nominal)
-        """
-        cur = self.conn.cursor()
-        cur.executemany(sql, data)
-        self.conn.commit()
+        with self.db.transaction() as conn:
+            sql = """
+            INSERT INTO currency(num_code, char_code, name, value, nominal)
+            VALUES(:num_code, :char_code, :name, :value, :nominal)
+            """
+            cur = conn.cursor()
+            cur.executemany(sql, data)
 
+    @_queued
     def _create_one(self, data: Dict[str, Any]) -> int:
-        sql = """
-        INSERT INTO currency(num_code, char_code, name, value, nominal)
-        VALUES(:num_code, :char_code, :name, :value, :nominal)
-        """
-        cur = self.conn.cursor()
-        cur.execute(sql, data)
-        self.conn.commit()
-        return int(cur.lastrowid)
+        with self.db.transaction() as conn:
+            sql = """
+            INSERT INTO currency(num_code, char_code, name, value, nominal)
+            VALUES(:num_code, :char_code, :name, :value, :nominal)
+            """
+            cur = conn.cursor()
+            cur.execute(sql, data)
+            return int(cur.lastrowid)
 
     def _read(self) -> List[Dict[str, Any]]:
-        sql = "SELECT id, num_code, char_code, name, value, nominal FROM currency ORDER BY id"
-        cur = self.conn.cursor()
-        cur.execute(sql)
-        rows = cur.fetchall()
-        return [_row_to_dict(r) for r in rows]
+        with self.db.reader() as conn:
+            sql = "SELECT id, num_code, char_code, name, value, nominal FROM currency ORDER BY id"
+            cur = conn.cursor()
+            cur.execute(sql)
+            rows = cur.fetchall()
+            return [_row_to_dict(r) for r in rows]
 
     def _read_by_char_code(self, char_code: str) -> Optional[Dict[str, Any]]:
-        sql = "SELECT id, num_code, char_code, name, value, nominal FROM currency WHERE char_code = ?"
-        cur = self.conn.cursor()
-        cur.execute(sql, (char_code,))
-        row = cur.fetchone()
-        return _row_to_dict(row) if row else None
+        with self.db.reader() as conn:
+            sql = "SELECT id, num_code, char_code, name, value, nominal FROM currency WHERE char_code = ?"
+            cur = conn.cursor()
+            cur.execute(sql, (char_code,))
+            row = cur.fetchone()
+            return _row_to_dict(row) if row else None
 
+    @_queued
     def _update(self, mapping: Dict[str, float]) -> int:
         """
         mapping вида {"USD": 99.9}
         Возвращает количество обновлённых строк.
         """
-        updated = 0
-        sql = "UPDATE currency SET value = ? WHERE char_code = ?"
-        cur = self.conn.cursor()
-        for code, value in mapping.items():
-            cur.execute(sql, (float(value), str(code).upper()))
-            updated += cur.rowcount
-        self.conn.commit()
-        return updated
+        with self.db.transaction() as conn:
+            sql = "UPDATE currency SET value = ? WHERE char_code = ?"
+            cur = conn.cursor()
+            cur.executemany(sql, [(float(value), str(code).upper()) for code, value in mapping.items()])
+            return cur.rowcount
+
+    @_queued
+    def _upsert(self, rows) -> Dict[str, str]:
+        """
+        Пакетное обновление курсов одной транзакцией.
+
+        rows — {"USD": 99.9} или список словарей с char_code и value; если
+        в словаре есть num_code и name (и nominal), неизвестная валюта
+        добавляется, известная обновляется целиком.
 
+        Возвращает {char_code: "updated" | "inserted" | "missing"}, где
+        missing — неизвестный код без данных для вставки.
+        """
+        if isinstance(rows, dict):
+            full, partial = [], {str(code).upper(): float(value) for code, value in rows.items()}
+        else:
+            full, partial = [], {}
+            for row in rows:
+                code = str(row["char_code"]).upper()
+                if row.get("num_code") is not None and row.get("name") is not None:
+                    full.append((row["num_code"], code, row["name"], float(row["value"]), row.get("nominal", 1)))
+                else:
+                    partial[code] = float(row["value"])
+
+        outcome = {}
+        with self.db.transaction() as conn:
+            cur = conn.cursor()
+            cur.row_factory = None
+            if full:
+                # id с AUTOINCREMENT только растёт: всё, что выше прежнего максимума, вставлено сейчас
+                last_id = cur.execute("SELECT IFNULL(MAX(id), 0) FROM currency").fetchone()[0]
+                cur.executemany("""
+                INSERT INTO currency(num_code, char_code, name, value, nominal)
+                VALUES(?, ?, ?, ?, ?)
+                ON CONFLICT(char_code) DO UPDATE SET
+                    num_code = excluded.num_code,
+                    name = excluded.name,
+                    value = excluded.value,
+                    nominal = excluded.nominal
+                """, full)
+                outcome = dict.fromkeys((row[1] for row in full), "updated")
+                cur.execute("SELECT char_code FROM currency WHERE id > ?", (last_id,))
+                outcome.update((code, "inserted") for code, in cur.fetchall())
+            if partial:
+                cur.executemany("UPDATE currency SET value = ? WHERE char_code = ?",
+                                [(value, code) for code, value in partial.items()])
+                if cur.rowcount == len(partial):
+                    outcome.update(dict.fromkeys(partial, "updated"))
+                else:
+                    # обычно находятся все коды; какие именно нет — спрашиваем, только если не сошлось
+                    cur.execute("SELECT char_code FROM currency WHERE char_code IN (SELECT value FROM json_each(?))",
+                                (json.dumps(list(partial)),))
+                    found = {code for code, in cur.fetchall()}
+                    outcome.update((code, "updated" if code in found else "missing") for code in partial)
+        return outcome
+
+    @_queued
     def _delete(self, currency_id: int) -> int:
         """
         Возвращает количество удалённых строк.
         """
-        cur = self.conn.cursor()
-        cur.execute("DELETE FROM currency WHERE id = ?", (int(currency_id),))
-        self.conn.commit()
-        return cur.rowcount
+        with self.db.transaction() as conn:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM currency WHERE id = ?", (int(currency_id),))
+            return cur.rowcount
 
 
 class UsersCRUD:
-    def __init__(self, conn: sqlite3.Connection):
-        self.conn = conn
+    def __init__(self, db, writes: Optional[WriteQueue] = None):
+        # ConnectionPool или sqlite3.Connection (тогда все запросы идут через него);
+        # writes — очередь группового commit для методов записи
+        self.db = _bind(db, writes)
+        self.writes = writes
 
+    @_queued
     def _create(self, name: str) -> int:
-        cur = self.conn.cursor()
-        cur.execute("INSERT INTO user(name) VALUES(?)", (name,))
-        self.conn.commit()
-        return int(cur.lastrowid)
+        with self.db.transaction() as conn:
+            cur = conn.cursor()
+            cur.execute("INSERT INTO user(name) VALUES(?)", (name,))
+            return int(cur.lastrowid)
 
     def _read(self) -> List[Dict[str, Any]]:
-        cur = self.conn.cursor()
-        cur.execute("SELECT id, name FROM user ORDER BY id")
-        return [_row_to_dict(r) for r in cur.fetchall()]
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT id, name FROM user ORDER BY id")
+            return [_row_to_dict(r) for r in cur.fetchall()]
 
     def _read_one(self, user_id: int) -> Optional[Dict[str, Any]]:
-        cur = self.conn.cursor()
-        cur.execute("SELECT id, name FROM user WHERE id = ?", (int(user_id),))
-        row = cur.fetchone()
-        return _row_to_dict(row) if row else None
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT id, name FROM user WHERE id = ?", (int(user_id),))
+            row = cur.fetchone()
+            return _row_to_dict(row) if row else None
 
 
 class UserCurrencyCRUD:
-    def __init__(self, conn: sqlite3.Connection):
-        self.conn = conn
+    def __init__(self, db, writes: Optional[WriteQueue] = None):
+        # ConnectionPool или sqlite3.Connection (тогда все запросы идут через него);
+        # writes — очередь группового commit для методов записи
+        self.db = _bind(db, writes)
+        self.writes = writes
 
+    @_queued
     def _subscribe(self, user_id: int, currency_id: int) -> int:
         """
-        Добавляет подписку user->currency.
+        Добавляет подписку user->currency и возвращает её id.
+        Повторная подписка ничего не меняет и возвращает id существующей.
         """
-        cur = self.conn.cursor()
-        cur.execute(
-            "INSERT INTO user_currency(user_id, currency_id) VALUES(?, ?)",
-            (int(user_id), int(currency_id))
-        )
-        self.conn.commit()
-        return int(cur.lastrowid)
+        with self.db.transaction() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO user_currency(user_id, currency_id) VALUES(?, ?) "
+                "ON CONFLICT(user_id, currency_id) DO NOTHING",
+                (int(user_id), int(currency_id))
+            )
+            if cur.rowcount:
+                return int(cur.lastrowid)
+            cur.execute(
+                "SELECT id FROM user_currency WHERE user_id = ? AND currency_id = ?",
+                (int(user_id), int(currency_id))
+            )
+            return int(cur.fetchone()[0])
 
     def _get_user_currencies(self, user_id: int) -> List[Dict[str, Any]]:
-        sql = """
-        SELECT c.id, c.num_code, c.char_code, c.name, c.value, c.nominal
-        FROM currency c
-        JOIN user_currency uc ON uc.currency_id = c.id
-        WHERE uc.user_id = ?
-        ORDER BY c.id
-        """
-        cur = self.conn.cursor()
-        cur.execute(sql, (int(user_id),))
-        return [_row_to_dict(r) for r in cur.fetchall()]
+        with self.db.reader() as conn:
+            sql = """
+            SELECT c.id, c.num_code, c.char_code, c.name, c.value, c.nominal
+            FROM currency c
+            JOIN user_currency uc ON uc.currency_id = c.id
+            WHERE uc.user_id = ?
+            ORDER BY c.id
+            """
+            cur = conn.cursor()
+            cur.execute(sql, (int(user_id),))
+            return [_row_to_dict(r) for r in cur.fetchall()]
@@ -1,20 +1,25 @@
-import sqlite3
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import argparse
+import os
+from http.server import BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 
-from controllers.databasecontroller import init_db, CurrencyRatesCRUD, UsersCRUD, UserCurrencyCRUD
+from controllers.databasecontroller import (
+    ConnectionPool, WriteQueue, init_db, is_empty, CurrencyRatesCRUD, UsersCRUD, UserCurrencyCRUD,
+)
 from controllers.currencycontroller import CurrencyController
 from controllers.usercontroller import UserController
 from controllers.pages import PagesController
 from controllers.router import Router
+from server import MODES, make_server, serve
+import asyncserver
 
 
-def seed_data(conn: sqlite3.Connection) -> None:
-    currency_db = CurrencyRatesCRUD(conn)
-    users_db = UsersCRUD(conn)
-    user_currency_db = UserCurrencyCRUD(conn)
+def seed_data(db) -> None:
+    currency_db = CurrencyRatesCRUD(db)
+    users_db = UsersCRUD(db)
+    user_currency_db = UserCurrencyCRUD(db)
 
     data = [
         {"num_code": "840", "char_code": "USD", "name": "Доллар США", "value": 90.0, "nominal": 1},
@@ -35,21 +40,37 @@ def seed_data(conn: sqlite3.Connection) -> None:
     user_currency_db._subscribe(u2, gbp)
 
 
-def build_app():
-    conn = sqlite3.connect(":memory:", check_same_thread=False)
-    conn.row_factory = sqlite3.Row
+# ":memory:" — данные живут до перезапуска; путь к файлу — база переживает рестарт
+DB_PATH = os.environ.get("CURRENCY_DB", ":memory:")
 
-    init_db(conn)
-    seed_data(conn)
+# групповой commit (WriteQueue) выключен по умолчанию: при synchronous=NORMAL
+# commit в WAL и так без fsync, и bench_writes.py показывает ~1.0x на 8 потоках
+# и 0.9x на одном; выигрыш (до 2.4x на 32 потоках) только при synchronous=FULL
+GROUP_COMMIT = os.environ.get("CURRENCY_DB_GROUP_COMMIT") == "1"
+
+
+def build_app(db_path: str | None = None, group_commit: bool | None = None):
+    pool = ConnectionPool(db_path or DB_PATH)
+    if group_commit is None:
+        group_commit = GROUP_COMMIT
+
+    with pool.writer() as conn:
+        init_db(conn)
+    # начальные данные — одной транзакцией: вложенные записи CRUD в ней не коммитят
+    with pool.transaction() as conn:
+        if is_empty(conn):
+            seed_data(pool)
 
     env = Environment(
         loader=FileSystemLoader("templates"),
         autoescape=select_autoescape(["html", "xml"]),
     )
 
-    currency_db = CurrencyRatesCRUD(conn)
-    users_db = UsersCRUD(conn)
-    user_currency_db = UserCurrencyCRUD(conn)
+    # в ":memory:" экономить нечего, там записи идут сразу
+    writes = WriteQueue(pool) if group_commit and pool.path != ":memory:" else None
+    currency_db = CurrencyRatesCRUD(pool, writes)
+    users_db = UsersCRUD(pool, writes)
+    user_currency_db = UserCurrencyCRUD(pool, writes)
 
     currency_controller = CurrencyController(currency_db)
     user_controller = UserController(users_db, user_currency_db)
@@ -87,7 +108,47 @@ class AppHandler(BaseHTTPRequestHandler):
         super().log_message(format, *args)
 
 
+def _rebuild_router(index: int | None = None):
+    # sqlite-соединение нельзя делить между процессами после fork,
+    # поэтому каждый воркер открывает свою базу (один и тот же файл)
+    global ROUTER
+    ROUTER = build_app()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Currency CRUD app")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--mode", choices=MODES + ("async",), default="single")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--db", default=None, help="файл SQLite (по умолчанию $CURRENCY_DB или :memory:)")
+    parser.add_argument("--group-commit", action="store_true",
+                        help="объединять записи разных запросов в одну транзакцию (WriteQueue)")
+    args = parser.parse_args(argv)
+
+    global DB_PATH, GROUP_COMMIT
+    changed = False
+    if args.db and args.db != DB_PATH:
+        DB_PATH = args.db
+        changed = True
+    if args.mode == "prefork" and DB_PATH == ":memory:":
+        # у каждого воркера была бы своя база в памяти, и изменения в одном
+        # не видели бы остальные
+        parser.error("prefork mode needs a database file: pass --db or set CURRENCY_DB")
+    if args.group_commit and not GROUP_COMMIT:
+        GROUP_COMMIT = True
+        changed = True
+    if changed:
+        _rebuild_router()
+
+    if args.mode == "async":
+        print(f"Server started: http://{args.host}:{args.port} (async, workers={args.workers})")
+        return asyncserver.serve(ROUTER, args.host, args.port, workers=args.workers)
+
+    server = make_server(AppHandler, args.host, args.port, mode=args.mode, workers=args.workers)
+    print(f"Server started: http://{args.host}:{args.port} ({args.mode}, workers={args.workers})")
+    serve(server, args.mode, args.workers, on_fork=_rebuild_router)
+
+
 if __name__ == "__main__":
-    server = HTTPServer(("127.0.0.1", 8000), AppHandler)
-    print("Server started: http://127.0.0.1:8000")
-    server.serve_forever()
+    main()
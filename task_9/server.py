@@ -0,0 +1,113 @@
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer
+
+MODES = ("single", "threaded", "prefork")
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTPServer, который обрабатывает соединения в пуле из max_workers потоков.
+    В отличие от ThreadingHTTPServer число потоков ограничено: лишние
+    соединения ждут в очереди пула, а не плодят новые потоки.
+    """
+
+    def __init__(self, server_address, handler_class, max_workers: int = 8, bind_and_activate: bool = True):
+        super().__init__(server_address, handler_class, bind_and_activate)
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="http-worker")
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def make_server(handler_class, host: str = "127.0.0.1", port: int = 8000,
+                mode: str = "single", workers: int = 8) -> HTTPServer:
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}")
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+    if mode == "threaded":
+        return PooledHTTPServer((host, port), handler_class, max_workers=workers)
+    return HTTPServer((host, port), handler_class)
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve_prefork(httpd: HTTPServer, workers: int, on_fork=None) -> None:
+    """
+    Pre-fork: слушающий сокет уже открыт в родителе, каждый из workers
+    дочерних процессов принимает соединения с него сам (балансирует ядро).
+    on_fork(index) вызывается в ребёнке до начала обслуживания — там нужно
+    пересоздать всё, что нельзя наследовать через fork (потоки, соединения с БД).
+    index — номер воркера от 0 до workers - 1: по нему можно выбрать один
+    процесс для работы, которую не нужно делать в каждом.
+    """
+    children = []
+    for index in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+                if on_fork is not None:
+                    on_fork(index)
+                httpd.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            except Exception:
+                code = 1
+            finally:
+                os._exit(code)
+        children.append(pid)
+
+    # SIGTERM родителю гасит и всех воркеров
+    prev_term = signal.signal(signal.SIGTERM, _interrupt)
+    prev_int = signal.getsignal(signal.SIGINT)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # сигнал, пришедший всей группе процессов, может догнать родителя во время
+        # уборки — не даём ему прервать ожидание воркеров и закрытие сокета
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        try:
+            for pid in children:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                    os.waitpid(pid, 0)
+                except (ProcessLookupError, ChildProcessError):
+                    pass
+            httpd.server_close()
+        finally:
+            signal.signal(signal.SIGTERM, prev_term)
+            signal.signal(signal.SIGINT, prev_int)
+
+
+def serve(httpd: HTTPServer, mode: str = "single", workers: int = 8, on_fork=None) -> None:
+    if mode == "prefork":
+        return serve_prefork(httpd, workers, on_fork=on_fork)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
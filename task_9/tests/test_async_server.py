@@ -0,0 +1,121 @@
+import unittest
+import asyncio
+import http.client
+import socket
+import threading
+from unittest.mock import MagicMock
+
+from asyncserver import AsyncHTTPServer
+
+
+class TestAsyncHTTPServer(unittest.TestCase):
+    def setUp(self):
+        self.router = MagicMock()
+        self.router.dispatch.side_effect = lambda path, query: (
+            200,
+            [("Content-Type", "text/plain; charset=utf-8"), ("Content-Length", str(len(path)))],
+            path.encode("utf-8"),
+        )
+        self.server = AsyncHTTPServer(self.router, "127.0.0.1", 0, workers=2)
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self.server.start())
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.server.aclose(), self.loop).result(2)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(2)
+        self.loop.close()
+
+    def test_keep_alive_reuses_connection(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=3)
+        conn.request("GET", "/users")
+        resp = conn.getresponse()
+        self.assertEqual(resp.read(), b"/users")
+        self.assertEqual(resp.getheader("Connection"), "keep-alive")
+        sock = conn.sock
+
+        conn.request("GET", "/user?id=2")
+        resp = conn.getresponse()
+        self.assertEqual(resp.read(), b"/user")
+        self.assertIs(conn.sock, sock)
+        conn.close()
+
+        self.router.dispatch.assert_called_with("/user", {"id": ["2"]})
+
+    def test_pipelined_requests_answered_in_order(self):
+        with socket.create_connection(("127.0.0.1", self.server.port), timeout=3) as s:
+            s.sendall(b"GET /a HTTP/1.1\r\nHost: x\r\n\r\n"
+                      b"GET /bb HTTP/1.1\r\nHost: x\r\n\r\n"
+                      b"GET /ccc HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+            data = b""
+            while True:
+                chunk = s.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+        self.assertEqual(data.count(b"HTTP/1.1 200 OK"), 3)
+        self.assertLess(data.index(b"\r\n\r\n/a"), data.index(b"\r\n\r\n/bb"))
+        self.assertLess(data.index(b"\r\n\r\n/bb"), data.index(b"\r\n\r\n/ccc"))
+        self.assertIn(b"Connection: close", data)
+
+    def test_unsupported_method(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=3)
+        conn.request("POST", "/users", body=b"x=1")
+        resp = conn.getresponse()
+        resp.read()
+        self.assertEqual(resp.status, 501)
+        conn.close()
+        self.router.dispatch.assert_not_called()
+
+
+    def exchange(self, raw: bytes) -> bytes:
+        with socket.create_connection(("127.0.0.1", self.server.port), timeout=3) as s:
+            s.sendall(raw)
+            data = b""
+            while True:
+                chunk = s.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+        return data
+
+    def test_chunked_body_is_consumed(self):
+        data = self.exchange(
+            b"POST /users HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\n"
+            b"4\r\nGET \r\n6;ext=1\r\n/evil \r\n0\r\nX-Trailer: 1\r\n\r\n"
+            b"GET /after HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n"
+        )
+        self.assertTrue(data.startswith(b"HTTP/1.1 501"))
+        self.assertIn(b"\r\n\r\n/after", data)
+        self.router.dispatch.assert_called_once_with("/after", {})
+
+    def test_bad_chunked_body_closes_connection(self):
+        data = self.exchange(
+            b"POST /users HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\n"
+            b"zz\r\nGET /evil HTTP/1.1\r\n\r\n"
+        )
+        self.assertTrue(data.startswith(b"HTTP/1.1 400"))
+        self.assertEqual(data.count(b"HTTP/1.1"), 1)
+        self.router.dispatch.assert_not_called()
+
+    def test_unknown_transfer_encoding(self):
+        data = self.exchange(
+            b"POST /users HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: gzip\r\n\r\n"
+            b"GET /evil HTTP/1.1\r\n\r\n"
+        )
+        self.assertTrue(data.startswith(b"HTTP/1.1 501"))
+        self.assertIn(b"Connection: close", data)
+        self.assertEqual(data.count(b"HTTP/1.1"), 1)
+
+    def test_transfer_encoding_with_content_length(self):
+        data = self.exchange(
+            b"POST /users HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\nContent-Length: 3\r\n\r\n"
+            b"0\r\n\r\n"
+        )
+        self.assertTrue(data.startswith(b"HTTP/1.1 400"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,472 @@
+import unittest
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from controllers import databasecontroller as dbc
+from controllers.databasecontroller import (
+    SCHEMA_VERSION, ConnectionPool, WriteQueue, connect, init_db, is_empty, schema_version, CurrencyRatesCRUD, UsersCRUD, UserCurrencyCRUD,
+)
+
+
+class TestFileDatabase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "app.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_pragmas(self):
+        conn = connect(self.path)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+        self.assertEqual(conn.execute("PRAGMA foreign_keys").fetchone()[0], 1)
+        self.assertEqual(conn.execute("PRAGMA cache_size").fetchone()[0], -16000)
+        conn.close()
+
+    def test_data_survives_reopen(self):
+        conn = connect(self.path)
+        init_db(conn)
+        self.assertTrue(is_empty(conn))
+        UsersCRUD(conn)._create("Alice")
+        conn.close()
+
+        conn = connect(self.path)
+        init_db(conn)
+        self.assertEqual(schema_version(conn), SCHEMA_VERSION)
+        self.assertFalse(is_empty(conn))
+        self.assertEqual(UsersCRUD(conn)._read(), [{"id": 1, "name": "Alice"}])
+        conn.close()
+
+    def test_unversioned_database_is_adopted(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE currency (id INTEGER PRIMARY KEY AUTOINCREMENT, num_code TEXT NOT NULL, "
+                     "char_code TEXT NOT NULL, name TEXT NOT NULL, value FLOAT, nominal INTEGER)")
+        conn.execute("INSERT INTO currency(num_code, char_code, name, value, nominal) "
+                     "VALUES('840', 'USD', 'Dollar', 90.0, 1)")
+        conn.commit()
+        conn.close()
+
+        conn = connect(self.path)
+        init_db(conn)
+        self.assertEqual(CurrencyRatesCRUD(conn)._read_by_char_code("USD")["value"], 90.0)
+        conn.close()
+
+    def test_failed_migration_is_rolled_back(self):
+        conn = connect(self.path)
+        init_db(conn)
+
+        def broken(c):
+            c.execute("CREATE TABLE extra (id INTEGER)")
+            raise sqlite3.OperationalError("boom")
+
+        with patch.object(dbc, "MIGRATIONS", dbc.MIGRATIONS + [broken]), \
+                patch.object(dbc, "SCHEMA_VERSION", SCHEMA_VERSION + 1):
+            with self.assertRaises(sqlite3.OperationalError):
+                init_db(conn)
+        self.assertEqual(schema_version(conn), SCHEMA_VERSION)
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertNotIn("extra", tables)
+
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+        with self.assertRaises(RuntimeError):
+            init_db(conn)
+        conn.close()
+
+    def test_build_app_seeds_once(self):
+        import myapp
+
+        myapp.build_app(self.path)
+        myapp.build_app(self.path)
+        conn = connect(self.path)
+        self.assertEqual(len(UsersCRUD(conn)._read()), 2)
+        conn.close()
+
+    def test_prefork_needs_database_file(self):
+        import myapp
+
+        with patch.object(myapp, "DB_PATH", ":memory:"), patch.object(myapp, "make_server") as make_server:
+            with patch("sys.stderr"), self.assertRaises(SystemExit):
+                myapp.main(["--mode", "prefork"])
+        make_server.assert_not_called()
+
+
+class TestIndexes(unittest.TestCase):
+    def setUp(self):
+        self.conn = connect()
+        init_db(self.conn)
+        CurrencyRatesCRUD(self.conn)._create_many([
+            {"num_code": "840", "char_code": "USD", "name": "Dollar", "value": 90.0, "nominal": 1},
+            {"num_code": "978", "char_code": "EUR", "name": "Euro", "value": 91.0, "nominal": 1},
+        ])
+        self.user = UsersCRUD(self.conn)._create("Alice")
+
+    def tearDown(self):
+        self.conn.close()
+
+    def plan(self, sql, params=()) -> str:
+        rows = self.conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+        return "\n".join(r["detail"] for r in rows)
+
+    def test_hot_queries_use_indexes(self):
+        plan = self.plan("SELECT id, num_code, char_code, name, value, nominal FROM currency WHERE char_code = ?",
+                         ("USD",))
+        self.assertIn("USING INDEX idx_currency_char_code", plan)
+
+        plan = self.plan("UPDATE currency SET value = ? WHERE char_code = ?", (1.0, "USD"))
+        self.assertIn("USING INDEX idx_currency_char_code", plan)
+
+        plan = self.plan("""
+            SELECT c.id, c.num_code, c.char_code, c.name, c.value, c.nominal
+            FROM currency c
+            JOIN user_currency uc ON uc.currency_id = c.id
+            WHERE uc.user_id = ?
+            ORDER BY c.id
+        """, (1,))
+        self.assertIn("idx_user_currency_user_currency (user_id=?)", plan)
+        self.assertIn("USING INTEGER PRIMARY KEY (rowid=?)", plan)
+        self.assertNotIn("SCAN uc", plan)
+
+    def test_duplicates_are_rejected(self):
+        with self.assertRaises(sqlite3.IntegrityError):
+            CurrencyRatesCRUD(self.conn)._create_one(
+                {"num_code": "840", "char_code": "USD", "name": "Dollar", "value": 1.0, "nominal": 1})
+        self.conn.rollback()
+
+        subs = UserCurrencyCRUD(self.conn)
+        first = subs._subscribe(self.user, 1)
+        self.assertEqual(subs._subscribe(self.user, 1), first)
+        self.assertEqual(len(subs._get_user_currencies(self.user)), 1)
+
+
+class TestBulkUpsert(unittest.TestCase):
+    def setUp(self):
+        self.conn = connect()
+        init_db(self.conn)
+        self.db = CurrencyRatesCRUD(self.conn)
+        self.db._create_many([
+            {"num_code": "840", "char_code": "USD", "name": "Dollar", "value": 90.0, "nominal": 1},
+            {"num_code": "978", "char_code": "EUR", "name": "Euro", "value": 91.0, "nominal": 1},
+        ])
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_update_counts_rows(self):
+        self.assertEqual(self.db._update({"usd": 95.5, "EUR": 99, "XXX": 1}), 2)
+        self.assertEqual(self.db._read_by_char_code("USD")["value"], 95.5)
+
+    def test_upsert_outcomes(self):
+        result = self.db._upsert([
+            {"char_code": "usd", "value": 92.0},
+            {"num_code": "978", "char_code": "EUR", "name": "Евро", "value": 93.0, "nominal": 1},
+            {"num_code": "392", "char_code": "JPY", "name": "Иена", "value": 61.0, "nominal": 100},
+            {"char_code": "CNY", "value": 12.5},
+        ])
+        self.assertEqual(result, {"USD": "updated", "EUR": "updated", "JPY": "inserted", "CNY": "missing"})
+        self.assertEqual(self.db._read_by_char_code("EUR")["name"], "Евро")
+        self.assertEqual(self.db._read_by_char_code("JPY")["nominal"], 100)
+        self.assertIsNone(self.db._read_by_char_code("CNY"))
+        self.assertEqual(self.db._upsert({"USD": 1.0}), {"USD": "updated"})
+
+    def test_upsert_outcomes_come_from_sql(self):
+        statements = []
+        self.conn.set_trace_callback(statements.append)
+        result = self.db._upsert([
+            {"num_code": "392", "char_code": "JPY", "name": "Иена", "value": 61.0, "nominal": 100},
+            {"num_code": "392", "char_code": "jpy", "name": "Иена", "value": 62.0, "nominal": 100},
+            {"char_code": "USD", "value": 92.0},
+            {"char_code": "EUR", "value": 93.0},
+        ])
+        self.conn.set_trace_callback(None)
+        self.assertEqual(result, {"JPY": "inserted", "USD": "updated", "EUR": "updated"})
+        self.assertEqual(self.db._read_by_char_code("JPY")["value"], 62.0)
+        # все коды нашлись — отдельного запроса по списку кодов нет
+        self.assertFalse([s for s in statements if "json_each" in s])
+
+    def test_upsert_is_atomic(self):
+        self.conn.execute("""
+            CREATE TRIGGER block_eur BEFORE UPDATE ON currency WHEN NEW.char_code = 'EUR'
+            BEGIN SELECT RAISE(ABORT, 'blocked'); END;
+        """)
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.db._upsert([
+                {"num_code": "840", "char_code": "USD", "name": "Dollar", "value": 1.0, "nominal": 1},
+                {"char_code": "EUR", "value": 2.0},
+            ])
+        self.assertEqual(self.db._read_by_char_code("USD")["value"], 90.0)
+
+
+class TestIndexMigration(unittest.TestCase):
+    def test_existing_duplicates_are_merged(self):
+        conn = connect()
+        with patch.object(dbc, "MIGRATIONS", dbc.MIGRATIONS[:1]), patch.object(dbc, "SCHEMA_VERSION", 1):
+            init_db(conn)
+        conn.executescript("""
+            INSERT INTO user(name) VALUES('Alice');
+            INSERT INTO currency(num_code, char_code, name, value, nominal) VALUES('840', 'USD', 'Dollar', 90, 1);
+            INSERT INTO currency(num_code, char_code, name, value, nominal) VALUES('840', 'USD', 'Dollar', 91, 1);
+            INSERT INTO user_currency(user_id, currency_id) VALUES(1, 1);
+            INSERT INTO user_currency(user_id, currency_id) VALUES(1, 2);
+            INSERT INTO user_currency(user_id, currency_id) VALUES(1, 2);
+        """)
+
+        init_db(conn)
+        self.assertEqual(schema_version(conn), SCHEMA_VERSION)
+        self.assertEqual([r["id"] for r in CurrencyRatesCRUD(conn)._read()], [1])
+        rows = conn.execute("SELECT user_id, currency_id FROM user_currency").fetchall()
+        self.assertEqual([tuple(r) for r in rows], [(1, 1)])
+        conn.close()
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.pool = ConnectionPool(os.path.join(self.dir, "app.db"), readers=2, timeout=0.2)
+        with self.pool.writer() as conn:
+            init_db(conn)
+        self.db = CurrencyRatesCRUD(self.pool)
+        self.db._create_one({"num_code": "840", "char_code": "USD", "name": "Dollar", "value": 90.0, "nominal": 1})
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.dir)
+
+    def test_readers_are_read_only(self):
+        with self.pool.reader() as conn:
+            self.assertEqual(conn.execute("SELECT count(*) FROM currency").fetchone()[0], 1)
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM currency")
+
+    def test_reads_run_while_writer_is_busy(self):
+        with self.pool.transaction() as conn:
+            conn.execute("UPDATE currency SET value = 1 WHERE char_code = 'USD'")
+            seen = []
+            t = threading.Thread(target=lambda: seen.append(self.db._read_by_char_code("USD")["value"]))
+            t.start()
+            t.join(2)
+            # читатель не ждёт писателя и видит последнее зафиксированное состояние
+            self.assertEqual(seen, [90.0])
+        self.assertEqual(self.db._read_by_char_code("USD")["value"], 1.0)
+
+    def test_exhausted_pool_times_out(self):
+        with self.pool.reader(), self.pool.reader():
+            with self.assertRaises(TimeoutError):
+                with self.pool.reader():
+                    pass
+
+    def test_nested_writes_commit_once(self):
+        users = UsersCRUD(self.pool)
+        statements = []
+        with self.pool.writer() as conn:
+            conn.set_trace_callback(statements.append)
+        with self.pool.transaction():
+            uid = users._create("Alice")
+            UserCurrencyCRUD(self.pool)._subscribe(uid, self.db._read_by_char_code("USD")["id"])
+        self.assertEqual([s for s in statements if s.startswith(("BEGIN", "COMMIT"))], ["BEGIN IMMEDIATE;", "COMMIT"])
+        self.assertEqual(len(UserCurrencyCRUD(self.pool)._get_user_currencies(uid)), 1)
+
+    def test_transaction_rolls_back_on_error(self):
+        users = UsersCRUD(self.pool)
+        with self.assertRaises(RuntimeError):
+            with self.pool.transaction():
+                users._create("Alice")
+                raise RuntimeError("boom")
+        self.assertEqual(users._read(), [])
+
+    def test_memory_pool_reads_through_writer(self):
+        pool = ConnectionPool(":memory:")
+        with pool.writer() as conn:
+            init_db(conn)
+        UsersCRUD(pool)._create("Alice")
+        self.assertEqual(UsersCRUD(pool)._read(), [{"id": 1, "name": "Alice"}])
+        pool.close()
+
+
+class TestBareConnection(unittest.TestCase):
+    def setUp(self):
+        self.conn = connect()
+        init_db(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_one_wrapper_per_connection(self):
+        self.assertIs(CurrencyRatesCRUD(self.conn).db, UsersCRUD(self.conn).db)
+        self.assertIs(ConnectionPool.wrap(self.conn), UsersCRUD(self.conn).db)
+
+    def test_nested_transaction_across_crud_rolls_back(self):
+        users = UsersCRUD(self.conn)
+        currencies = CurrencyRatesCRUD(self.conn)
+        statements = []
+        self.conn.set_trace_callback(statements.append)
+        with self.assertRaises(RuntimeError):
+            with users.db.transaction():
+                users._create("Alice")
+                currencies._create_one({"num_code": "840", "char_code": "USD", "name": "Dollar",
+                                        "value": 90.0, "nominal": 1})
+                raise RuntimeError("boom")
+        self.conn.set_trace_callback(None)
+        self.assertNotIn("COMMIT", statements)
+        self.assertEqual(users._read(), [])
+        self.assertEqual(currencies._read(), [])
+
+    def test_write_queue_on_connection(self):
+        writes = WriteQueue(self.conn)
+        users = UsersCRUD(self.conn, writes)
+        self.assertEqual(writes.submit(users._create, "Alice").result(5), 1)
+        self.assertEqual(users._create("Bob"), 2)
+        writes.close()
+        self.assertEqual([u["name"] for u in users._read()], ["Alice", "Bob"])
+
+    def test_plain_sqlite_connection(self):
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        self.addCleanup(conn.close)
+        init_db(conn)
+        users, currencies = UsersCRUD(conn), CurrencyRatesCRUD(conn)
+        self.assertEqual(users._create("Alice"), 1)
+        # обёртки разные, но вложенная транзакция та же и откатывается целиком
+        with self.assertRaises(RuntimeError):
+            with users.db.transaction():
+                users._create("Bob")
+                currencies._create_one({"num_code": "840", "char_code": "USD", "name": "Dollar",
+                                        "value": 90.0, "nominal": 1})
+                raise RuntimeError("boom")
+        self.assertEqual([u["name"] for u in users._read()], ["Alice"])
+        self.assertEqual(currencies._read(), [])
+
+        writes = WriteQueue(conn)
+        queued = UsersCRUD(conn, writes)
+        self.assertIs(queued.db, writes.db)
+        self.assertEqual(writes.submit(queued._create, "Carol").result(5), 2)
+        writes.close()
+        with self.assertRaises(ValueError):
+            UsersCRUD(self.conn, writes)
+
+    def test_callers_transaction_is_not_committed(self):
+        self.conn.execute("INSERT INTO user(name) VALUES ('Alice')")
+        UsersCRUD(self.conn)._create("Bob")
+        self.assertTrue(self.conn.in_transaction)
+        self.conn.rollback()
+        self.assertEqual(UsersCRUD(self.conn)._read(), [])
+
+class TestWriteQueue(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.pool = ConnectionPool(os.path.join(self.dir, "app.db"))
+        with self.pool.writer() as conn:
+            init_db(conn)
+        self.writes = WriteQueue(self.pool, max_batch=100, max_delay=0.05)
+        self.currencies = CurrencyRatesCRUD(self.pool, self.writes)
+        self.users = UsersCRUD(self.pool, self.writes)
+        self.subs = UserCurrencyCRUD(self.pool, self.writes)
+        self.usd = self.currencies._create_one(
+            {"num_code": "840", "char_code": "USD", "name": "Dollar", "value": 90.0, "nominal": 1}
+        )
+
+    def tearDown(self):
+        self.writes.close()
+        self.pool.close()
+        shutil.rmtree(self.dir)
+
+    def test_locked_database_fails_every_future(self):
+        with self.pool.writer() as conn:
+            conn.execute("PRAGMA busy_timeout = 50;")
+        other = connect(self.pool.path)
+        self.addCleanup(other.close)
+        other.execute("BEGIN IMMEDIATE;")
+        futures = [self.writes.submit(self.users._create, f"user{i}") for i in range(3)]
+        for fut in futures:
+            with self.assertRaises(sqlite3.OperationalError):
+                fut.result(5)
+        other.rollback()
+        self.assertEqual(self.writes.submit(self.users._create, "Alice").result(5), 1)
+
+    def test_concurrent_writes_share_commits(self):
+        submitted = []
+        submit = self.writes.submit
+
+        def counting_submit(*args, **kwargs):
+            submitted.append(1)
+            return submit(*args, **kwargs)
+
+        self.writes.submit = counting_submit
+        ids = []
+        threads = [threading.Thread(target=lambda n=n: ids.append(self.users._create(f"user{n}")))
+                   for n in range(20)]
+        # пока писатель занят, все 20 записей встают в очередь и ждут commit
+        with self.pool.writer():
+            for t in threads:
+                t.start()
+            deadline = time.monotonic() + 5
+            while len(submitted) < 20 and time.monotonic() < deadline:
+                time.sleep(0.005)
+        for t in threads:
+            t.join(5)
+
+        self.assertEqual(len(submitted), 20)
+        self.assertEqual(sorted(ids), list(range(1, 21)))
+        self.assertEqual(self.writes.operations, 20)
+        self.assertLess(self.writes.batches, self.writes.operations)
+        self.assertLessEqual(self.writes.batches, 2)
+
+    def test_submitted_writes_are_batched(self):
+        futures = [self.writes.submit(self.users._create, f"user{n}") for n in range(10)]
+        self.assertEqual(sorted(f.result(5) for f in futures), list(range(1, 11)))
+        self.assertEqual(self.writes.operations, 10)
+        self.assertLessEqual(self.writes.batches, 2)
+
+    def test_idle_queue_writes_directly(self):
+        self.users._create("Alice")
+        self.assertEqual(self.writes.batches, 0)
+
+    def test_future_resolves_after_commit(self):
+        fut = self.writes.submit(self.users._create, "Alice")
+        uid = fut.result(5)
+        # отдельное соединение видит только зафиксированные данные
+        other = connect(self.pool.path)
+        self.assertEqual(other.execute("SELECT name FROM user WHERE id = ?", (uid,)).fetchone()[0], "Alice")
+        other.close()
+
+    def test_failed_operation_does_not_abort_batch(self):
+        dup = self.writes.submit(self.currencies._create_one,
+                                 {"num_code": "840", "char_code": "USD", "name": "Dup", "value": 1.0, "nominal": 1})
+        ok = self.writes.submit(self.users._create, "Alice")
+        with self.assertRaises(sqlite3.IntegrityError):
+            dup.result(5)
+        self.assertEqual(ok.result(5), 1)
+        self.assertEqual(self.currencies._read_by_char_code("USD")["name"], "Dollar")
+
+    def test_close_commits_pending(self):
+        fut = self.writes.submit(self.users._create, "Alice")
+        self.writes.close()
+        self.assertTrue(fut.done())
+        self.assertEqual(self.users._read(), [{"id": 1, "name": "Alice"}])
+        with self.assertRaises(RuntimeError):
+            self.writes.submit(self.users._create, "Bob")
+
+    def test_group_commit_is_opt_in(self):
+        import myapp
+
+        path = os.path.join(self.dir, "app2.db")
+        router = myapp.build_app(path)
+        self.assertIsNone(router.currency_controller.db.writes)
+        router.currency_controller.db.db.close()
+        router = myapp.build_app(path, group_commit=True)
+        self.assertIsInstance(router.currency_controller.db.writes, WriteQueue)
+        router.currency_controller.db.writes.close()
+        router.currency_controller.db.db.close()
+
+    def test_requires_same_pool(self):
+        with self.assertRaises(ValueError):
+            UsersCRUD(ConnectionPool(), self.writes)
+
+
+if __name__ == "__main__":
+    unittest.main()